@@ -1,7 +1,7 @@
-from collections import deque
-import queue
 import asyncio
 import logging
+
+import numpy as np
 import sys
 from pathlib import Path
 
@@ -11,75 +11,120 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 # Импортируем общее состояние
-from api.shared_state import latest_data, websocket_clients, data_queue
+from api.shared_state import latest_data, websocket_clients, data_queue, graph_feeds
+from core.mqtt_client import build_payload, DEFAULT_SENSOR_ID
+from core.sinks import SinkPipeline, WebSocketBufferSink
+from api.ws_handler import encode_frame
 
 # Настройка логирования
 logger = logging.getLogger("WSQueue")
 
+def _store_latest(data):
+    """Сохраняет точки пакета для HTTP доступа (/data)"""
+    if isinstance(data, dict) and "packet" in data:
+        packet = data["packet"]
+        n = len(packet)
+        sensor_id = data.get("sensor_id", DEFAULT_SENSOR_ID)
+        last_seq = latest_data.append(
+            sensor_id,
+            np.fromiter((point["timestamp"] for point in packet), dtype=np.float64, count=n),
+            np.fromiter((point["value"] for point in packet), dtype=np.float64, count=n),
+        )
+        logger.debug(f"HTTP: Добавлено {n} точек датчика {sensor_id} в latest_data, последний seq: {last_seq}")
+
+# Цикл событий сервера; задаётся при запуске process_data_queue
+_loop: asyncio.AbstractEventLoop | None = None
+
 def add_data_to_queue(data):
     """Добавляет данные в очередь из любого потока"""
     try:
         # Сохраняем данные для HTTP доступа
-        if isinstance(data, dict) and "packet" in data:
-            for point in data["packet"]:
-                latest_data.append({
-                    "timestamp": point["timestamp"],
-                    "value": point["value"]
-                })
-            logger.info(f"HTTP: Добавлено {len(data['packet'])} точек в latest_data, всего: {len(latest_data)}")
-            logger.debug(f"latest_data после добавления: {len(latest_data)} точек, последняя точка: {latest_data[-1] if latest_data else 'нет данных'}")
-            # Добавим эту строку для отладки - выведем первые несколько точек, чтобы убедиться, что данные есть
-            if latest_data:
-                logger.debug(f"Примеры данных: {list(latest_data)[:3]}")
-        
-        # Потокобезопасная операция, которая работает в любом потоке
-        data_queue.put(data)
-        logger.info(f"Данные добавлены в очередь, размер очереди: {data_queue.qsize()}")
+        _store_latest(data)
+
+        # asyncio.Queue не потокобезопасна: кладём из цикла событий
+        if _loop is not None and not _loop.is_closed():
+            _loop.call_soon_threadsafe(data_queue.put_nowait, data)
     except Exception as e:
         logger.error(f"Error adding data to queue: {e}")
         import traceback
         logger.error(traceback.format_exc())
 
+async def broadcast_many(items):
+    """
+    Кодирует каждый пакет один раз и ставит готовые кадры в очереди
+    WebSocket-клиентов, подписанных на его датчик (подписчикам прореженных
+    лент — кадры ленты);
+    отправляют их задачи-писатели клиентов
+    """
+    clients = [client for client in websocket_clients if client.feed is None]
+    if clients:
+        frames = [
+            (
+                encode_frame(data),
+                data.get("packet_timestamp") if isinstance(data, dict) else None,
+                data.get("sensor_id") if isinstance(data, dict) else None,
+            )
+            for data in items
+        ]
+        for client in clients:
+            for frame, packet_time, sensor_id in frames:
+                if client.wants(sensor_id):
+                    client.enqueue(frame, packet_time)
+    # Прореженные ленты: пакет прореживается и кодируется один раз на ленту
+    for feed in list(graph_feeds.values()):
+        for data in items:
+            payload = feed.push(data)
+            if payload is not None:
+                frame = encode_frame(payload)
+                for client in list(feed.clients):
+                    client.enqueue(frame, payload["packet_timestamp"])
+    logger.debug(f"WebSocket: {len(items)} пакетов поставлено {len(websocket_clients)} клиентам")
+
+async def broadcast(data):
+    """Отправляет данные всем подключенным WebSocket-клиентам"""
+    await broadcast_many([data])
+
+class AsyncPacketPublisher:
+    """
+    Паблишер для AsyncDataGenerator: отдаёт пакет приёмникам конвейера
+    (MIMICS_SINKS), как и поточный генератор. Если среди них есть websocket,
+    пакет вместо его очереди сразу рассылается WebSocket-клиентам в том же
+    цикле событий, без очереди и опроса.
+    """
+
+    def __init__(self, pipeline: SinkPipeline):
+        self.pipeline = pipeline
+
+    async def publish_packet(self, packet, target_time=None, sensor_id=DEFAULT_SENSOR_ID, block=None):
+        payload = build_payload(packet, target_time, sensor_id)
+        direct = self.pipeline.has_sink(WebSocketBufferSink.name)
+        skip = (WebSocketBufferSink.name,) if direct else ()
+        if block:
+            # Ожидание места в очередях приёмников — в потоке, чтобы не держать цикл событий
+            nbytes = await asyncio.to_thread(self.pipeline.publish_payload, payload, skip, True)
+        else:
+            nbytes = self.pipeline.publish_payload(payload, skip=skip)
+        if direct:
+            _store_latest(payload)
+            self.pipeline.record_direct(WebSocketBufferSink.name)
+            await broadcast(payload)
+        return nbytes
+
 async def process_data_queue():
-    """Асинхронная задача для обработки данных и отправки в WebSocket"""
+    """Асинхронная задача рассылки: просыпается только при поступлении данных"""
+    global _loop
+    _loop = asyncio.get_running_loop()
     logger.info("WebSocket background task started")
     while True:
         try:
-            # Отладочный вывод
-            logger.debug(f"WebSocket clients: {len(websocket_clients)}, Queue size: {data_queue.qsize()}")
-            logger.debug(f"latest_data содержит {len(latest_data)} точек")
-            
-            # Проверяем очередь, не блокируя поток
-            if not data_queue.empty():
-                # Получаем данные из очереди
-                data = data_queue.get(block=False)
-                logger.info(f"WebSocket: Обработка данных из очереди, клиентов: {len(websocket_clients)}")
-                
-                # Отправляем всем подключенным клиентам
-                clients_to_remove = []
-                for i, client in enumerate(websocket_clients):
-                    try:
-                        await client.send_json(data)
-                        logger.info(f"WebSocket: Данные отправлены клиенту #{i}")
-                    except Exception as e:
-                        logger.error(f"WebSocket: Ошибка отправки клиенту #{i}: {e}")
-                        clients_to_remove.append(i)
-                
-                # Удаляем отключенных клиентов (в обратном порядке)
-                for i in sorted(clients_to_remove, reverse=True):
-                    logger.warning(f"WebSocket: Удаление отключенного клиента #{i}")
-                    websocket_clients.pop(i)
-                
-                # Отмечаем задачу как выполненную
-                data_queue.task_done()
-            
-            # Небольшая пауза, чтобы не загружать CPU
-            await asyncio.sleep(0.1)
-        except queue.Empty:
-            # Если очередь пуста, просто ждем
-            await asyncio.sleep(0.1)
+            # Ждём первый пакет и забираем всё, что накопилось, за один проход
+            items = [await data_queue.get()]
+            while not data_queue.empty():
+                items.append(data_queue.get_nowait())
+            await broadcast_many(items)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error in process_data_queue: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            await asyncio.sleep(0.1)
\ No newline at end of file
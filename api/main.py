@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 import logging
@@ -6,8 +7,11 @@ import asyncio
 from api.sensors import router as sensors_router
 from fastapi import FastAPI, HTTPException, WebSocket, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse
 from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import tempfile
+import numpy as np
 
 # Добавляем корень проекта в PYTHONPATH
 project_root = Path(__file__).parent.parent.absolute()
@@ -16,8 +20,16 @@ if str(project_root) not in sys.path:
 
 # Импорты из проекта
 from core.mqtt_client import MQTTPublisher
-from core.data_generator import DataGenerator
-from .schemas import ScenarioSchema, StartRequest
+from core.mqtt_pool import MQTTPool
+from core.data_generator import DataGenerator, check_stream_params
+from core.async_generator import AsyncDataGenerator
+from core.fleet import FleetGenerator
+from core.fleet_pool import ShardedFleet
+from core.scenario import Scenario
+from core.export import export_scenarios
+from core.wavetable import wavetable_stats
+from core.sinks import SinkPipeline, MQTTSink, WebSocketBufferSink, FileSink, NullSink
+from .schemas import ScenarioSchema, StartRequest, FleetSensorRequest, ExportRequest, PreviewRequest
 
 # Настройка логирования
 logging.basicConfig(
@@ -40,8 +52,8 @@ app.add_middleware(
 
 # Явно импортируем модули для работы с данными и WebSocket
 from api.shared_state import latest_data, websocket_clients, data_queue
-from api.data_queue import process_data_queue
-from api.ws_handler import router as ws_router
+from api.data_queue import process_data_queue, add_data_to_queue, AsyncPacketPublisher
+from api.ws_handler import router as ws_router, websocket_stats
 
 # Регистрируем маршруты WebSocket
 app.include_router(ws_router)
@@ -80,25 +92,81 @@ async def delete_primitive(index: int):
 MQTT_CONFIG = {
     "broker": "broker.emqx.io",
     "port":   1883,
-    "topic":  "mimics/sensor_data",
+    # Может быть шаблоном с {sensor_id}: mimics/{sensor_id}/data
+    "topic":  os.getenv("MIMICS_MQTT_TOPIC", "mimics/sensor_data"),
     "username": "",
     "password": "",
     "qos": 1,
+    # json | columnar | msgpack | binary | binary32; кодек добавляется в конец топика
+    "codec": os.getenv("MIMICS_MQTT_CODEC", "json"),
+    # Очередь на отправку: 0 (по умолчанию) — публикация прямо из потока генератора,
+    # N > 0 — очередь на N пакетов и отдельный поток отправки
+    "max_queued": int(os.getenv("MIMICS_MQTT_MAX_QUEUED", "0")),
+    "max_inflight": int(os.getenv("MIMICS_MQTT_MAX_INFLIGHT", "20")),
+    "queue_policy": os.getenv("MIMICS_MQTT_QUEUE_POLICY", "drop_oldest"),
 }
+# Спул на диске на время обрыва связи с брокером (пусто — выключен)
+if os.getenv("MIMICS_MQTT_SPOOL_DIR"):
+    MQTT_CONFIG["spool_dir"] = os.getenv("MIMICS_MQTT_SPOOL_DIR")
+    MQTT_CONFIG["spool_replay_rate"] = float(os.getenv("MIMICS_MQTT_SPOOL_REPLAY_RATE", "200"))
+    MQTT_CONFIG["spool_max_segments"] = int(os.getenv("MIMICS_MQTT_SPOOL_MAX_SEGMENTS", "64"))
+# Число MQTT-соединений: больше 1 — пул с привязкой датчика к соединению
+MQTT_CONNECTIONS = int(os.getenv("MIMICS_MQTT_CONNECTIONS", "1"))
+
+# Флот: 0 воркеров — один поток в этом процессе, N > 0 — N процессов-воркеров
+FLEET_WORKERS = int(os.getenv("MIMICS_FLEET_WORKERS", "0"))
+FLEET_SHARDING = os.getenv("MIMICS_FLEET_SHARDING", "hash")
+
+# Приёмники пакетов: mqtt, websocket, file, null (через запятую)
+SINKS = [name.strip() for name in os.getenv("MIMICS_SINKS", "mqtt,websocket").split(",") if name.strip()]
+SINK_FILE = os.getenv("MIMICS_SINK_FILE", "mimics_packets.jsonl")
+# Заполненная очередь приёмника: drop — терять пакеты, block — ждать места
+SINK_OVERFLOW = os.getenv("MIMICS_SINK_OVERFLOW", "drop")
 
 # Плейсхолдеры для MQTT и генератора, инициализируются при старте
-mqtt_publisher: MQTTPublisher
+mqtt_publisher: MQTTPublisher | MQTTPool | None = None
+sink_pipeline: SinkPipeline
 data_generator: DataGenerator
+async_generator: AsyncDataGenerator
+# Генератор, запущенный последним (/status показывает его статистику)
+active_generator: DataGenerator
+fleet_generator: FleetGenerator | ShardedFleet
 
 @app.on_event("startup")
 async def startup_event():
     """Выполняется при запуске сервера"""
-    global mqtt_publisher, data_generator
+    global mqtt_publisher, sink_pipeline, data_generator, async_generator, active_generator, fleet_generator
     
-    # Инициализация MQTT и генератора данных
-    mqtt_publisher = MQTTPublisher(MQTT_CONFIG)
-    data_generator = DataGenerator(mqtt_publisher)
-    logger.info(f"MQTT: Connected to broker {MQTT_CONFIG['broker']}:{MQTT_CONFIG['port']}")
+    # Приёмники пакетов: у каждого своя очередь и поток
+    sinks = []
+    for name in SINKS:
+        if name == "mqtt":
+            if MQTT_CONNECTIONS > 1:
+                mqtt_publisher = MQTTPool(MQTT_CONFIG, MQTT_CONNECTIONS)
+            else:
+                mqtt_publisher = MQTTPublisher(MQTT_CONFIG)
+            sinks.append(MQTTSink(mqtt_publisher))
+            logger.info(f"MQTT: Connected to broker {MQTT_CONFIG['broker']}:{MQTT_CONFIG['port']}")
+        elif name == "websocket":
+            sinks.append(WebSocketBufferSink(add_data_to_queue))
+        elif name == "file":
+            sinks.append(FileSink(SINK_FILE))
+        elif name == "null":
+            sinks.append(NullSink())
+        else:
+            raise ValueError(f"Unknown sink: {name}")
+    sink_pipeline = SinkPipeline(sinks, overflow=SINK_OVERFLOW)
+
+    # Генераторы публикуют пакеты в конвейер приёмников
+    data_generator = DataGenerator(sink_pipeline)
+    async_generator = AsyncDataGenerator(AsyncPacketPublisher(sink_pipeline))
+    active_generator = data_generator
+    if FLEET_WORKERS > 0:
+        fleet_generator = ShardedFleet(sink_pipeline, FLEET_WORKERS, FLEET_SHARDING)
+    else:
+        fleet_generator = FleetGenerator(sink_pipeline)
+    fleet_generator.start()
+    logger.info(f"Sinks: {', '.join(SINKS)}")
     
     # Запускаем фоновую задачу обработки очереди данных для WebSocket
     background_task = asyncio.create_task(process_data_queue())
@@ -114,38 +182,75 @@ async def root():
         "data_points": len(latest_data)
     }
 
+# Ошибки разбора сценария — неверный запрос (400), а не сбой сервера
+SCENARIO_ERRORS = (KeyError, ValueError, TypeError, SyntaxError)
+
+
+async def build_scenario(config: dict) -> Scenario:
+    """
+    Разбирает и компилирует сценарий в пуле потоков (компиляция формул не
+    держит цикл событий); ошибка в сценарии — HTTP 400.
+    """
+    try:
+        return await run_in_threadpool(Scenario.from_json, config)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Missing scenario field: {e}")
+    except SCENARIO_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/start", response_class=JSONResponse)
 async def start_generation(req: StartRequest):
-    """Запуск генерации данных"""
+    """Запуск генерации данных (backend: поток или задача asyncio)"""
+    global active_generator
+    # Всё, что может отклонить запрос, проверяется до остановки: ошибка (400)
+    # не должна обрывать уже идущую генерацию
+    if not req.scenario.episodes:
+        raise HTTPException(status_code=400, detail="Scenario must have at least one episode")
+
+    has_valid_looped = any(ep.get("is_looped", False) and ep.get("duration", 0) > 0
+                           for ep in req.scenario.episodes)
+
+    total_non_looped_duration = sum(ep.get("duration", 0)
+                                    for ep in req.scenario.episodes
+                                    if not ep.get("is_looped", False))
+
+    if not has_valid_looped and total_non_looped_duration <= 0:
+        raise HTTPException(status_code=400,
+                            detail="Scenario must have either a looped episode with positive duration "
+                                   "or non-looped episodes with positive total duration")
+    try:
+        check_stream_params(req.frequency, req.packets, req.timestamp_mode, req.speed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    scenario = await build_scenario(req.scenario.dict())
+
     try:
-        # Проверяем валидность сценария
-        if not req.scenario.episodes:
-            raise ValueError("Scenario must have at least one episode")
-        
-        has_valid_looped = any(ep.get("is_looped", False) and ep.get("duration", 0) > 0 
-                              for ep in req.scenario.episodes)
-        
-        total_non_looped_duration = sum(ep.get("duration", 0) 
-                                       for ep in req.scenario.episodes 
-                                       if not ep.get("is_looped", False))
-        
-        if not has_valid_looped and total_non_looped_duration <= 0:
-            raise ValueError("Scenario must have either a looped episode with positive duration " 
-                             "or non-looped episodes with positive total duration")
-        
         # Останавливаем текущую генерацию, если она запущена
-        if data_generator.is_running():
-            data_generator.stop()
-            logger.info("Stopping current data generation")
+        for generator in (data_generator, async_generator):
+            if generator.is_running():
+                generator.stop()
+                logger.info("Stopping current data generation")
         
         # Запускаем новую генерацию
-        data_generator.start_stream(
-            scenario_config=req.scenario.dict(),
+        generator = async_generator if req.backend == "asyncio" else data_generator
+        generator.start_stream(
+            scenario_config=scenario,
             frequency_hz=req.frequency,
             packets_per_sec=req.packets,
+            sensor_id=req.sensor_id,
+            catch_up=req.catch_up,
+            timestamp_mode=req.timestamp_mode,
+            speed=req.speed,
+            unthrottled=req.unthrottled,
+            max_packets_per_sec=req.max_packets_per_sec,
+            max_bytes_per_sec=req.max_bytes_per_sec,
         )
-        logger.info(f"Started generation with {len(req.scenario.episodes)} episodes")
-        return {"status": "started", "scenario": req.scenario.name}
+        active_generator = generator
+        # /data и /ws без sensor_id отдают точки этого потока
+        latest_data.main_sensor_id = req.sensor_id
+        logger.info(f"Started generation with {len(req.scenario.episodes)} episodes ({req.backend})")
+        return {"status": "started", "scenario": req.scenario.name, "backend": req.backend}
     except ValueError as e:
         logger.exception("Scenario validation error")
         raise HTTPException(status_code=400, detail=str(e))
@@ -157,24 +262,90 @@ async def start_generation(req: StartRequest):
 async def stop_generation():
     """Остановка генерации данных"""
     data_generator.stop()
+    async_generator.stop()
     logger.info("Generation stopped")
     return {"status": "stopped"}
 
 @app.get("/status", response_class=JSONResponse)
 async def get_status():
     """Получение статуса генератора"""
+    main_buffer = latest_data.get()
     return {
-        "is_running": data_generator.is_running(),
-        "data_points": len(latest_data),
-        "websocket_clients": len(websocket_clients)
+        "is_running": active_generator.is_running(),
+        "data_points": len(main_buffer) if main_buffer is not None else 0,
+        "data_capacity": main_buffer.capacity if main_buffer is not None else latest_data.capacity,
+        "last_seq": main_buffer.last_seq if main_buffer is not None else -1,
+        "data_sensors": latest_data.get_stats(),
+        "data_sensor_budget": {
+            "reserved": latest_data.reserved,
+            "budget": latest_data.sensor_budget,
+            "dropped_points": latest_data.dropped_points,
+        },
+        "websocket_clients": len(websocket_clients),
+        "websocket": websocket_stats(),
+        "stream": active_generator.get_stats(),
+        "wavetables": wavetable_stats(),
+        "sinks": sink_pipeline.get_stats(),
+        "mqtt": mqtt_publisher.get_stats() if mqtt_publisher is not None else None
     }
 
+@app.get("/fleet", response_class=JSONResponse)
+async def list_fleet():
+    """Список датчиков флота"""
+    result = {
+        "is_running": fleet_generator.is_running(),
+        "sensors": fleet_generator.list_sensors()
+    }
+    if isinstance(fleet_generator, ShardedFleet):
+        result["workers"] = fleet_generator.get_workers()
+    return result
+
+@app.post("/fleet/sensors", response_class=JSONResponse)
+async def add_fleet_sensor(req: FleetSensorRequest):
+    """Добавление датчика во флот"""
+    # Ошибки сценария — 400 до обращения к флоту (KeyError флота — дубликат датчика)
+    await build_scenario(req.scenario.dict())
+    try:
+        stream = fleet_generator.add_sensor(
+            req.sensor_id, req.scenario.dict(), req.frequency, req.packets
+        )
+    except KeyError:
+        raise HTTPException(status_code=409, detail=f"Sensor {req.sensor_id} already exists")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return stream.to_dict()
+
+@app.put("/fleet/sensors/{sensor_id}", response_class=JSONResponse)
+async def replace_fleet_sensor(sensor_id: str, req: FleetSensorRequest):
+    """Замена сценария/частот датчика флота без перезапуска остальных"""
+    await build_scenario(req.scenario.dict())
+    try:
+        stream = fleet_generator.replace_sensor(
+            sensor_id, req.scenario.dict(), req.frequency, req.packets
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return stream.to_dict()
+
+@app.delete("/fleet/sensors/{sensor_id}", response_class=JSONResponse)
+async def remove_fleet_sensor(sensor_id: str):
+    """Удаление датчика из флота"""
+    try:
+        fleet_generator.remove_sensor(sensor_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Sensor {sensor_id} not found")
+    # Буфер точек датчика больше не нужен: его ёмкость возвращается в бюджет флота
+    if sensor_id != latest_data.main_sensor_id:
+        latest_data.discard(sensor_id)
+    return {"status": "removed", "sensor_id": sensor_id}
+
 @app.post("/scenario/download", response_class=Response)
 async def download_scenario(scenario: ScenarioSchema):
     """
     Скачать сценарий как JSON файл и запустить генерацию данных.
     Этот эндпоинт вызывается при нажатии на кнопку "Скачать JSON и запустить".
     """
+    global active_generator
     # Проверяем валидность сценария
     if not scenario.episodes:
         raise HTTPException(status_code=400, detail="Scenario must have at least one episode")
@@ -190,7 +361,10 @@ async def download_scenario(scenario: ScenarioSchema):
         raise HTTPException(status_code=400, 
                           detail="Scenario must have either a looped episode with positive duration " 
                                 "or non-looped episodes with positive total duration")
-    
+
+    # Разбираем сценарий заранее, чтобы ошибки в формулах вернулись клиенту как 400
+    await build_scenario(scenario.dict())
+
     # Сериализация сценария в JSON
     json_bytes: bytes = json.dumps(
         scenario.dict(), ensure_ascii=False, indent=2
@@ -198,7 +372,9 @@ async def download_scenario(scenario: ScenarioSchema):
     
     headers = {"Content-Disposition": 'attachment; filename="scenario.json"'}
     
-    # Фоновая задача запуска генерации
+    # Фоновая задача запуска генерации (в потоке)
+    async_generator.stop()
+    active_generator = data_generator
     task = BackgroundTask(
         data_generator.start_stream,
         scenario_config=scenario.dict(),
@@ -215,17 +391,79 @@ async def download_scenario(scenario: ScenarioSchema):
         background=task,
     )
 
+@app.post("/scenario/preview", response_class=JSONResponse)
+async def preview_scenario(req: PreviewRequest):
+    """
+    Кривая сценария на окне [start, end] из points точек без запуска генератора
+    (произвольный доступ по времени, шум воспроизводим).
+    """
+    if req.end <= req.start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+    scenario = await build_scenario(req.scenario.dict())
+    timestamps = np.linspace(req.start, req.end, req.points)
+    values = scenario.values_at(timestamps, req.frequency)
+    return {
+        "name": scenario.name,
+        "timestamps": timestamps.tolist(),
+        "values": np.round(values, 4).tolist(),
+    }
+
+@app.post("/scenario/export")
+async def export_scenario(req: ExportRequest):
+    """
+    Рендер сценария в файл (csv/parquet/npy) без живого потока.
+    Считается кусками в пуле потоков, файл удаляется после отправки.
+    """
+    fd, path = tempfile.mkstemp(suffix=f".{req.format}", prefix="mimics-export-")
+    os.close(fd)
+    path = Path(path)
+
+    def cleanup():
+        path.unlink(missing_ok=True)
+        # У npy рядом лежит описание столбцов
+        path.with_suffix(".json").unlink(missing_ok=True)
+
+    try:
+        result = await run_in_threadpool(
+            export_scenarios,
+            {req.scenario.name: req.scenario.dict()},
+            path,
+            req.duration,
+            req.frequency,
+            fmt=req.format,
+            start=req.start,
+        )
+    except (ValueError, KeyError) as e:
+        cleanup()
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        cleanup()
+        raise HTTPException(status_code=501, detail=str(e))
+
+    logger.info(f"Exported scenario {req.scenario.name}: {result['rows']} rows ({req.format})")
+    return FileResponse(
+        path,
+        filename=f"scenario.{req.format}",
+        headers={"X-Rows": str(result["rows"])},
+        background=BackgroundTask(cleanup),
+    )
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Выполняется при завершении работы сервера"""
     # Останавливаем генерацию данных
     if data_generator.is_running():
         data_generator.stop()
+    async_generator.stop()
+    fleet_generator.stop()
     
-    # Отключаемся от MQTT брокера
-    mqtt_publisher.shutdown()
+    # Дописываем очереди приёмников и отключаемся от MQTT брокера
+    sink_pipeline.close()
+    if mqtt_publisher is not None:
+        mqtt_publisher.shutdown()
     logger.info("Server shutdown, resources cleaned up")
 
 if __name__ == "__main__":  # Для запуска без Uvicorn CLI
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # permessage-deflate включается для клиентов, которые его запрашивают
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws="websockets", ws_per_message_deflate=True)
\ No newline at end of file
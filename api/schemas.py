@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, Literal, Optional
 
 class ScenarioSchema(BaseModel):
     name: str = Field(..., example="Temperature Sensor Simulation")
@@ -9,3 +9,32 @@ class StartRequest(BaseModel):
     scenario: ScenarioSchema
     frequency: int = Field(10, gt=0, example=10)
     packets: int = Field(2, gt=0, example=2)
+    sensor_id: str = Field("mimics_v1", example="mimics_v1")
+    catch_up: Literal["burst", "skip", "coalesce"] = "burst"
+    timestamp_mode: Literal["scenario", "epoch"] = "scenario"
+    backend: Literal["thread", "asyncio"] = "thread"
+    speed: float = Field(1.0, gt=0, example=1.0)
+    unthrottled: bool = False
+    max_packets_per_sec: Optional[float] = Field(None, gt=0)
+    max_bytes_per_sec: Optional[float] = Field(None, gt=0)
+
+class ExportRequest(BaseModel):
+    scenario: ScenarioSchema
+    duration: float = Field(..., gt=0, example=3600)
+    frequency: float = Field(10, gt=0, example=1000)
+    start: float = Field(0.0, ge=0)
+    format: Literal["csv", "parquet", "npy"] = "csv"
+
+class PreviewRequest(BaseModel):
+    scenario: ScenarioSchema
+    start: float = Field(0.0, example=0)
+    end: float = Field(..., example=60)
+    points: int = Field(500, gt=1, le=20000, example=500)
+    # Частота потока: шум берётся по номеру отсчёта на её сетке
+    frequency: int = Field(10, gt=0, example=10)
+
+class FleetSensorRequest(BaseModel):
+    sensor_id: str = Field(..., example="sensor-001")
+    scenario: ScenarioSchema
+    frequency: int = Field(10, gt=0, example=10)
+    packets: int = Field(2, gt=0, example=2)
@@ -1,7 +1,23 @@
-from collections import deque
-import queue
+import asyncio
+import os
 
-# Общее хранилище данных
-latest_data = deque(maxlen=1000)
+from core.downsample import AGGREGATE_FACTORS
+from core.mqtt_client import DEFAULT_SENSOR_ID
+from core.ring_buffer import SensorRingBuffers
+
+# Общее хранилище данных: последние точки каждого датчика (16 байт на точку)
+# и уровни предагрегации для прореженных запросов. Основной поток (/start) хранит
+# MIMICS_LATEST_CAPACITY точек, остальные датчики (флот) — MIMICS_SENSOR_CAPACITY,
+# но все вместе не больше MIMICS_SENSOR_BUDGET точек. Память выделяется по мере записи
+latest_data = SensorRingBuffers(
+    DEFAULT_SENSOR_ID,
+    int(os.getenv("MIMICS_LATEST_CAPACITY", "1000000")),
+    int(os.getenv("MIMICS_SENSOR_CAPACITY", "100000")),
+    AGGREGATE_FACTORS,
+    int(os.getenv("MIMICS_SENSOR_BUDGET", "10000000")),
+)
 websocket_clients = []
-data_queue = queue.Queue()
\ No newline at end of file
+# Прореженные ленты /ws: (sensor_id, method, bucket) → GraphFeed
+graph_feeds = {}
+# Пакеты из потоков генератора для рассылки в WebSocket (кладутся через call_soon_threadsafe)
+data_queue = asyncio.Queue()
\ No newline at end of file
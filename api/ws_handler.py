@@ -1,8 +1,22 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, Query, WebSocket
 from fastapi.responses import JSONResponse
+from collections import deque
+import asyncio
+import itertools
+import json
 import logging
+import os
 import sys
+import time
 from pathlib import Path
+from typing import Literal, Optional
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него кадры кодирует стандартный json
+    orjson = None
 
 # Устанавливаем корректный путь импорта
 project_root = Path(__file__).parent.parent.absolute()
@@ -10,42 +24,319 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 # Импортируем общее состояние
-from api.shared_state import latest_data, websocket_clients, data_queue
+from api.shared_state import latest_data, websocket_clients, data_queue, graph_feeds
+from core.downsample import lttb_buckets, mean_buckets, minmax_buckets
 
 logger = logging.getLogger("WSHandler")
 
 router = APIRouter()
 
+# Очередь отправки каждого клиента и что делать, когда клиент не успевает:
+#   drop_oldest — выбросить самый старый пакет;
+#   coalesce    — оставить только последний пакет (свежий снимок);
+#   disconnect  — как drop_oldest, но отключить клиента, отстающего дольше WS_MAX_LAG секунд.
+WS_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+WS_QUEUE_SIZE = int(os.getenv("MIMICS_WS_QUEUE_SIZE", "100"))
+WS_POLICY = os.getenv("MIMICS_WS_POLICY", "drop_oldest")
+WS_MAX_LAG = float(os.getenv("MIMICS_WS_MAX_LAG", "10"))
+if WS_POLICY not in WS_POLICIES:
+    raise ValueError(f"Unknown WebSocket policy: {WS_POLICY}")
+
+_client_ids = itertools.count(1)
+
+# Сколько точек отдают /data и начальный снимок /ws по умолчанию и максимум за запрос
+LATEST_DATA_LIMIT = 1000
+LATEST_DATA_MAX_LIMIT = 1_000_000
+
+DownsampleMethod = Literal["lttb", "minmax", "mean"]
+
+
+def encode_frame(data) -> str:
+    """Пакет → текст JSON-кадра. Кодируется один раз и уходит всем клиентам как есть."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _points(timestamps: np.ndarray, values: np.ndarray) -> list:
+    return [
+        {"timestamp": timestamp, "value": value}
+        for timestamp, value in zip(timestamps.tolist(), values.tolist())
+    ]
+
+
+class GraphFeed:
+    """
+    Прореженная лента одного датчика для клиентов /ws с одинаковыми
+    (sensor_id, method, bucket): каждые bucket точек датчика дают одну точку
+    (minmax — две). Прореживание и кодирование кадра — один раз на всех
+    подписчиков ленты.
+    """
+
+    def __init__(self, sensor_id: str, method: str, bucket: int):
+        self.sensor_id = sensor_id
+        self.method = method
+        self.bucket = bucket
+        self.clients = []
+        # Накопленные точки неполной корзины
+        self._timestamps = []
+        self._values = []
+        # Последняя выданная точка: левая опора LTTB для следующих корзин
+        self._previous = None
+
+    @property
+    def key(self) -> tuple:
+        return self.sensor_id, self.method, self.bucket
+
+    def push(self, data) -> Optional[dict]:
+        """
+        Учитывает пакет своего датчика (чужие пропускает); возвращает
+        прореженный пакет, если набрались целые корзины.
+        """
+        if not isinstance(data, dict) or "packet" not in data or data.get("sensor_id") != self.sensor_id:
+            return None
+        timestamps, values = self._timestamps, self._values
+        for point in data["packet"]:
+            timestamps.append(point["timestamp"])
+            values.append(point["value"])
+        complete = len(timestamps) // self.bucket * self.bucket
+        if not complete:
+            return None
+        t = np.array(timestamps[:complete], dtype=np.float64)
+        v = np.array(values[:complete], dtype=np.float64)
+        del timestamps[:complete], values[:complete]
+
+        starts = np.arange(0, complete, self.bucket)
+        if self.method == "mean":
+            t, v = mean_buckets(t, v, starts)
+        elif self.method == "minmax":
+            t, v = minmax_buckets(t, v, starts)
+        else:
+            after = (sum(timestamps) / len(timestamps), sum(values) / len(values)) if timestamps else None
+            index = lttb_buckets(t, v, starts, before=self._previous, after=after)
+            t, v = t[index], v[index]
+            self._previous = (t[-1], v[-1])
+        return {
+            "sensor_id": self.sensor_id,
+            "packet": _points(t, v),
+            "packet_size": len(t),
+            "packet_timestamp": data.get("packet_timestamp"),
+            "downsampled": {"method": self.method, "bucket": self.bucket},
+        }
+
+
+def subscribe_feed(client: "WSClient", method: str, bucket: int) -> GraphFeed:
+    """Подписывает клиента на ленту его датчика (method, bucket), создавая её при первом подписчике."""
+    key = (client.sensor_id, method, bucket)
+    feed = graph_feeds.get(key)
+    if feed is None:
+        feed = graph_feeds[key] = GraphFeed(*key)
+    feed.clients.append(client)
+    client.feed = feed
+    return feed
+
+
+class WSClient:
+    """
+    WebSocket-клиент со своей ограниченной очередью и задачей-писателем:
+    медленный клиент копит отставание и теряет пакеты сам, не задерживая остальных.
+    Клиент получает пакеты одного датчика (sensor_id).
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        sensor_id: str,
+        queue_size: int = WS_QUEUE_SIZE,
+        policy: str = WS_POLICY
+    ):
+        self.id = next(_client_ids)
+        self.websocket = websocket
+        self.sensor_id = sensor_id
+        self.queue_size = queue_size
+        self.policy = policy
+        self.queue = deque()
+        self.sent = 0
+        self.drops = 0
+        self.lag = 0.0
+        self.behind_since = None
+        self.closed = False
+        # Прореженная лента (GraphFeed) или None — клиент получает пакеты как есть
+        self.feed = None
+        self.connected_at = time.time()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def wants(self, sensor_id: Optional[str]) -> bool:
+        """Нужен ли клиенту пакет датчика sensor_id (пакет без датчика — всем)."""
+        return sensor_id is None or sensor_id == self.sensor_id
+
+    def enqueue(self, frame: str, packet_time: float = None):
+        """
+        Ставит готовый кадр (encode_frame) в очередь клиента; вызывается из цикла
+        событий и не ждёт отправки. packet_time — packet_timestamp пакета для отставания.
+        """
+        if self.closed:
+            return
+        if len(self.queue) >= self.queue_size:
+            now = time.monotonic()
+            if self.policy == "coalesce":
+                self.drops += len(self.queue)
+                self.queue.clear()
+            else:
+                self.queue.popleft()
+                self.drops += 1
+            if self.behind_since is None:
+                self.behind_since = now
+            elif self.policy == "disconnect" and now - self.behind_since > WS_MAX_LAG:
+                logger.warning(f"WebSocket: Клиент #{self.id} отстаёт больше {WS_MAX_LAG} с, отключаем")
+                asyncio.create_task(self.close(code=1008))
+                return
+        self.queue.append((frame, packet_time))
+        self._ready.set()
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self.queue:
+                    frame, packet_time = self.queue.popleft()
+                    await self.websocket.send_text(frame)
+                    self.sent += 1
+                    if packet_time is not None:
+                        self.lag = time.time() - packet_time
+                # Очередь разобрана — клиент догнал поток
+                self._ready.clear()
+                self.behind_since = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"WebSocket: Ошибка отправки клиенту #{self.id}: {e}")
+            await self.close()
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        if self in websocket_clients:
+            websocket_clients.remove(self)
+        if self.feed is not None:
+            self.feed.clients.remove(self)
+            if not self.feed.clients:
+                graph_feeds.pop(self.feed.key, None)
+        if asyncio.current_task() is not self._writer:
+            self._writer.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def get_stats(self) -> dict:
+        # Отставание: возраст самого старого пакета в очереди, иначе — последнего отправленного
+        lag = self.lag
+        if self.queue and self.queue[0][1] is not None:
+            lag = time.time() - self.queue[0][1]
+        return {
+            "id": self.id,
+            "sensor_id": self.sensor_id,
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "drops": self.drops,
+            "lag_ms": round(lag * 1000, 3),
+            "behind_for": round(time.monotonic() - self.behind_since, 3) if self.behind_since else 0.0,
+            "connected_for": round(time.time() - self.connected_at, 3),
+            "downsampled": (
+                {"method": self.feed.method, "bucket": self.feed.bucket} if self.feed is not None else None
+            ),
+        }
+
+
+def websocket_stats() -> dict:
+    """Настройки очередей и счётчики каждого WebSocket-клиента (для /status)"""
+    return {
+        "encoder": "orjson" if orjson is not None else "json",
+        "policy": WS_POLICY,
+        "queue_size": WS_QUEUE_SIZE,
+        "max_lag": WS_MAX_LAG,
+        "feeds": len(graph_feeds),
+        "clients": [client.get_stats() for client in websocket_clients],
+    }
+
+def _empty_response(since_seq: Optional[int]) -> JSONResponse:
+    """Ответ /data для датчика, от которого ещё не было точек."""
+    last_seq = since_seq if since_seq is not None else -1
+    return JSONResponse([], headers={"X-First-Seq": "0", "X-Last-Seq": str(last_seq)})
+
 @router.get("/data")
-async def get_data():
-    """Получение последних данных через HTTP"""
-    data_list = list(latest_data)
-    logger.info(f"HTTP запрос /data - возвращаем {len(data_list)} точек")
-    if data_list:
-        logger.debug(f"Первые 3 точки: {data_list[:3]}")
-    return data_list
+async def get_data(
+    sensor_id: Optional[str] = Query(None, description="Датчик; по умолчанию — основной поток"),
+    since_seq: Optional[int] = Query(None, ge=-1, description="Вернуть точки новее этого номера"),
+    limit: int = Query(LATEST_DATA_LIMIT, gt=0, le=LATEST_DATA_MAX_LIMIT),
+    max_points: Optional[int] = Query(None, gt=1, description="Прорядить окно до этого числа точек"),
+    method: DownsampleMethod = Query("lttb", description="Метод прореживания")
+):
+    """
+    Получение последних данных через HTTP. Без since_seq — последние limit точек,
+    с since_seq — следующие limit точек после него. Номер последней отданной точки —
+    в заголовке X-Last-Seq (его передают как since_seq в следующем запросе), самой
+    старой из хранимых — в X-First-Seq (разрыв означает, что точки вытеснены).
+    С max_points окно прореживается на сервере (lttb, minmax или mean); широкие
+    окна читаются из уровней предагрегации буфера. У каждого датчика свой буфер
+    и свои номера точек.
+    """
+    buffer = latest_data.get(sensor_id)
+    if buffer is None:
+        return _empty_response(since_seq)
+    if max_points is not None and max_points < limit:
+        last_seq, timestamps, values = buffer.downsample(max_points, method, since_seq, limit)
+    else:
+        seq, timestamps, values = buffer.snapshot(since_seq, limit)
+        last_seq = int(seq[-1]) if len(seq) else None
+    data_list = _points(timestamps, values)
+    if last_seq is None or not len(timestamps):
+        last_seq = since_seq if since_seq is not None else buffer.last_seq
+    logger.debug(f"HTTP запрос /data - возвращаем {len(data_list)} точек")
+    return JSONResponse(
+        data_list,
+        headers={"X-First-Seq": str(buffer.first_seq), "X-Last-Seq": str(last_seq)}
+    )
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket для получения данных в реальном времени"""
+async def websocket_endpoint(
+    websocket: WebSocket,
+    sensor_id: Optional[str] = Query(None, description="Датчик; по умолчанию — основной поток"),
+    max_points: Optional[int] = Query(None, gt=1, description="Точек на окно графика"),
+    method: DownsampleMethod = Query("lttb", description="Метод прореживания"),
+    window: int = Query(LATEST_DATA_LIMIT, gt=0, le=LATEST_DATA_MAX_LIMIT, description="Окно графика в точках")
+):
+    """
+    WebSocket для получения данных датчика sensor_id в реальном времени.
+    С max_points клиент получает окно из window точек, прореженное до max_points,
+    и дальше — прореженную ленту с тем же шагом (window // max_points точек на корзину).
+    """
     await websocket.accept()
-    websocket_clients.append(websocket)
-    logger.info(f"WebSocket: Клиент подключен, всего клиентов: {len(websocket_clients)}")
-    
-    # Сразу отправляем текущие данные при подключении
-    if latest_data:
-        try:
-            data_list = list(latest_data)  # Создаем копию для отправки
-            logger.debug(f"Отправляем начальные данные: {len(data_list)} точек")
-            await websocket.send_json(data_list)
-            logger.info(f"WebSocket: Отправлены начальные данные клиенту ({len(data_list)} точек)")
-            if data_list:
-                logger.debug(f"Первая точка отправленных данных: {data_list[0]}")
-        except Exception as e:
-            logger.error(f"WebSocket: Ошибка отправки начальных данных: {e}")
+    client = WSClient(websocket, sensor_id or latest_data.main_sensor_id)
+    if max_points is not None:
+        bucket = window * (2 if method == "minmax" else 1) // max_points
+        if bucket > 1:
+            subscribe_feed(client, method, bucket)
+
+    # Сразу отправляем текущие данные при подключении (первыми в очереди клиента)
+    buffer = latest_data.get(client.sensor_id)
+    if buffer:
+        if client.feed is not None:
+            _, timestamps, values = buffer.downsample(max_points, method, limit=window)
+            data_list = _points(timestamps, values)
+        else:
+            data_list = buffer.to_points(limit=window)  # Копия последних точек
+        client.enqueue(encode_frame(data_list))
+        logger.info(f"WebSocket: Начальные данные поставлены клиенту #{client.id} ({len(data_list)} точек)")
     else:
         logger.warning("WebSocket: Нет данных для отправки новому клиенту")
-    
+
+    websocket_clients.append(client)
+    logger.info(f"WebSocket: Клиент #{client.id} подключен, всего клиентов: {len(websocket_clients)}")
+
     try:
         while True:
             # Поддерживаем соединение
@@ -53,6 +344,5 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket: Ошибка соединения: {e}")
     finally:
-        if websocket in websocket_clients:
-            websocket_clients.remove(websocket)
-            logger.info(f"WebSocket: Клиент отключен, осталось клиентов: {len(websocket_clients)}")
\ No newline at end of file
+        await client.close()
+        logger.info(f"WebSocket: Клиент #{client.id} отключен, осталось клиентов: {len(websocket_clients)}")
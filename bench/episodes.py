@@ -0,0 +1,86 @@
+"""
+Поиск активного эпизода в длинном сценарии: bisect по предрасчитанным
+границам (Scenario) против прежнего линейного прохода по эпизодам.
+Замеряется get_value + advance_time в начале, в середине сценария и на
+зацикленном хвосте, а также get_values на пакет.
+
+    python -m bench.episodes --episodes 10000
+"""
+import time
+import argparse
+
+from core.primitives import ConstantPrimitive
+from core.scenario import Episode, Scenario
+
+EPISODE_DURATION = 1.0
+
+
+def build_scenario(episodes: int) -> Scenario:
+    """episodes коротких эпизодов-констант и зацикленный хвост."""
+    items = [Episode(ConstantPrimitive(float(i)), EPISODE_DURATION) for i in range(episodes)]
+    items.append(Episode(ConstantPrimitive(-1.0), EPISODE_DURATION, is_looped=True))
+    return Scenario("Episodes benchmark", items)
+
+
+def linear_value(scenario: Scenario) -> float:
+    """get_value() с линейным поиском эпизода (реализация до bisect)."""
+    time_accumulator = 0.0
+    for episode in scenario.episodes:
+        if scenario.current_time < time_accumulator + episode.duration or episode.is_looped:
+            relative_time = (scenario.current_time - time_accumulator) % episode.duration
+            return episode.primitive.generate(relative_time)
+        time_accumulator += episode.duration
+    return 0.0
+
+
+def _samples_per_sec(scenario: Scenario, start: float, samples: int, dt: float, value) -> float:
+    scenario.current_time = start
+    started = time.perf_counter()
+    for _ in range(samples):
+        value(scenario)
+        scenario.advance_time(dt)
+    return samples / (time.perf_counter() - started)
+
+
+def benchmark_episodes(episodes: int = 10_000, samples: int = 20_000, packet: int = 500, dt: float = 0.01) -> dict:
+    """Отсчётов/с (bisect и линейный поиск) в нескольких точках сценария и время пакета get_values."""
+    scenario = build_scenario(episodes)
+    positions = {
+        "start": 10 * EPISODE_DURATION,
+        "middle": episodes // 2 * EPISODE_DURATION,
+        "looped": (episodes + 10) * EPISODE_DURATION,
+    }
+    result = {"episodes": episodes, "positions": {}}
+    for name, start in positions.items():
+        # Линейный проход медленный: ему хватает меньшего числа отсчётов
+        result["positions"][name] = {
+            "bisect": _samples_per_sec(scenario, start, samples, dt, Scenario.get_value),
+            "linear": _samples_per_sec(scenario, start, max(1, samples // 10), dt, linear_value),
+        }
+
+    scenario.current_time = positions["middle"]
+    packets = max(1, samples // packet)
+    started = time.perf_counter()
+    for _ in range(packets):
+        scenario.get_values(packet, dt)
+    result["get_values_ms"] = (time.perf_counter() - started) / packets * 1000
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.episodes",
+        description="Отсчётов/с get_value + advance_time в длинном сценарии: bisect и линейный поиск"
+    )
+    parser.add_argument("--episodes", type=int, default=10_000)
+    parser.add_argument("--samples", type=int, default=20_000)
+    parser.add_argument("--packet", type=int, default=500)
+    args = parser.parse_args()
+    result = benchmark_episodes(args.episodes, args.samples, args.packet)
+    print(f"{result['episodes']} episodes")
+    for name, rates in result["positions"].items():
+        print(
+            f"  {name:<8} bisect {rates['bisect']:>12,.0f} samples/s"
+            f"   linear {rates['linear']:>12,.0f} samples/s"
+        )
+    print(f"  get_values({args.packet}): {result['get_values_ms']:.3f} ms per packet")
@@ -0,0 +1,79 @@
+"""
+Пропускная способность ShardedFleet в зависимости от числа процессов-воркеров.
+
+Воркеры собирают и кодируют пакеты, родитель только пересылает байты в
+SinkPipeline с NullSink. Датчиков с запасом больше, чем успевает один
+процесс; catch_up=skip, поэтому размер пакета не растёт при отставании и
+пакеты/с — честная мера производительности.
+
+    python -m bench.fleet_workers --workers 1 2 4 --sensors 500 --duration 5
+"""
+import time
+import argparse
+
+from core.fleet_pool import ShardedFleet
+from core.sinks import SinkPipeline, NullSink
+
+SCENARIO = {
+    "name": "Fleet benchmark",
+    "episodes": [
+        {
+            "primitive_type": "formula",
+            "config": {"expression": "A * math.sin(2 * math.pi * t / period) + B", "variables": {"A": 2.5, "B": 22.5, "period": 10.0}},
+            "duration": 30.0,
+            "is_looped": True
+        }
+    ]
+}
+
+
+def benchmark_workers(
+    workers: int,
+    sensors: int = 500,
+    frequency_hz: int = 1000,
+    packets_per_sec: int = 100,
+    duration: float = 5.0,
+    warmup: float = 2.0
+) -> dict:
+    """Пакетов/с, дошедших до приёмника, при workers воркерах (после прогрева warmup секунд)."""
+    pipeline = SinkPipeline([NullSink()], queue_size=100_000)
+    fleet = ShardedFleet(pipeline, workers, catch_up="skip")
+    for k in range(sensors):
+        fleet.add_sensor(f"bench_{k}", SCENARIO, frequency_hz, packets_per_sec)
+    fleet.start()
+    try:
+        time.sleep(warmup)
+        start_packets = pipeline.get_stats()["null"]["packets"]
+        started = time.monotonic()
+        time.sleep(duration)
+        packets = pipeline.get_stats()["null"]["packets"] - start_packets
+        elapsed = time.monotonic() - started
+    finally:
+        fleet.stop()
+        pipeline.close()
+    pps = packets / elapsed
+    return {
+        "workers": workers,
+        "offered_pps": sensors * packets_per_sec,
+        "packets_per_sec": pps,
+        "points_per_sec": pps * frequency_hz / packets_per_sec,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.fleet_workers",
+        description="Пакеты/с ShardedFleet в зависимости от числа воркеров"
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sensors", type=int, default=500)
+    parser.add_argument("--frequency", type=int, default=1000, help="Отсчётов/с на датчик")
+    parser.add_argument("--packets", type=int, default=100, help="Пакетов/с на датчик")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    for n in args.workers:
+        result = benchmark_workers(n, args.sensors, args.frequency, args.packets, args.duration)
+        print(
+            f"{result['workers']} workers: {result['packets_per_sec']:,.0f} packets/s "
+            f"({result['points_per_sec']:,.0f} points/s, offered {result['offered_pps']:,} packets/s)"
+        )
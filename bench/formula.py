@@ -0,0 +1,66 @@
+"""
+Скорость формулы: eval строки на каждый отсчёт (как было до компиляции),
+скомпилированная lambda (generate) и векторный путь NumPy (generate_batch).
+
+    python -m bench.formula --samples 200000
+"""
+import math
+import time
+import argparse
+
+import numpy as np
+
+from core.primitives.formula import FormulaPrimitive, SAFE_BUILTINS
+
+EXPRESSION = "A * math.sin(2 * math.pi * t / period) + B"
+VARIABLES = {"A": 2.5, "B": 22.5, "period": 10.0}
+
+
+def benchmark_formula(samples: int = 200_000, expression: str = EXPRESSION, variables: dict = None) -> dict:
+    """Отсчётов/с для каждого способа вычисления формулы."""
+    variables = VARIABLES if variables is None else variables
+    t = np.arange(samples, dtype=np.float64) * 0.001
+    points = t.tolist()
+    primitive = FormulaPrimitive(expression, variables)
+    namespace = {"__builtins__": {}, "math": math, **SAFE_BUILTINS, **variables}
+
+    started = time.perf_counter()
+    for x in points:
+        eval(expression, {**namespace, "t": x})
+    per_sample_eval = samples / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for x in points:
+        primitive.generate(x)
+    compiled = samples / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    primitive.generate_batch(t)
+    batch = samples / (time.perf_counter() - started)
+
+    return {
+        "expression": expression,
+        "vectorized": primitive.vectorized,
+        "eval_per_sample": per_sample_eval,
+        "compiled": compiled,
+        "batch": batch,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.formula",
+        description="Отсчётов/с формулы: eval на отсчёт, скомпилированная lambda, NumPy"
+    )
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--expression", default=EXPRESSION)
+    args = parser.parse_args()
+    variables = VARIABLES if args.expression == EXPRESSION else {}
+    result = benchmark_formula(args.samples, args.expression, variables)
+    print(f"{result['expression']}")
+    print(f"  eval per sample:  {result['eval_per_sample']:>14,.0f} samples/s")
+    print(f"  compiled lambda:  {result['compiled']:>14,.0f} samples/s")
+    print(
+        f"  generate_batch:   {result['batch']:>14,.0f} samples/s"
+        f" ({'NumPy' if result['vectorized'] else 'per sample'})"
+    )
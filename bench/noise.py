@@ -0,0 +1,48 @@
+"""
+Скорость шума: прежний глобальный генератор (random.normalvariate на отсчёт,
+np.random.standard_normal на пакет) против собственного генератора
+NoisePrimitive с буфером для поштучного пути и одним вызовом на пакет.
+
+    python -m bench.noise --samples 1000000 --packet 500
+"""
+import time
+import random
+import argparse
+
+import numpy as np
+
+from core.primitives import NoisePrimitive
+
+
+def _rate(samples: int, step: int, call) -> float:
+    started = time.perf_counter()
+    for _ in range(samples // step):
+        call()
+    return samples // step * step / (time.perf_counter() - started)
+
+
+def benchmark_noise(samples: int = 1_000_000, packet: int = 500) -> dict:
+    """Отсчётов/с поштучно и пакетами по packet отсчётов."""
+    primitive = NoisePrimitive(20.0, 0.5, seed=1)
+    t = np.zeros(packet)
+    return {
+        "scalar_global": _rate(samples, 1, lambda: 20.0 + 0.5 * random.normalvariate(0, 1)),
+        "scalar": _rate(samples, 1, lambda: primitive.generate(0.0)),
+        "batch_global": _rate(samples, packet, lambda: 20.0 + 0.5 * np.random.standard_normal(packet)),
+        "batch": _rate(samples, packet, lambda: primitive.generate_batch(t)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.noise",
+        description="Отсчётов/с шума: глобальный генератор и генератор NoisePrimitive"
+    )
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--packet", type=int, default=500)
+    args = parser.parse_args()
+    result = benchmark_noise(args.samples, args.packet)
+    print(f"  scalar, global random:   {result['scalar_global']:>14,.0f} samples/s")
+    print(f"  scalar, NoisePrimitive:  {result['scalar']:>14,.0f} samples/s")
+    print(f"  batch {args.packet}, np.random:   {result['batch_global']:>14,.0f} samples/s")
+    print(f"  batch {args.packet}, NoisePrimitive: {result['batch']:>11,.0f} samples/s")
@@ -0,0 +1,67 @@
+"""
+Сериализация пакета при рассылке в WebSocket: на каждого клиента против
+одного кадра api.ws_handler.encode_frame на пакет.
+
+    python -m bench.ws_fanout --clients 500
+"""
+import json
+import time
+import argparse
+from collections import deque
+
+from api.ws_handler import encode_frame, orjson
+
+
+def benchmark_fanout(clients: int = 500, packets: int = 200, points: int = 10) -> dict:
+    """
+    Процессорное время сериализации на пакет при рассылке clients клиентам:
+    send_json на каждого клиента против одного encode_frame на пакет.
+    """
+    start = time.time()
+    payloads = [
+        {
+            "sensor_id": "mimics_v1",
+            "packet": [{"value": round(20 + 0.01 * i, 4), "timestamp": start + (k * points + i) * 0.01} for i in range(points)],
+            "packet_size": points,
+            "packet_timestamp": start + k * points * 0.01,
+        }
+        for k in range(packets)
+    ]
+    queues = [deque(maxlen=packets) for _ in range(clients)]
+    started = time.process_time()
+    for payload in payloads:
+        for queue in queues:
+            # Как starlette WebSocket.send_json: свой json.dumps на каждого клиента
+            queue.append(json.dumps(payload, separators=(",", ":"), ensure_ascii=False))
+    per_client = (time.process_time() - started) / packets
+    started = time.process_time()
+    for payload in payloads:
+        frame = encode_frame(payload)
+        for queue in queues:
+            queue.append(frame)
+    once = (time.process_time() - started) / packets
+    return {
+        "clients": clients,
+        "points": points,
+        "encoder": "orjson" if orjson is not None else "json",
+        "per_client_us": per_client * 1e6,
+        "encode_once_us": once * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.ws_fanout",
+        description="Сериализация пакета при рассылке в WebSocket: на каждого клиента и один раз"
+    )
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--packets", type=int, default=200)
+    parser.add_argument("--points", type=int, default=10, help="Точек в пакете")
+    args = parser.parse_args()
+    result = benchmark_fanout(args.clients, args.packets, args.points)
+    print(
+        f"{result['clients']} clients, {result['points']} points/packet: "
+        f"send_json per client {result['per_client_us']:,.0f} µs/packet, "
+        f"encode once ({result['encoder']}) {result['encode_once_us']:,.1f} µs/packet "
+        f"(x{result['per_client_us'] / max(result['encode_once_us'], 1e-9):,.0f})"
+    )
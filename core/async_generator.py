@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Dict, Union
+
+from .mqtt_client import DEFAULT_SENSOR_ID
+from .data_generator import DataGenerator
+from .scenario import Scenario
+
+logger = logging.getLogger("AsyncGenerator")
+
+
+class AsyncDataGenerator(DataGenerator):
+    """
+    Генератор, работающий задачей asyncio в цикле событий сервера.
+    Паблишер асинхронный: publish_packet ожидается (await), поэтому пакеты
+    уходят в WebSocket без потока, очереди и опроса.
+    Сборка пакетов и расписание общие с DataGenerator — вывод совпадает.
+    """
+
+    backend = "asyncio"
+
+    def __init__(self, publisher):
+        super().__init__(publisher)
+        self.task = None
+
+    def start_stream(
+        self,
+        scenario_config: Union[Dict, str, Scenario],
+        frequency_hz: int = 10,
+        packets_per_sec: int = 2,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        catch_up: str = "burst",
+        timestamp_mode: str = "scenario",
+        speed: float = 1.0,
+        unthrottled: bool = False,
+        max_packets_per_sec: float = None,
+        max_bytes_per_sec: float = None
+    ):
+        """Запускает задачу генерации в текущем цикле событий (параметры как у DataGenerator)."""
+        if self.is_running():
+            self.stop()
+
+        self._configure(
+            scenario_config, frequency_hz, packets_per_sec, sensor_id, catch_up, timestamp_mode,
+            speed, unthrottled, max_packets_per_sec, max_bytes_per_sec
+        )
+
+        self._stop_event.clear()
+        self.task = asyncio.get_running_loop().create_task(self._generation_loop_async())
+        logger.info(f"Generator: Started asyncio streaming at {frequency_hz}Hz ({packets_per_sec} pps)")
+
+    async def _generation_loop_async(self):
+        """Цикл, собирающий и публикующий пакеты, пока не вызовут stop()."""
+        self._reset_clock()
+        try:
+            while not self._stop_event.is_set():
+                packet, target_time = self._next_packet()
+
+                nbytes = None
+                if packet:
+                    logger.debug(f"Generator: Packet generated: {packet}")
+                    nbytes = await self.mqtt_publisher.publish_packet(
+                        packet, target_time, self.sensor_id, block=self._block()
+                    )
+
+                # Без паузы (unthrottled) всё равно отдаём управление циклу событий
+                await asyncio.sleep(max(0.0, self._delay_after(packet, nbytes)))
+        finally:
+            logger.info("Generator: Stopped asyncio streaming")
+
+    def stop(self):
+        """Останавливает задачу генерации."""
+        self._stop_event.set()
+        if self.task and not self.task.done():
+            self.task.cancel()
+        logger.info("Generator: Stop requested")
+
+    def is_running(self) -> bool:
+        return bool(self.task and not self.task.done())
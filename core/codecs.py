@@ -0,0 +1,204 @@
+"""
+Кодеки «обёртки» пакета для MQTT.
+
+    json      — как раньше: список {"value", "timestamp"} на каждую точку;
+    columnar  — JSON со столбцами timestamps и values (ключи не повторяются);
+    msgpack   — те же столбцы в MessagePack (нужен пакет msgpack);
+    binary    — заголовок + разности меток времени (float32) + значения float64;
+    binary32  — то же со значениями float32.
+
+Кодек объявляется в топике: для json топик не меняется, для остальных к нему
+добавляется /<кодек> (mimics/sensor_data/binary). Бинарный формат начинается
+с сигнатуры MIMC, поэтому его можно отличить и без топика.
+
+Точность: json, columnar и msgpack передают числа без потерь. В binary/binary32
+метка первой точки хранится точно (float64), остальные — разностями float32:
+каждая разность округляется с относительной ошибкой до 2^-24, поэтому метка
+точки отличается от исходной не больше чем на ~6e-8 длительности пакета
+(60 нс на секунду пакета). Значения binary — float64 без потерь, binary32 —
+float32 (~7 значащих цифр; при значениях до ~100 это ниже округления пакета
+до 4 знаков).
+
+Сравнение размеров и времени кодирования:
+
+    python -m core.codecs --points 100 --packets 2000
+"""
+import sys
+import json
+import time
+import struct
+import argparse
+from typing import Any, Dict, List
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack необязателен: без него недоступен только кодек msgpack
+    msgpack = None
+
+PAYLOAD_CODECS = ("json", "columnar", "msgpack", "binary", "binary32")
+
+# Заголовок binary: сигнатура, версия, флаги, длина sensor_id, число точек,
+# packet_timestamp и метка первой точки (little-endian)
+BINARY_MAGIC = b"MIMC"
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct("<4sBBHIdd")
+_FLAG_FLOAT32 = 0x01
+
+
+def codec_topic(topic: str, codec: str) -> str:
+    """Топик, в котором публикуются пакеты этого кодека."""
+    return topic if codec == "json" else f"{topic}/{codec}"
+
+
+def check_codec(codec: str):
+    """ValueError для неизвестного кодека, RuntimeError — если нет его зависимости."""
+    if codec not in PAYLOAD_CODECS:
+        raise ValueError(f"Unknown payload codec: {codec}")
+    if codec == "msgpack" and msgpack is None:
+        raise RuntimeError("msgpack codec requires the msgpack package")
+
+
+def _columns(payload: Dict[str, Any]) -> Dict[str, Any]:
+    packet = payload["packet"]
+    return {
+        "sensor_id": payload["sensor_id"],
+        "packet_size": payload["packet_size"],
+        "packet_timestamp": payload["packet_timestamp"],
+        "timestamps": [point["timestamp"] for point in packet],
+        "values": [point["value"] for point in packet],
+    }
+
+
+def _from_columns(columns: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "sensor_id": columns["sensor_id"],
+        "packet": [
+            {"value": value, "timestamp": timestamp}
+            for timestamp, value in zip(columns["timestamps"], columns["values"])
+        ],
+        "packet_size": columns["packet_size"],
+        "packet_timestamp": columns["packet_timestamp"],
+    }
+
+
+def _encode_binary(payload: Dict[str, Any], float32: bool) -> bytes:
+    packet = payload["packet"]
+    n = len(packet)
+    timestamps = np.fromiter((point["timestamp"] for point in packet), dtype=np.float64, count=n)
+    values = np.fromiter((point["value"] for point in packet), dtype=np.float64, count=n)
+    sensor_id = payload["sensor_id"].encode("utf-8")
+    header = _BINARY_HEADER.pack(
+        BINARY_MAGIC, BINARY_VERSION, _FLAG_FLOAT32 if float32 else 0, len(sensor_id), n,
+        payload["packet_timestamp"], timestamps[0] if n else 0.0
+    )
+    deltas = np.diff(timestamps).astype("<f4")
+    return b"".join((
+        header, sensor_id, deltas.tobytes(), values.astype("<f4" if float32 else "<f8").tobytes()
+    ))
+
+
+def _decode_binary(data: bytes) -> Dict[str, Any]:
+    magic, version, flags, id_len, n, packet_time, first = _BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not a binary MIMICS packet")
+    offset = _BINARY_HEADER.size
+    sensor_id = data[offset:offset + id_len].decode("utf-8")
+    offset += id_len
+    deltas = np.frombuffer(data, dtype="<f4", count=max(n - 1, 0), offset=offset)
+    offset += deltas.nbytes
+    values = np.frombuffer(data, dtype="<f4" if flags & _FLAG_FLOAT32 else "<f8", count=n, offset=offset)
+    timestamps = first + np.concatenate(([0.0], np.cumsum(deltas, dtype=np.float64)))[:n]
+    return _from_columns({
+        "sensor_id": sensor_id,
+        "packet_size": n,
+        "packet_timestamp": packet_time,
+        "timestamps": timestamps.tolist(),
+        "values": values.astype(np.float64).tolist(),
+    })
+
+
+def encode_payload(payload: Dict[str, Any], codec: str = "json") -> bytes:
+    """«Обёртка» пакета (build_payload) → байты сообщения."""
+    check_codec(codec)
+    if codec == "json":
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    if codec == "columnar":
+        return json.dumps(_columns(payload), ensure_ascii=False).encode("utf-8")
+    if codec == "msgpack":
+        return msgpack.packb(_columns(payload), use_single_float=False)
+    return _encode_binary(payload, float32=codec == "binary32")
+
+
+def decode_payload(data: bytes, codec: str = "json") -> Dict[str, Any]:
+    """
+    Байты сообщения → «обёртка» пакета. Для json, columnar и msgpack — в исходном
+    виде; для binary/binary32 метки времени и значения — с точностью кодека
+    (см. описание модуля).
+    """
+    check_codec(codec)
+    if codec == "json":
+        return json.loads(data)
+    if codec == "columnar":
+        return _from_columns(json.loads(data))
+    if codec == "msgpack":
+        return _from_columns(msgpack.unpackb(data))
+    return _decode_binary(data)
+
+
+def benchmark(points: int = 100, packets: int = 2000) -> List[Dict[str, Any]]:
+    """Время кодирования и байты на отсчёт для каждого доступного кодека."""
+    rng = np.random.default_rng(0)
+    start = time.time()
+    payloads = [
+        {
+            "sensor_id": "mimics_v1",
+            "packet": [
+                {"value": round(float(v), 4), "timestamp": start + (k * points + i) * 0.01}
+                for i, v in enumerate(20 + 5 * rng.standard_normal(points))
+            ],
+            "packet_size": points,
+            "packet_timestamp": start + k * points * 0.01,
+        }
+        for k in range(packets)
+    ]
+    results = []
+    for codec in PAYLOAD_CODECS:
+        if codec == "msgpack" and msgpack is None:
+            continue
+        started = time.perf_counter()
+        nbytes = sum(len(encode_payload(payload, codec)) for payload in payloads)
+        seconds = time.perf_counter() - started
+        results.append({
+            "codec": codec,
+            "bytes_per_sample": nbytes / (points * packets),
+            "encode_us_per_packet": seconds / packets * 1e6,
+        })
+    return results
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m core.codecs",
+        description="Сравнение кодеков пакета: байты на отсчёт и время кодирования"
+    )
+    parser.add_argument("--points", type=int, default=100, help="Точек в пакете")
+    parser.add_argument("--packets", type=int, default=2000, help="Пакетов в замере")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.points, args.packets)
+    baseline = results[0]["bytes_per_sample"]
+    print(f"{'codec':<10} {'bytes/sample':>13} {'ratio':>7} {'encode µs/packet':>17}")
+    for row in results:
+        print(
+            f"{row['codec']:<10} {row['bytes_per_sample']:>13.2f} "
+            f"{row['bytes_per_sample'] / baseline:>7.2f} {row['encode_us_per_packet']:>17.1f}"
+        )
+    if msgpack is None:
+        print("msgpack: skipped (package not installed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
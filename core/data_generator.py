@@ -1,87 +1,214 @@
-import time
 import json
+import time
 import logging
 from threading import Thread, Event
-from typing import Dict, Union, List
+from typing import Dict, Union, List, Tuple, Optional
 
-from .mqtt_client import MQTTPublisher
+from .mqtt_client import DEFAULT_SENSOR_ID
 from .scenario import Scenario
+from .scheduling import PacketClock, RateLimiter, ThroughputMeter, TIMESTAMP_MODES
 
 logger = logging.getLogger("Generator")
 
+
+def build_packet(packet_start: float, values, time_step: float) -> List[Dict[str, float]]:
+    """Собирает пакет точек из массива значений"""
+    return [
+        {"value": round(value, 4), "timestamp": packet_start + i * time_step}
+        for i, value in enumerate(values.tolist())
+    ]
+
+
+def load_scenario(config: Union[Dict, str, Scenario]) -> Scenario:
+    """Преобразует JSON-конфиг (словарь или путь к файлу) в объект Scenario."""
+    if isinstance(config, Scenario):
+        return config
+    if isinstance(config, str):
+        with open(config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    return Scenario.from_json(config)
+
+
+def check_stream_params(frequency_hz: int, packets_per_sec: int, timestamp_mode: str = "scenario", speed: float = 1.0):
+    """ValueError для параметров потока, с которыми генератор не запустится."""
+    if frequency_hz <= 0 or packets_per_sec <= 0:
+        raise ValueError("frequency_hz and packets_per_sec must be positive")
+    if frequency_hz % packets_per_sec != 0:
+        raise ValueError("frequency_hz must be divisible by packets_per_sec")
+    if timestamp_mode not in TIMESTAMP_MODES:
+        raise ValueError(f"Unknown timestamp mode: {timestamp_mode}")
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+
+
 class DataGenerator:
-    def __init__(self, mqtt_publisher: MQTTPublisher):
+    backend = "thread"
+
+    def __init__(self, mqtt_publisher):
+        # Любой объект с publish_packet: MQTTPublisher, SinkPipeline и т.п.
         self.mqtt_publisher = mqtt_publisher
         self._stop_event = Event()
         self.thread = None
         self.current_scenario = None
+        self.sensor_id = DEFAULT_SENSOR_ID
+        self.clock = None
+        self.speed = 1.0
+        self.unthrottled = False
+        self.rate_limiter = None
+        self.throughput = None
 
     def start_stream(
         self,
-        scenario_config: Union[Dict, str],
+        scenario_config: Union[Dict, str, Scenario],
         frequency_hz: int = 10,
-        packets_per_sec: int = 2
+        packets_per_sec: int = 2,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        catch_up: str = "burst",
+        timestamp_mode: str = "scenario",
+        speed: float = 1.0,
+        unthrottled: bool = False,
+        max_packets_per_sec: float = None,
+        max_bytes_per_sec: float = None
     ):
-        """Запускает поток генерации в фоне."""
+        """
+        Запускает поток генерации в фоне.
+        catch_up — политика при отставании от расписания (burst/skip/coalesce),
+        timestamp_mode — метки точек во времени сценария или в unix-времени,
+        speed — ускорение времени сценария относительно реального (100 = в 100 раз),
+        unthrottled — генерировать без пауз, насколько успевают получатели,
+        max_packets_per_sec / max_bytes_per_sec — потолок скорости (ведро токенов).
+        """
         # Если старый поток ещё жив — останавливаем
         if self.thread and self.thread.is_alive():
             self.stop()
 
-        if frequency_hz % packets_per_sec != 0:
-            raise ValueError("frequency_hz must be divisible by packets_per_sec")
-
-        # Загружаем сценарий
-        self.current_scenario = self._load_scenario(scenario_config)
-        values_per_packet = frequency_hz // packets_per_sec
-        time_step = 1.0 / frequency_hz
-        packet_interval = 1.0 / packets_per_sec
+        self._configure(
+            scenario_config, frequency_hz, packets_per_sec, sensor_id, catch_up, timestamp_mode,
+            speed, unthrottled, max_packets_per_sec, max_bytes_per_sec
+        )
 
         # Сбрасываем флаг и запускаем поток
         self._stop_event.clear()
-        self.thread = Thread(
-            target=self._generation_loop,
-            args=(values_per_packet, time_step, packet_interval),
-            daemon=True
-        )
+        self.thread = Thread(target=self._generation_loop, daemon=True)
         self.thread.start()
         logger.info(f"Generator: Started streaming at {frequency_hz}Hz ({packets_per_sec} pps)")
 
-    def _load_scenario(self, config: Union[Dict, str]) -> Scenario:
-        """Преобразует JSON-конфиг в объект Scenario."""
-        if isinstance(config, str):
-            with open(config, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-        return Scenario.from_json(config)
+    def _configure(
+        self,
+        scenario_config: Union[Dict, str, Scenario],
+        frequency_hz: int,
+        packets_per_sec: int,
+        sensor_id: str,
+        catch_up: str,
+        timestamp_mode: str,
+        speed: float = 1.0,
+        unthrottled: bool = False,
+        max_packets_per_sec: float = None,
+        max_bytes_per_sec: float = None
+    ):
+        """Проверяет параметры и готовит сценарий и расписание нового потока."""
+        check_stream_params(frequency_hz, packets_per_sec, timestamp_mode, speed)
 
-    def _generation_loop(self, values_per_packet: int, time_step: float, packet_interval: float):
+        # Загружаем сценарий
+        self.current_scenario = self._load_scenario(scenario_config)
+        self.sensor_id = sensor_id
+        self.values_per_packet = frequency_hz // packets_per_sec
+        self.time_step = 1.0 / frequency_hz
+        self.current_scenario.prepare_wavetables(self.time_step)
+        # При ускорении реальный период пакета короче в speed раз,
+        # а шаг времени сценария внутри пакета не меняется
+        self.clock = PacketClock(1.0 / packets_per_sec / speed, catch_up)
+        self.timestamp_mode = timestamp_mode
+        self.speed = speed
+        self.unthrottled = unthrottled
+        if max_packets_per_sec or max_bytes_per_sec:
+            self.rate_limiter = RateLimiter(max_packets_per_sec, max_bytes_per_sec)
+        else:
+            self.rate_limiter = None
+        self.throughput = ThroughputMeter()
+
+    def _load_scenario(self, config: Union[Dict, str, Scenario]) -> Scenario:
+        """Преобразует JSON-конфиг в объект Scenario."""
+        return load_scenario(config)
+
+    def _reset_clock(self):
+        """Привязывает расписание к текущему моменту перед первым пакетом."""
+        self.clock.reset()
+        # Для меток в unix-времени: момент, соответствующий нулю времени сценария
+        self._epoch_start = self.clock.to_epoch(self.clock.next_due) - self.current_scenario.current_time
+
+    def _next_packet(self) -> Tuple[List[Dict[str, float]], float]:
+        """
+        Собирает пакет, срок которого наступил, с учётом политики догоняния.
+        Возвращает (пакет, целевое unix-время пакета) и сдвигает расписание.
+        """
+        clock = self.clock
+        scenario = self.current_scenario
+        if self.unthrottled:
+            # Без расписания: темп задаёт публикация (ждёт места у получателей),
+            # метка пакета — момент сборки
+            periods, skipped = 1, 0
+            clock.next_due = time.monotonic()
+        else:
+            periods, skipped = clock.tick()
+        if skipped:
+            # Пропущенные пакеты выбрасываем, но время сценария идёт дальше
+            scenario.advance_time(skipped * self.values_per_packet * self.time_step)
+            clock.advance(skipped)
+        target_time = clock.to_epoch(clock.next_due)
+
+        # Весь пакет считается одним пакетным вызовом сценария
+        packet_start = scenario.current_time
+        values = scenario.get_values(periods * self.values_per_packet, self.time_step)
+        if self.timestamp_mode == "epoch":
+            packet_start += self._epoch_start
+        clock.advance(periods)
+        return build_packet(packet_start, values, self.time_step), target_time
+
+    def _generation_loop(self):
         """Цикл, собирающий и публикующий пакеты, пока не вызовут stop()."""
-        next_packet_time = time.time()
+        self._reset_clock()
 
         while not self._stop_event.is_set():
-            packet = []
-            packet_start = self.current_scenario.current_time
-
-            for i in range(values_per_packet):
-                if self._stop_event.is_set():
-                    break
-                value = self.current_scenario.get_value()
-                packet.append({
-                    "value": round(value, 4),
-                    "timestamp": packet_start + i * time_step
-                })
-                self.current_scenario.advance_time(time_step)
+            packet, target_time = self._next_packet()
 
+            nbytes = None
             if packet:
                 logger.debug(f"Generator: Packet generated: {packet}")
-                self.mqtt_publisher.publish_packet(packet, next_packet_time)
+                nbytes = self.mqtt_publisher.publish_packet(
+                    packet, target_time, self.sensor_id, block=self._block()
+                )
 
-            next_packet_time += packet_interval
-            sleep_time = next_packet_time - time.time()
+            sleep_time = self._delay_after(packet, nbytes)
             if sleep_time > 0:
-                time.sleep(sleep_time)
+                self._stop_event.wait(sleep_time)
 
         logger.info("Generator: Stopped streaming")
 
+    def _block(self) -> Optional[bool]:
+        """
+        Без расписания темп задают получатели: паблишер ждёт места в их очередях
+        (политика block), а не теряет пакеты. С расписанием — политика паблишера.
+        """
+        return True if self.unthrottled else None
+
+    def _delay_after(self, packet: List[Dict[str, float]], nbytes: Optional[int]) -> float:
+        """
+        Учитывает пакет в статистике и возвращает паузу до следующего: по
+        расписанию и (или) по ограничителю скорости. nbytes — размер, который
+        вернул паблишер; None — пакет не принят (выброшен приёмником) и в
+        пропускную способность не входит.
+        """
+        if packet:
+            if nbytes is None:
+                self.throughput.record_drop()
+            else:
+                self.throughput.record(len(packet), nbytes)
+        delay = 0.0 if self.unthrottled else self.clock.time_until_due()
+        if self.rate_limiter is not None and packet:
+            delay = max(delay, self.rate_limiter.consume(1, nbytes or 0))
+        return delay
+
     def stop(self):
         """Устанавливает флаг остановки и ждёт завершения потока."""
         self._stop_event.set()
@@ -92,3 +219,20 @@ class DataGenerator:
     def is_running(self) -> bool:
         """Проверяет, жив ли поток генерации."""
         return bool(self.thread and self.thread.is_alive())
+
+    def get_stats(self) -> Dict:
+        """Статистика планирования текущего потока (джиттер, перегрузки)."""
+        if self.clock is None:
+            return {}
+        return {
+            "sensor_id": self.sensor_id,
+            "backend": self.backend,
+            "catch_up": self.clock.catch_up,
+            "timestamp_mode": self.timestamp_mode,
+            "speed": self.speed,
+            "unthrottled": self.unthrottled,
+            "rate_limit": self.rate_limiter.to_dict() if self.rate_limiter else None,
+            "scenario_time": self.current_scenario.current_time,
+            "throughput": self.throughput.to_dict(),
+            **self.clock.stats.to_dict()
+        }
@@ -0,0 +1,314 @@
+"""
+Прореживание рядов для графиков: на выходе не больше max_points точек.
+
+    lttb   — Largest-Triangle-Three-Buckets: из каждой корзины точка с наибольшей
+             площадью треугольника с соседними корзинами (форма кривой);
+    minmax — минимум и максимум каждой корзины (выбросы не теряются);
+    mean   — среднее по корзине.
+
+Все методы считаются над массивами NumPy без цикла по корзинам. В LTTB
+опорная точка слева — среднее предыдущей корзины, а не выбранная в ней
+точка: так корзины независимы и считаются разом (на графиках неотличимо).
+
+AggregateLevel — уровень предагрегации кольцевого буфера: на каждую корзину
+из factor точек хранит сумму, число, минимум и максимум (с метками времени).
+Уровни обновляются при каждой записи, поэтому широкое окно (часы при
+высокой частоте) прореживается по корзинам уровня, а не по всем точкам.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax", "mean")
+
+# Точек потока на корзину у уровней предагрегации буфера
+AGGREGATE_FACTORS = (64, 4096)
+
+
+def bucket_starts(n: int, buckets: int) -> np.ndarray:
+    """Начала buckets почти равных корзин для n точек (buckets <= n)."""
+    return (np.arange(buckets, dtype=np.int64) * n) // buckets
+
+
+def _counts(starts: np.ndarray, n: int) -> np.ndarray:
+    return np.diff(np.append(starts, n))
+
+
+def segment_arg(v: np.ndarray, starts: np.ndarray, reducer) -> np.ndarray:
+    """
+    Индекс первого минимума (reducer=np.fmin) или максимума (np.fmax) в каждой
+    корзине; корзина из одних NaN даёт свой первый индекс.
+    """
+    counts = _counts(starts, len(v))
+    extreme = reducer.reduceat(v, starts)
+    segment = np.repeat(np.arange(len(starts)), counts)
+    hit = np.flatnonzero(v == extreme[segment])
+    # hit упорядочен, поэтому первый индекс корзины — там, где меняется её номер
+    hit_segment = segment[hit]
+    first = np.concatenate(([True], hit_segment[1:] != hit_segment[:-1])) if len(hit) else hit.astype(bool)
+    result = starts.copy()
+    result[hit_segment[first]] = hit[first]
+    return result
+
+
+def _in_time_order(t_a, v_a, t_b, v_b) -> Tuple[np.ndarray, np.ndarray]:
+    """Пары точек (a, b) по корзинам → ряд в порядке времени без повторов."""
+    swap = t_a > t_b
+    t = np.stack([np.where(swap, t_b, t_a), np.where(swap, t_a, t_b)], axis=1).ravel()
+    v = np.stack([np.where(swap, v_b, v_a), np.where(swap, v_a, v_b)], axis=1).ravel()
+    keep = np.ones(len(t), dtype=bool)
+    keep[1::2] = (t[1::2] != t[0::2]) | (v[1::2] != v[0::2])
+    return t[keep], v[keep]
+
+
+def mean_buckets(t: np.ndarray, v: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    counts = _counts(starts, len(t))
+    return np.add.reduceat(t, starts) / counts, np.add.reduceat(v, starts) / counts
+
+
+def minmax_buckets(t: np.ndarray, v: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    low = segment_arg(v, starts, np.fmin)
+    high = segment_arg(v, starts, np.fmax)
+    return _in_time_order(t[low], v[low], t[high], v[high])
+
+
+def lttb_buckets(
+    t: np.ndarray,
+    v: np.ndarray,
+    starts: np.ndarray,
+    before: Optional[Tuple[float, float]] = None,
+    after: Optional[Tuple[float, float]] = None
+) -> np.ndarray:
+    """
+    Индекс выбранной LTTB точки в каждой корзине. Соседи крайних корзин —
+    before/after (если не заданы — среднее самой крайней корзины).
+    """
+    n, buckets = len(t), len(starts)
+    counts = _counts(starts, n)
+    mean_t, mean_v = np.add.reduceat(t, starts) / counts, np.add.reduceat(v, starts) / counts
+    a_t = np.concatenate(([before[0] if before else mean_t[0]], mean_t[:-1]))
+    a_v = np.concatenate(([before[1] if before else mean_v[0]], mean_v[:-1]))
+    c_t = np.concatenate((mean_t[1:], [after[0] if after else mean_t[-1]]))
+    c_v = np.concatenate((mean_v[1:], [after[1] if after else mean_v[-1]]))
+
+    # Кандидаты всех корзин — одна матрица (корзина × позиция), лишние ячейки отбрасываются
+    width = int(counts.max())
+    offset = np.arange(width)
+    valid = offset < counts[:, None]
+    index = np.minimum(starts[:, None] + offset, n - 1)
+    p_t, p_v = t[index], v[index]
+    area = np.abs(
+        (a_t - c_t)[:, None] * (p_v - a_v[:, None]) - (a_t[:, None] - p_t) * (c_v - a_v)[:, None]
+    )
+    area = np.where(valid & ~np.isnan(area), area, -1.0)
+    return index[np.arange(buckets), np.argmax(area, axis=1)]
+
+
+def lttb(t: np.ndarray, v: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """LTTB: первая и последняя точки сохраняются, остальные — по одной из корзины."""
+    n = len(t)
+    if n <= max_points:
+        return t, v
+    if max_points < 3:
+        index = np.array([0, n - 1][:max_points], dtype=np.int64)
+        return t[index], v[index]
+    starts = bucket_starts(n - 2, max_points - 2) + 1
+    inner = lttb_buckets(t[:n - 1], v[:n - 1], starts, before=(t[0], v[0]), after=(t[-1], v[-1]))
+    index = np.concatenate(([0], inner, [n - 1]))
+    return t[index], v[index]
+
+
+def downsample_points(
+    t: np.ndarray,
+    v: np.ndarray,
+    max_points: int,
+    method: str = "lttb"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Прореживает ряд до max_points точек (minmax — до max_points // 2 корзин по 2 точки)."""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    n = len(t)
+    if n <= max_points:
+        return t, v
+    if method == "lttb":
+        return lttb(t, v, max_points)
+    if method == "mean":
+        return mean_buckets(t, v, bucket_starts(n, max_points))
+    return minmax_buckets(t, v, bucket_starts(n, max(1, max_points // 2)))
+
+
+def downsample_aggregates(
+    aggregates: Dict[str, np.ndarray],
+    max_points: int,
+    method: str = "lttb"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """То же по корзинам уровня предагрегации (AggregateLevel.read)."""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    count = aggregates["count"]
+    n = len(count)
+    if method == "mean":
+        starts = bucket_starts(n, min(n, max_points))
+        total = np.add.reduceat(count, starts)
+        return (
+            np.add.reduceat(aggregates["t_sum"], starts) / total,
+            np.add.reduceat(aggregates["v_sum"], starts) / total,
+        )
+    if method == "minmax":
+        starts = bucket_starts(n, min(n, max(1, max_points // 2)))
+        low = segment_arg(aggregates["v_min"], starts, np.fmin)
+        high = segment_arg(aggregates["v_max"], starts, np.fmax)
+        return _in_time_order(
+            aggregates["t_min"][low], aggregates["v_min"][low],
+            aggregates["t_max"][high], aggregates["v_max"][high]
+        )
+    # LTTB по минимумам и максимумам корзин уровня (MinMax-предотбор)
+    t, v = _in_time_order(aggregates["t_min"], aggregates["v_min"], aggregates["t_max"], aggregates["v_max"])
+    return lttb(t, v, max_points)
+
+
+class AggregateLevel:
+    """
+    Корзины по factor точек кольцевого буфера ёмкостью capacity точек.
+    Корзина k (точки с seq от k * factor) лежит в ячейке k % size.
+    Массивы растут по мере записи (как у PointRingBuffer): пока size меньше
+    полного, все корзины лежат в ячейках со своим номером.
+    """
+
+    _FIELDS = ("count", "t_sum", "v_sum", "v_min", "t_min", "v_max", "t_max")
+
+    def __init__(self, factor: int, capacity: int, initial_points: int = None):
+        self.factor = factor
+        self.max_size = capacity // factor + 2
+        if initial_points is None:
+            self.size = self.max_size
+        else:
+            self.size = min(self.max_size, initial_points // factor + 2)
+        self.count = np.zeros(self.size, dtype=np.int64)
+        self.t_sum = np.zeros(self.size, dtype=np.float64)
+        self.v_sum = np.zeros(self.size, dtype=np.float64)
+        self.v_min = np.zeros(self.size, dtype=np.float64)
+        self.t_min = np.zeros(self.size, dtype=np.float64)
+        self.v_max = np.zeros(self.size, dtype=np.float64)
+        self.t_max = np.zeros(self.size, dtype=np.float64)
+        self._last_bucket = -1
+
+    def _reserve(self, bucket: int):
+        """Расширяет массивы, чтобы корзина bucket не затёрла ещё не вытесненные."""
+        if bucket < self.size or self.size == self.max_size:
+            return
+        size = min(self.max_size, max(bucket + 1, 2 * self.size))
+        for field in self._FIELDS:
+            old = getattr(self, field)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:self.size] = old
+            setattr(self, field, new)
+        self.size = size
+
+    def update(self, seq: int, t: np.ndarray, v: np.ndarray):
+        """Учитывает точки с номерами seq, seq + 1, ... (вызывается под блокировкой буфера)."""
+        n = len(t)
+        if not n:
+            return
+        bucket = (seq + np.arange(n, dtype=np.int64)) // self.factor
+        starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+        buckets = bucket[starts]
+        counts = _counts(starts, n)
+        t_sum = np.add.reduceat(t, starts)
+        v_sum = np.add.reduceat(v, starts)
+        low = segment_arg(v, starts, np.fmin)
+        high = segment_arg(v, starts, np.fmax)
+        self._reserve(int(buckets[-1]))
+        slots = buckets % self.size
+
+        first = 0
+        if buckets[0] == self._last_bucket:
+            # Продолжение незаполненной корзины
+            slot = slots[0]
+            self.count[slot] += counts[0]
+            self.t_sum[slot] += t_sum[0]
+            self.v_sum[slot] += v_sum[0]
+            if v[low[0]] < self.v_min[slot]:
+                self.v_min[slot], self.t_min[slot] = v[low[0]], t[low[0]]
+            if v[high[0]] > self.v_max[slot]:
+                self.v_max[slot], self.t_max[slot] = v[high[0]], t[high[0]]
+            first = 1
+        if first < len(slots):
+            fresh = slots[first:]
+            self.count[fresh] = counts[first:]
+            self.t_sum[fresh] = t_sum[first:]
+            self.v_sum[fresh] = v_sum[first:]
+            self.v_min[fresh], self.t_min[fresh] = v[low[first:]], t[low[first:]]
+            self.v_max[fresh], self.t_max[fresh] = v[high[first:]], t[high[first:]]
+        self._last_bucket = int(buckets[-1])
+
+    def add(
+        self,
+        bucket: int,
+        count: int,
+        t_sum: float,
+        v_sum: float,
+        v_min: float,
+        t_min: float,
+        v_max: float,
+        t_max: float
+    ):
+        """Учитывает итоги отрезка, целиком лежащего в корзине bucket."""
+        self._reserve(bucket)
+        slot = bucket % self.size
+        if bucket != self._last_bucket:
+            self.count[slot] = count
+            self.t_sum[slot] = t_sum
+            self.v_sum[slot] = v_sum
+            self.v_min[slot], self.t_min[slot] = v_min, t_min
+            self.v_max[slot], self.t_max[slot] = v_max, t_max
+            self._last_bucket = bucket
+            return
+        self.count[slot] += count
+        self.t_sum[slot] += t_sum
+        self.v_sum[slot] += v_sum
+        if v_min < self.v_min[slot]:
+            self.v_min[slot], self.t_min[slot] = v_min, t_min
+        if v_max > self.v_max[slot]:
+            self.v_max[slot], self.t_max[slot] = v_max, t_max
+
+    def read(self, first_bucket: int, last_bucket: int) -> Dict[str, np.ndarray]:
+        """Копия корзин first_bucket..last_bucket включительно."""
+        slots = np.arange(first_bucket, last_bucket + 1, dtype=np.int64) % self.size
+        return {field: getattr(self, field)[slots] for field in self._FIELDS}
+
+
+def _piece_stats(t: np.ndarray, v: np.ndarray) -> Tuple[int, float, float, float, float, float, float]:
+    """Итоги короткого отрезка числами Python: на малых массивах это быстрее вызовов NumPy."""
+    tl, vl = t.tolist(), v.tolist()
+    v_sum = sum(vl)
+    if v_sum != v_sum:
+        # NaN: минимум и максимум — среди остальных точек, как у fmin/fmax
+        finite = [i for i, x in enumerate(vl) if x == x] or [0]
+        low, high = min(finite, key=vl.__getitem__), max(finite, key=vl.__getitem__)
+    else:
+        low, high = vl.index(min(vl)), vl.index(max(vl))
+    return len(vl), sum(tl), v_sum, vl[low], tl[low], vl[high], tl[high]
+
+
+def update_levels(levels, seq: int, t: np.ndarray, v: np.ndarray):
+    """
+    Обновляет уровни (factor по возрастанию, каждый кратен предыдущему) точками
+    seq, seq + 1, ... Пакет из пары корзин мелкого уровня режется по их границам,
+    итоги каждого куска считаются один раз на все уровни; длинный — векторно.
+    """
+    n = len(t)
+    if not levels or not n:
+        return
+    finest = levels[0].factor
+    first, last = seq // finest, (seq + n - 1) // finest
+    if last - first >= 4:
+        for level in levels:
+            level.update(seq, t, v)
+        return
+    for bucket in range(first, last + 1):
+        lo = max(bucket * finest - seq, 0)
+        hi = min((bucket + 1) * finest - seq, n)
+        stats = _piece_stats(t[lo:hi], v[lo:hi])
+        for level in levels:
+            level.add((seq + lo) // level.factor, *stats)
@@ -0,0 +1,279 @@
+"""
+Офлайн-рендер сценариев в файлы (наборы данных вместо живого потока).
+
+Сценарий считается пакетным путём кусками по chunk_size отсчётов и сразу
+пишется на диск, поэтому память не зависит от длины диапазона.
+Форматы: csv, parquet (нужен pyarrow), npy (memory-mappable float64).
+Несколько датчиков пишутся в один файл: wide — столбец на датчик,
+long — строки (timestamp, sensor_id, value).
+
+    python -m core.export day.json -o day.parquet --duration 86400 --frequency 1000
+    python -m core.export a=temp.json b=press.json -o fleet.csv --layout long
+"""
+import io
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from .scenario import Scenario
+from .data_generator import load_scenario
+
+logger = logging.getLogger("Export")
+
+EXPORT_FORMATS = ("csv", "parquet", "npy")
+EXPORT_LAYOUTS = ("wide", "long")
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def render_chunks(
+    scenarios: Dict[str, Scenario],
+    duration: float,
+    frequency_hz: float,
+    start: float = 0.0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+    """
+    Проходит диапазон [start, start + duration) с шагом 1/frequency_hz и отдаёт
+    куски (метки времени, {sensor_id: значения}). Время сценариев сдвигается.
+    """
+    if duration <= 0 or frequency_hz <= 0:
+        raise ValueError("duration and frequency_hz must be positive")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    dt = 1.0 / frequency_hz
+    total = int(round(duration * frequency_hz))
+    for scenario in scenarios.values():
+        scenario.current_time = start
+        scenario.prepare_wavetables(dt)
+
+    for lo in range(0, total, chunk_size):
+        n = min(chunk_size, total - lo)
+        timestamps = start + np.arange(lo, lo + n, dtype=np.float64) * dt
+        yield timestamps, {
+            sensor_id: scenario.get_values(n, dt) for sensor_id, scenario in scenarios.items()
+        }
+
+
+# ---------------------------------------------------------------------- #
+#                                 Запись                                  #
+# ---------------------------------------------------------------------- #
+
+def _csv_field(value: str) -> str:
+    """Поле CSV по правилам модуля csv: в кавычках, если в нём есть запятая, кавычка или перевод строки"""
+    buffer = io.StringIO()
+    # Перевод строки в конце записи нужен csv, чтобы он закавычил \r и \n внутри значения
+    csv.writer(buffer, lineterminator="\r\n").writerow([value])
+    return buffer.getvalue()[:-2]
+
+
+class _CsvWriter:
+    def __init__(self, path: Path, sensor_ids: List[str], layout: str, total_rows: int):
+        self.layout = layout
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        if layout == "wide":
+            self.file.write(",".join(_csv_field(name) for name in ["timestamp", *sensor_ids]) + "\n")
+            self.fmt = ",".join(["%.9f"] + ["%.10g"] * len(sensor_ids))
+        else:
+            self.file.write("timestamp,sensor_id,value\n")
+            # Одна строка массива → по строке на датчик; id подставляются в формат.
+            # Формат — списком по столбцам: строкой savetxt считает и «%%» в id
+            self.fmt = []
+            for i, sensor_id in enumerate(sensor_ids):
+                self.fmt += ["%.9f," if i == 0 else "\n%.9f,", _csv_field(sensor_id).replace("%", "%%") + ",%.10g"]
+
+    def write(self, timestamps: np.ndarray, values: Dict[str, np.ndarray]):
+        columns = list(values.values())
+        if self.layout == "wide":
+            block = np.column_stack([timestamps, *columns])
+        else:
+            block = np.column_stack([c for v in columns for c in (timestamps, v)])
+        np.savetxt(self.file, block, fmt=self.fmt, delimiter="" if self.layout == "long" else ",")
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: Path, sensor_ids: List[str], layout: str, total_rows: int):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.layout = layout
+        self.sensor_ids = pa.array(sensor_ids, type=pa.string())
+        if layout == "wide":
+            schema = pa.schema(
+                [("timestamp", pa.float64())] + [(sensor_id, pa.float64()) for sensor_id in sensor_ids]
+            )
+        else:
+            schema = pa.schema([
+                ("timestamp", pa.float64()),
+                ("sensor_id", pa.dictionary(pa.int32(), pa.string())),
+                ("value", pa.float64()),
+            ])
+        self.schema = schema
+        self.writer = pq.ParquetWriter(str(path), schema)
+
+    def write(self, timestamps: np.ndarray, values: Dict[str, np.ndarray]):
+        pa = self.pa
+        columns = list(values.values())
+        if self.layout == "wide":
+            arrays = [pa.array(timestamps), *(pa.array(c) for c in columns)]
+        else:
+            k, n = len(columns), len(timestamps)
+            indices = np.tile(np.arange(k, dtype=np.int32), n)
+            arrays = [
+                pa.array(np.repeat(timestamps, k)),
+                pa.DictionaryArray.from_arrays(pa.array(indices), self.sensor_ids),
+                pa.array(np.column_stack(columns).ravel()),
+            ]
+        # Каждый кусок — отдельная row group
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class _NpyWriter:
+    """
+    Двумерный float64 .npy через open_memmap: wide — (timestamp, датчики...),
+    long — (timestamp, индекс датчика, value). Имена столбцов и датчиков —
+    в соседнем .json.
+    """
+
+    def __init__(self, path: Path, sensor_ids: List[str], layout: str, total_rows: int):
+        self.layout = layout
+        k = len(sensor_ids)
+        if layout == "wide":
+            shape = (total_rows, 1 + k)
+            columns = ["timestamp", *sensor_ids]
+        else:
+            shape = (total_rows * k, 3)
+            columns = ["timestamp", "sensor_index", "value"]
+        self.array = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+        self.row = 0
+        with open(path.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump({"columns": columns, "sensors": sensor_ids, "layout": layout}, f, ensure_ascii=False)
+
+    def write(self, timestamps: np.ndarray, values: Dict[str, np.ndarray]):
+        columns = list(values.values())
+        n, k = len(timestamps), len(columns)
+        if self.layout == "wide":
+            block = self.array[self.row:self.row + n]
+            block[:, 0] = timestamps
+            for j, column in enumerate(columns):
+                block[:, 1 + j] = column
+            self.row += n
+        else:
+            block = self.array[self.row:self.row + n * k]
+            block[:, 0] = np.repeat(timestamps, k)
+            block[:, 1] = np.tile(np.arange(k, dtype=np.float64), n)
+            block[:, 2] = np.column_stack(columns).ravel()
+            self.row += n * k
+        # Сбрасываем страницы на диск, чтобы не копить их в памяти процесса
+        self.array.flush()
+
+    def close(self):
+        self.array.flush()
+        del self.array
+
+
+_WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter, "npy": _NpyWriter}
+
+
+def export_scenarios(
+    scenarios: Dict[str, Union[Dict, str, Scenario]],
+    path: Union[str, Path],
+    duration: float,
+    frequency_hz: float,
+    fmt: str = None,
+    layout: str = "wide",
+    start: float = 0.0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, float]:
+    """
+    Рендерит сценарии {sensor_id: конфиг или Scenario} в файл.
+    Формат по умолчанию берётся из расширения. Возвращает число строк,
+    время работы и скорость (строк/с).
+    """
+    path = Path(path)
+    fmt = fmt or path.suffix.lstrip(".").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if layout not in EXPORT_LAYOUTS:
+        raise ValueError(f"Unknown export layout: {layout}")
+    if not scenarios:
+        raise ValueError("Nothing to export")
+
+    loaded = {sensor_id: load_scenario(config) for sensor_id, config in scenarios.items()}
+    total_rows = int(round(duration * frequency_hz))
+
+    started = time.perf_counter()
+    writer = _WRITERS[fmt](path, list(loaded), layout, total_rows)
+    rows = 0
+    try:
+        for timestamps, values in render_chunks(loaded, duration, frequency_hz, start, chunk_size):
+            writer.write(timestamps, values)
+            rows += len(timestamps) * (len(values) if layout == "long" else 1)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - started
+
+    logger.info(f"Export: {rows} rows → {path} ({fmt}, {layout}) in {elapsed:.2f}s")
+    return {"rows": rows, "seconds": elapsed, "rows_per_sec": rows / elapsed if elapsed > 0 else 0.0}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m core.export",
+        description="Рендер сценария (или нескольких датчиков) в файл"
+    )
+    parser.add_argument(
+        "scenarios", nargs="+",
+        help="JSON сценария; для нескольких датчиков — sensor_id=путь (иначе id — имя файла)"
+    )
+    parser.add_argument("-o", "--output", required=True, help="Файл результата (.csv, .parquet, .npy)")
+    parser.add_argument("--duration", type=float, required=True, help="Длина диапазона, с")
+    parser.add_argument("--frequency", type=float, default=10, help="Частота отсчётов, Гц")
+    parser.add_argument("--start", type=float, default=0.0, help="Начало диапазона (время сценария), с")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Формат (по умолчанию из расширения)")
+    parser.add_argument("--layout", choices=EXPORT_LAYOUTS, default="wide")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Отсчётов в куске")
+    args = parser.parse_args(argv)
+
+    scenarios = {}
+    for spec in args.scenarios:
+        sensor_id, sep, scenario_path = spec.partition("=")
+        if not sep:
+            sensor_id, scenario_path = Path(spec).stem, spec
+        if sensor_id in scenarios:
+            parser.error(f"duplicate sensor id: {sensor_id}")
+        scenarios[sensor_id] = scenario_path
+
+    try:
+        result = export_scenarios(
+            scenarios, args.output, args.duration, args.frequency,
+            fmt=args.format, layout=args.layout, start=args.start, chunk_size=args.chunk_size
+        )
+    except (ValueError, KeyError, RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(
+        f"{result['rows']} rows in {result['seconds']:.2f}s "
+        f"({result['rows_per_sec']:,.0f} rows/sec) → {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+import time
+import heapq
+import logging
+from threading import Thread, Event, Condition
+from typing import Callable, Dict, Union, List, Any, Tuple
+
+from .mqtt_client import MQTTPublisher
+from .scenario import Scenario
+from .data_generator import build_packet, load_scenario
+from .scheduling import PacketClock
+
+logger = logging.getLogger("Fleet")
+
+
+class SensorStream:
+    """Один датчик флота: сценарий и параметры его потока пакетов."""
+
+    def __init__(
+        self,
+        sensor_id: str,
+        scenario: Scenario,
+        frequency_hz: int = 10,
+        packets_per_sec: int = 2,
+        catch_up: str = "burst"
+    ):
+        if frequency_hz <= 0 or packets_per_sec <= 0:
+            raise ValueError("frequency_hz and packets_per_sec must be positive")
+        if frequency_hz % packets_per_sec != 0:
+            raise ValueError("frequency_hz must be divisible by packets_per_sec")
+
+        self.sensor_id = sensor_id
+        self.scenario = scenario
+        self.frequency_hz = frequency_hz
+        self.packets_per_sec = packets_per_sec
+        self.values_per_packet = frequency_hz // packets_per_sec
+        self.time_step = 1.0 / frequency_hz
+        self.packet_interval = 1.0 / packets_per_sec
+        # Датчики с одинаковой зацикленной формой делят одну таблицу периода
+        self.scenario.prepare_wavetables(self.time_step)
+        self.clock = PacketClock(self.packet_interval, catch_up)
+        self.packets_sent = 0
+
+    def next_packet(self, now: float) -> List[Dict[str, float]]:
+        """
+        Следующий пакет датчика одним пакетным вызовом сценария с учётом
+        политики догоняния; сдвигает срок следующего пакета.
+        """
+        periods, skipped = self.clock.tick(now)
+        if skipped:
+            self.scenario.advance_time(skipped * self.values_per_packet * self.time_step)
+            self.clock.advance(skipped)
+        packet_start = self.scenario.current_time
+        values = self.scenario.get_values(periods * self.values_per_packet, self.time_step)
+        self.clock.advance(periods)
+        return build_packet(packet_start, values, self.time_step)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sensor_id": self.sensor_id,
+            "scenario": self.scenario.name,
+            "frequency_hz": self.frequency_hz,
+            "packets_per_sec": self.packets_per_sec,
+            "scenario_time": self.scenario.current_time,
+            "packets_sent": self.packets_sent,
+            "stats": self.clock.stats.to_dict(),
+        }
+
+
+class FleetGenerator:
+    """
+    Генератор для множества датчиков в одном потоке.
+    Моменты отправки следующих пакетов лежат в куче; поток спит до ближайшего,
+    собирает все пакеты, которые пора отправить, и отдаёт их паблишеру.
+    Датчики можно добавлять, удалять и заменять на лету.
+    monotonic — источник текущего времени для расписания (в шкале time.monotonic,
+    как у PacketClock); тесты подставляют своё время и вызывают шаги цикла сами.
+    """
+
+    def __init__(
+        self,
+        mqtt_publisher: MQTTPublisher,
+        catch_up: str = "burst",
+        monotonic: Callable[[], float] = time.monotonic
+    ):
+        self.mqtt_publisher = mqtt_publisher
+        self.catch_up = catch_up
+        self.monotonic = monotonic
+        self._streams: Dict[str, SensorStream] = {}
+        # Элементы кучи: (время следующего пакета, порядковый номер, поток датчика).
+        # Удалённые/заменённые потоки остаются в куче и пропускаются при извлечении.
+        self._heap = []
+        self._counter = 0
+        self._condition = Condition()
+        self._stop_event = Event()
+        self.thread = None
+
+    # ------------------------------------------------------------------ #
+    #                        Управление датчиками                         #
+    # ------------------------------------------------------------------ #
+
+    def add_sensor(
+        self,
+        sensor_id: str,
+        scenario_config: Union[Dict, str, Scenario],
+        frequency_hz: int = 10,
+        packets_per_sec: int = 2
+    ) -> SensorStream:
+        """Добавляет датчик; ошибка, если датчик с таким id уже есть."""
+        stream = self._build_stream(sensor_id, scenario_config, frequency_hz, packets_per_sec)
+        # Проверка и вставка под одной блокировкой: два одновременных add_sensor
+        # с одним id не заменят друг друга
+        with self._condition:
+            if sensor_id in self._streams:
+                raise KeyError(f"Sensor already exists: {sensor_id}")
+            self._schedule(stream)
+        logger.info(f"Fleet: Sensor {sensor_id} scheduled at {frequency_hz}Hz ({packets_per_sec} pps)")
+        return stream
+
+    def replace_sensor(
+        self,
+        sensor_id: str,
+        scenario_config: Union[Dict, str, Scenario],
+        frequency_hz: int = 10,
+        packets_per_sec: int = 2
+    ) -> SensorStream:
+        """Добавляет датчик или заменяет сценарий/частоты существующего."""
+        stream = self._build_stream(sensor_id, scenario_config, frequency_hz, packets_per_sec)
+        with self._condition:
+            self._schedule(stream)
+        logger.info(f"Fleet: Sensor {sensor_id} scheduled at {frequency_hz}Hz ({packets_per_sec} pps)")
+        return stream
+
+    def _build_stream(
+        self,
+        sensor_id: str,
+        scenario_config: Union[Dict, str, Scenario],
+        frequency_hz: int,
+        packets_per_sec: int
+    ) -> SensorStream:
+        # Сценарий разбирается вне блокировки: поток генерации его не ждёт
+        return SensorStream(
+            sensor_id, load_scenario(scenario_config), frequency_hz, packets_per_sec, self.catch_up
+        )
+
+    def _schedule(self, stream: SensorStream):
+        """Регистрирует поток датчика и ставит его в расписание (под self._condition)."""
+        self._streams[stream.sensor_id] = stream
+        self._push(stream)
+        self._condition.notify()
+
+    def remove_sensor(self, sensor_id: str) -> SensorStream:
+        """Удаляет датчик; остальные продолжают работу без перезапуска."""
+        with self._condition:
+            stream = self._streams.pop(sensor_id)
+        logger.info(f"Fleet: Sensor {sensor_id} removed")
+        return stream
+
+    def get_sensor(self, sensor_id: str) -> SensorStream:
+        with self._condition:
+            return self._streams[sensor_id]
+
+    def list_sensors(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            return [stream.to_dict() for stream in self._streams.values()]
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def _push(self, stream: SensorStream):
+        self._counter += 1
+        heapq.heappush(self._heap, (stream.clock.next_due, self._counter, stream))
+
+    # ------------------------------------------------------------------ #
+    #                           Цикл генерации                            #
+    # ------------------------------------------------------------------ #
+
+    def start(self):
+        """Запускает общий поток генерации флота."""
+        if self.is_running():
+            return
+        self._reset_schedule()
+        self._stop_event.clear()
+        self.thread = Thread(target=self._generation_loop, daemon=True)
+        self.thread.start()
+        logger.info("Fleet: Started")
+
+    def _reset_schedule(self):
+        """После остановки расписание устарело — начинаем заново от текущего момента."""
+        with self._condition:
+            self._heap = []
+            for stream in self._streams.values():
+                stream.clock.reset()
+                self._push(stream)
+
+    def _collect_due(self) -> Tuple[float, List[SensorStream]]:
+        """
+        Ждёт ближайший срок и забирает из кучи все потоки, которым пора отправлять.
+        Время — self.monotonic(), в шкале PacketClock.
+        """
+        with self._condition:
+            while not self._stop_event.is_set():
+                # Выбрасываем записи удалённых или заменённых датчиков
+                while self._heap and self._streams.get(self._heap[0][2].sensor_id) is not self._heap[0][2]:
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                delay = self._heap[0][0] - self.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                now = self.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, stream = heapq.heappop(self._heap)
+                    if self._streams.get(stream.sensor_id) is stream:
+                        due.append(stream)
+                return now, due
+        return 0.0, []
+
+    def _generation_loop(self):
+        """Цикл, публикующий пакеты всех датчиков, пока не вызовут stop()."""
+        while not self._stop_event.is_set():
+            self._publish_due(*self._collect_due())
+        logger.info("Fleet: Stopped")
+
+    def _publish_due(self, now: float, due: List[SensorStream]):
+        """Публикует пакеты потоков, которым пора, и возвращает их в расписание."""
+        for stream in due:
+            due_time = stream.clock.next_due
+            target_time = stream.clock.to_epoch(due_time)
+            try:
+                packet = stream.next_packet(now)
+                if packet:
+                    self.mqtt_publisher.publish_packet(packet, target_time, stream.sensor_id)
+                    stream.packets_sent += 1
+            except Exception:
+                logger.exception(f"Fleet: Packet generation failed for {stream.sensor_id}")
+                # next_packet уже сдвинул расписание, если упала публикация; сдвигаем
+                # сами, только если сценарий упал раньше (иначе тот же срок повторится сразу)
+                if stream.clock.next_due == due_time:
+                    stream.clock.advance()
+
+        # Паблишеры, копящие пакеты (например, в процессе-воркере), отправляют пачку
+        flush = getattr(self.mqtt_publisher, "flush", None)
+        if due and flush is not None:
+            flush()
+
+        with self._condition:
+            for stream in due:
+                if self._streams.get(stream.sensor_id) is stream:
+                    self._push(stream)
+
+    def stop(self):
+        """Останавливает поток флота (датчики остаются в расписании)."""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=2)
+        logger.info("Fleet: Stop requested")
+
+    def is_running(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
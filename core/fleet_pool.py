@@ -0,0 +1,322 @@
+import os
+import time
+import zlib
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from threading import Thread, Event, RLock
+from typing import Dict, Union, List, Any, Tuple
+
+from .codecs import encode_payload
+from .mqtt_client import MQTTPublisher, build_payload, DEFAULT_SENSOR_ID
+from .fleet import FleetGenerator, SensorStream
+from .data_generator import load_scenario
+
+logger = logging.getLogger("FleetPool")
+
+SHARDING_POLICIES = ("hash", "least_loaded")
+
+
+class _PipePublisher:
+    """
+    Паблишер внутри процесса-воркера: собирает «обёртку» пакета, кодирует её в JSON
+    и копит байты, отправляя их родителю пачкой. Родитель отдаёт байты приёмникам
+    как есть (publish_json), не собирая и не кодируя пакеты в своём процессе.
+    """
+
+    def __init__(self, data_conn):
+        self.data_conn = data_conn
+        # (JSON «обёртки», packet_timestamp, sensor_id)
+        self._pending: List[Tuple[bytes, float, str]] = []
+
+    def publish_packet(self, packet, target_time=None, sensor_id=DEFAULT_SENSOR_ID):
+        payload = build_payload(packet, target_time, sensor_id)
+        self._pending.append((encode_payload(payload, "json"), payload["packet_timestamp"], sensor_id))
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.data_conn.send(pending)
+
+
+def _worker_main(worker_index: int, cmd_conn, data_conn, catch_up: str = "burst"):
+    """Точка входа процесса-воркера: свой FleetGenerator и свои экземпляры Scenario."""
+    fleet = FleetGenerator(_PipePublisher(data_conn), catch_up)
+    fleet.start()
+    try:
+        while True:
+            command = cmd_conn.recv()
+            op = command[0]
+            if op == "stop":
+                break
+            try:
+                if op == "replace":
+                    fleet.replace_sensor(*command[1:])
+                elif op == "remove":
+                    fleet.remove_sensor(command[1])
+            except Exception as e:
+                logger.error(f"FleetPool: Worker {worker_index} command {op} failed: {e}")
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        fleet.stop()
+
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.cmd_conn = None
+        self.data_conn = None
+        self.sensors = set()
+        self.restarts = 0
+        self.packets = 0
+        # Когда перезапустить упавший воркер (time.monotonic()); None — воркер не ждёт перезапуска
+        self.restart_at = None
+
+
+class ShardedFleet:
+    """
+    Флот датчиков, разбитый на N процессов-воркеров, чтобы обойти GIL.
+    Каждый воркер крутит свой FleetGenerator и присылает по pipe пакеты, уже
+    закодированные в JSON; в родительском процессе один поток читает все pipe
+    и отдаёт байты паблишеру через publish_json (есть у SinkPipeline,
+    MQTTPublisher и MQTTPool). Упавший воркер перезапускается со своими
+    датчиками через restart_delay секунд (их сценарии начинаются заново);
+    остальные воркеры всё это время продолжают доставку.
+    Интерфейс совпадает с FleetGenerator.
+    """
+
+    def __init__(
+        self,
+        mqtt_publisher: MQTTPublisher,
+        workers: int = None,
+        sharding: str = "hash",
+        restart_delay: float = 1.0,
+        catch_up: str = "burst"
+    ):
+        if sharding not in SHARDING_POLICIES:
+            raise ValueError(f"Unknown sharding policy: {sharding}")
+        self.mqtt_publisher = mqtt_publisher
+        self.sharding = sharding
+        self.restart_delay = restart_delay
+        self.catch_up = catch_up
+        self._workers = [_Worker(i) for i in range(workers or os.cpu_count() or 1)]
+        # sensor_id -> (конфиг сценария, частота, пакетов/с, проверенный поток, воркер)
+        self._sensors: Dict[str, Tuple[Any, int, int, SensorStream, _Worker]] = {}
+        self._lock = RLock()
+        self._stop_event = Event()
+        self._context = multiprocessing.get_context("spawn")
+        self.thread = None
+
+    # ------------------------------------------------------------------ #
+    #                        Управление датчиками                         #
+    # ------------------------------------------------------------------ #
+
+    def _choose_worker(self, sensor_id: str) -> _Worker:
+        if self.sharding == "hash":
+            return self._workers[zlib.crc32(sensor_id.encode("utf-8")) % len(self._workers)]
+        return min(self._workers, key=lambda w: len(w.sensors))
+
+    def _send(self, worker: _Worker, command: tuple):
+        try:
+            if worker.cmd_conn is not None:
+                worker.cmd_conn.send(command)
+        except (BrokenPipeError, EOFError, OSError):
+            # Воркер упал — при перезапуске он получит датчики заново
+            pass
+
+    def add_sensor(
+        self,
+        sensor_id: str,
+        scenario_config: Union[Dict, str],
+        frequency_hz: int = 10,
+        packets_per_sec: int = 2
+    ) -> SensorStream:
+        """Добавляет датчик; ошибка, если датчик с таким id уже есть."""
+        with self._lock:
+            if sensor_id in self._sensors:
+                raise KeyError(f"Sensor already exists: {sensor_id}")
+            return self.replace_sensor(sensor_id, scenario_config, frequency_hz, packets_per_sec)
+
+    def replace_sensor(
+        self,
+        sensor_id: str,
+        scenario_config: Union[Dict, str],
+        frequency_hz: int = 10,
+        packets_per_sec: int = 2
+    ) -> SensorStream:
+        """Добавляет датчик или заменяет сценарий/частоты существующего."""
+        if not isinstance(scenario_config, (dict, str)):
+            raise TypeError("ShardedFleet accepts scenario configs as dict or file path")
+        # Проверяем конфиг здесь, чтобы ошибка вернулась вызывающему, а не в лог воркера
+        stream = SensorStream(
+            sensor_id, load_scenario(scenario_config), frequency_hz, packets_per_sec
+        )
+        with self._lock:
+            if sensor_id in self._sensors:
+                worker = self._sensors[sensor_id][4]
+            else:
+                worker = self._choose_worker(sensor_id)
+            worker.sensors.add(sensor_id)
+            self._sensors[sensor_id] = (scenario_config, frequency_hz, packets_per_sec, stream, worker)
+            self._send(worker, ("replace", sensor_id, scenario_config, frequency_hz, packets_per_sec))
+        return stream
+
+    def remove_sensor(self, sensor_id: str) -> SensorStream:
+        with self._lock:
+            _, _, _, stream, worker = self._sensors.pop(sensor_id)
+            worker.sensors.discard(sensor_id)
+            self._send(worker, ("remove", sensor_id))
+        return stream
+
+    def list_sensors(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            # Время сценария и счётчики живут в воркерах, здесь только расписание
+            return [
+                {
+                    "sensor_id": stream.sensor_id,
+                    "scenario": stream.scenario.name,
+                    "frequency_hz": stream.frequency_hz,
+                    "packets_per_sec": stream.packets_per_sec,
+                    "worker": worker.index,
+                }
+                for _, _, _, stream, worker in self._sensors.values()
+            ]
+
+    def __len__(self) -> int:
+        return len(self._sensors)
+
+    def get_workers(self) -> List[Dict[str, Any]]:
+        """Состояние воркеров для /status"""
+        with self._lock:
+            return [
+                {
+                    "index": w.index,
+                    "pid": w.process.pid if w.process else None,
+                    "alive": bool(w.process and w.process.is_alive()),
+                    "sensors": len(w.sensors),
+                    "packets": w.packets,
+                    "restarts": w.restarts,
+                    "restarting": w.restart_at is not None,
+                }
+                for w in self._workers
+            ]
+
+    # ------------------------------------------------------------------ #
+    #                        Процессы-воркеры                             #
+    # ------------------------------------------------------------------ #
+
+    def _spawn(self, worker: _Worker):
+        cmd_parent, cmd_child = self._context.Pipe()
+        data_parent, data_child = self._context.Pipe(duplex=False)
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.index, cmd_child, data_child, self.catch_up),
+            name=f"mimics-fleet-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        cmd_child.close()
+        data_child.close()
+        worker.cmd_conn = cmd_parent
+        worker.data_conn = data_parent
+
+        # Отдаём воркеру все его датчики (при перезапуске — заново)
+        for sensor_id in list(worker.sensors):
+            config, frequency_hz, packets_per_sec, _, _ = self._sensors[sensor_id]
+            self._send(worker, ("replace", sensor_id, config, frequency_hz, packets_per_sec))
+        logger.info(f"FleetPool: Worker {worker.index} started (pid {worker.process.pid})")
+
+    def start(self):
+        """Запускает процессы-воркеры и поток приёма пакетов."""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        with self._lock:
+            for worker in self._workers:
+                self._spawn(worker)
+        self.thread = Thread(target=self._receive_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"FleetPool: Started {len(self._workers)} workers ({self.sharding} sharding)")
+
+    def _receive_loop(self):
+        """Принимает пачки пакетов от воркеров и следит, чтобы воркеры были живы."""
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            with self._lock:
+                for worker in self._workers:
+                    if worker.restart_at is not None and worker.restart_at <= now:
+                        worker.restart_at = None
+                        worker.restarts += 1
+                        self._spawn(worker)
+                by_conn = {w.data_conn: w for w in self._workers if w.data_conn is not None}
+                by_sentinel = {w.process.sentinel: w for w in self._workers if w.process is not None}
+                restarts = [w.restart_at for w in self._workers if w.restart_at is not None]
+
+            # Ждём не дольше, чем до ближайшего запланированного перезапуска
+            timeout = min([0.5] + [max(0.0, at - now) for at in restarts])
+            ready = wait(list(by_conn) + list(by_sentinel), timeout=timeout)
+            dead = set()
+            for obj in ready:
+                if obj in by_conn:
+                    worker = by_conn[obj]
+                    try:
+                        batch = obj.recv()
+                    except (EOFError, OSError):
+                        dead.add(worker)
+                        continue
+                    for data, packet_time, sensor_id in batch:
+                        try:
+                            self.mqtt_publisher.publish_json(data, packet_time, sensor_id)
+                        except Exception:
+                            logger.exception(f"FleetPool: Publish failed for {sensor_id}")
+                    worker.packets += len(batch)
+                elif not self._stop_event.is_set():
+                    dead.add(by_sentinel[obj])
+
+            for worker in dead:
+                if self._stop_event.is_set():
+                    break
+                # Не спим здесь: пока воркер ждёт перезапуска, остальные продолжают доставку
+                with self._lock:
+                    self._close_worker(worker)
+                    exitcode = worker.process.exitcode
+                    worker.process = None
+                    worker.restart_at = time.monotonic() + self.restart_delay
+                logger.error(
+                    f"FleetPool: Worker {worker.index} died "
+                    f"(exitcode {exitcode}), restarting in {self.restart_delay}s"
+                )
+
+        logger.info("FleetPool: Stopped")
+
+    def _close_worker(self, worker: _Worker):
+        for conn in (worker.cmd_conn, worker.data_conn):
+            if conn is not None:
+                conn.close()
+        worker.cmd_conn = None
+        worker.data_conn = None
+        if worker.process is not None and worker.process.is_alive():
+            worker.process.terminate()
+        if worker.process is not None:
+            worker.process.join(timeout=2)
+
+    def stop(self):
+        """Останавливает воркеров и поток приёма (датчики остаются в реестре)."""
+        self._stop_event.set()
+        with self._lock:
+            for worker in self._workers:
+                self._send(worker, ("stop",))
+        if self.thread:
+            self.thread.join(timeout=2)
+        with self._lock:
+            for worker in self._workers:
+                if worker.process is not None:
+                    worker.process.join(timeout=2)
+                self._close_worker(worker)
+                worker.restart_at = None
+        logger.info("FleetPool: Stop requested")
+
+    def is_running(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
@@ -3,19 +3,45 @@ import json
 import time
 import uuid
 import logging
-import sys
-from pathlib import Path
-from typing import Dict, Any, List
+from collections import deque
+from threading import Thread, Condition, Lock
+from typing import Dict, Any, List, Optional
 
+import numpy as np
 import paho.mqtt.client as mqtt
 
-# Добавляем пути для импорта модулей из других директорий
-project_root = Path(__file__).parent.parent.absolute()
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
+from .codecs import check_codec, codec_topic, encode_payload
+from .scheduling import TokenBucket
+from .spool import DiskSpool, SPOOL_SEGMENT_BYTES, SPOOL_MAX_SEGMENTS
 
 logger = logging.getLogger("MQTT")
 
+# sensor_id в пакете, если генератор не задал свой
+DEFAULT_SENSOR_ID = "mimics_v1"
+
+# Что делать, если очередь на отправку заполнена:
+#   block       — ждать места (генератор притормаживает);
+#   drop_oldest — выбросить самый старый пакет из очереди;
+#   drop_newest — не ставить новый пакет.
+MQTT_QUEUE_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+# Сколько последних задержек подтверждения хранить для перцентилей
+ACK_LATENCY_WINDOW = 1024
+
+
+def build_payload(
+    packet: List[Dict[str, Any]],
+    target_time: float | None = None,
+    sensor_id: str = DEFAULT_SENSOR_ID
+) -> Dict[str, Any]:
+    """«Обёртка» пакета, которая уходит в MQTT и в WebSocket."""
+    return {
+        "sensor_id": sensor_id,
+        "packet": packet,
+        "packet_size": len(packet),
+        "packet_timestamp": target_time or time.time(),
+    }
+
 
 class MQTTPublisher:
     """
@@ -30,8 +56,35 @@ class MQTTPublisher:
         self.port = config["port"]
         self.topic = config["topic"]
         self.qos = config.get("qos", 0)
+        # Кодек пакета; для всех, кроме json, он добавляется в конец топика
+        self.codec = config.get("codec", "json")
+        check_codec(self.codec)
+        # Топик может быть шаблоном: mimics/{sensor_id}/data
+        self.publish_topic = codec_topic(self.topic, self.codec)
+        self._topics: Dict[str, str] = {}
+        self.reconnect_min_delay = config.get("reconnect_min_delay", 1)
+        self.reconnect_max_delay = config.get("reconnect_max_delay", 60)
         self.username = config.get("username", "")
         self.password = config.get("password", "")
+        # max_queued > 0 — ограниченная очередь и отдельный поток отправки,
+        # 0 — публикация прямо из потока генератора (как раньше)
+        self.max_queued = config.get("max_queued", 0)
+        self.max_inflight = config.get("max_inflight", 20)
+        self.queue_policy = config.get("queue_policy", "block")
+        self.ack_timeout = config.get("ack_timeout", 30.0)
+        if self.queue_policy not in MQTT_QUEUE_POLICIES:
+            raise ValueError(f"Unknown MQTT queue policy: {self.queue_policy}")
+        # Спул на диске (spool_dir): пакеты на время обрыва связи или переполнения
+        # очереди; после переподключения досылаются по порядку со скоростью spool_replay_rate
+        self.spool = None
+        self.spool_replay_rate = config.get("spool_replay_rate", 200)
+        if config.get("spool_dir"):
+            self.spool = DiskSpool(
+                config["spool_dir"],
+                segment_bytes=config.get("spool_segment_bytes", SPOOL_SEGMENT_BYTES),
+                max_segments=config.get("spool_max_segments", SPOOL_MAX_SEGMENTS),
+                fsync_batch=config.get("spool_fsync_batch", 100),
+            )
 
         # Уникальный client_id + clean_session=True
         client_id = f"mimics_{uuid.uuid4().hex[:8]}"
@@ -39,6 +92,30 @@ class MQTTPublisher:
 
         if self.username or self.password:
             self.client.username_pw_set(self.username, self.password)
+        self.client.max_inflight_messages_set(self.max_inflight)
+        # Переподключение делает сетевой цикл paho с экспоненциальной паузой
+        self.client.reconnect_delay_set(self.reconnect_min_delay, self.reconnect_max_delay)
+        self.client_id = client_id
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+        self.last_rc = None
+
+        # Очередь на отправку: (байты, packet_timestamp, топик)
+        self._queue = deque()
+        self._cond = Condition()
+        # mid → packet_timestamp для отправленных, но не подтверждённых сообщений
+        self._inflight: Dict[int, tuple] = {}
+        # Подтверждения, пришедшие раньше, чем publish() вернул mid
+        self._early_acks = set()
+        self._latencies = deque(maxlen=ACK_LATENCY_WINDOW)
+        self._counters = {"published": 0, "acked": 0, "dropped": 0, "expired": 0}
+        self._running = True
+        self._sender = None
+        self._replayer = None
+        # Решение «в спул или сразу» и досылка из спула идут под одной блокировкой,
+        # поэтому пакеты не обгоняют уже записанные в спул
+        self._spool_lock = Lock()
 
         # Колбэки
         self.client.on_connect = self._on_connect
@@ -48,6 +125,12 @@ class MQTTPublisher:
         # Подключаемся к брокеру и запускаем loop
         self.client.connect(self.broker, self.port, keepalive=60)
         self.client.loop_start()
+        if self.max_queued > 0:
+            self._sender = Thread(target=self._send_loop, name="mqtt-sender", daemon=True)
+            self._sender.start()
+        if self.spool is not None:
+            self._replayer = Thread(target=self._replay_loop, name="mqtt-spool-replay", daemon=True)
+            self._replayer.start()
 
         logger.debug(
             f"MQTT: Initialised client_id={client_id}, broker={self.broker}:{self.port}"
@@ -70,7 +153,10 @@ class MQTTPublisher:
         }.get(rc, f"Unknown ({rc})")
 
     def _on_connect(self, client, userdata, flags, rc):
+        self.last_rc = rc
         if rc == 0:
+            self.connected = True
+            self.connects += 1
             logger.info(
                 f"MQTT: Connected to {self.broker}:{self.port} "
                 f"clean_session={client._clean_session}"
@@ -79,43 +165,219 @@ class MQTTPublisher:
             logger.error(f"MQTT: Connect failed: {self._reason_str(rc)}")
 
     def _on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        self.disconnects += 1
+        self.last_rc = rc
         logger.warning(f"MQTT: Disconnected: {self._reason_str(rc)}")
 
     def _on_publish(self, client, userdata, mid):
-        logger.debug(f"MQTT: Message {mid} published to {self.topic}")
+        # Вызывается из потока paho под его блокировкой исходящих сообщений,
+        # поэтому отправитель не держит self._cond во время client.publish()
+        logger.debug(f"MQTT: Message {mid} published by {self.client_id}")
+        if self._sender is None:
+            return
+        with self._cond:
+            sent = self._inflight.pop(mid, None)
+            if sent is None:
+                self._early_acks.add(mid)
+                return
+            self._record_ack(sent)
+            self._cond.notify_all()
+
+    def _record_ack(self, sent: tuple):
+        packet_time, _ = sent
+        self._counters["acked"] += 1
+        if packet_time is not None:
+            self._latencies.append(time.time() - packet_time)
 
     # --------------------------------------------------------------------- #
     #                           Публикация пакета                            #
     # --------------------------------------------------------------------- #
 
-    def publish_packet(self, packet: List[Dict[str, Any]], target_time: float | None = None):
+    def publish_packet(
+        self,
+        packet: List[Dict[str, Any]],
+        target_time: float | None = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
         """
-        Формирует «обёртку» пакета и публикует JSON.
-        Также добавляет данные в очередь для WebSocket.
+        Формирует «обёртку» пакета и публикует её в MQTT в кодеке self.codec.
+        Возвращает размер опубликованного сообщения в байтах или None, если пакет
+        выброшен (очередь заполнена, политика drop_newest).
+        block=True — в режиме очереди ждать места, какой бы ни была queue_policy.
+        Раздача в WebSocket и другие приёмники — core.sinks.SinkPipeline.
         """
-        payload = {
-            "sensor_id": "mimics_v1",
-            "packet": packet,
-            "packet_size": len(packet),
-            "packet_timestamp": target_time or time.time(),
+        return self.publish_payload(build_payload(packet, target_time, sensor_id), block)
+
+    def publish_payload(self, payload: Dict[str, Any], block: bool = None) -> Optional[int]:
+        """Публикует готовую «обёртку» пакета только в MQTT; возвращает размер в байтах (None — выброшен)."""
+        return self.publish_bytes(
+            self.encode(payload), payload.get("packet_timestamp"), payload["sensor_id"], block
+        )
+
+    def publish_json(
+        self,
+        data: bytes,
+        packet_time: float = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
+        """
+        Публикует «обёртку», уже закодированную в JSON (кодек json): байты уходят как есть,
+        для другого кодека «обёртка» разбирается и перекодируется.
+        """
+        if self.codec == "json":
+            return self.publish_bytes(data, packet_time, sensor_id, block)
+        return self.publish_payload(json.loads(data), block)
+
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        """«Обёртка» пакета → байты сообщения в кодеке публикатора."""
+        return encode_payload(payload, self.codec)
+
+    def topic_for(self, sensor_id: str) -> str:
+        """Топик датчика: шаблон топика с подставленным sensor_id и суффиксом кодека."""
+        topic = self._topics.get(sensor_id)
+        if topic is None:
+            topic = self._topics[sensor_id] = codec_topic(self.topic.format(sensor_id=sensor_id), self.codec)
+        return topic
+
+    def publish_bytes(
+        self,
+        data: bytes,
+        packet_time: float = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
+        """
+        Публикует уже закодированный (self.encode) пакет. В режиме очереди только ставит его
+        в очередь (по политике queue_policy при переполнении; None — пакет выброшен). Со спулом, пока нет связи,
+        очередь заполнена или в спуле есть недосланное, пакет пишется в спул.
+        packet_time — packet_timestamp пакета, от него считается задержка подтверждения.
+        """
+        topic = self.topic_for(sensor_id)
+        if self.spool is None:
+            return self._publish(topic, data, packet_time, block)
+        with self._spool_lock:
+            if not self.connected or self.spool.depth or self._queue_full():
+                self.spool.append(topic, data, packet_time)
+                return len(data)
+            return self._publish(topic, data, packet_time, block)
+
+    def _queue_full(self) -> bool:
+        return self._sender is not None and len(self._queue) >= self.max_queued
+
+    def _publish(self, topic: str, data: bytes, packet_time: float = None, block: bool = None) -> Optional[int]:
+        if self._sender is None:
+            logger.debug(f"MQTT: Publishing packet → {topic}: {len(data)} bytes")
+            self.client.publish(topic, payload=data, qos=self.qos)
+            return len(data)
+
+        with self._cond:
+            policy = "block" if block else self.queue_policy
+            if len(self._queue) >= self.max_queued:
+                if policy == "drop_newest":
+                    self._counters["dropped"] += 1
+                    return None
+                if policy == "drop_oldest":
+                    self._queue.popleft()
+                    self._counters["dropped"] += 1
+                else:
+                    while self._running and len(self._queue) >= self.max_queued:
+                        self._cond.wait(0.5)
+            self._queue.append((data, packet_time, topic))
+            self._cond.notify_all()
+        return len(data)
+
+    def _send_loop(self):
+        """Поток отправки: держит в полёте не больше max_inflight сообщений."""
+        while True:
+            with self._cond:
+                while self._running and (not self._queue or len(self._inflight) >= self.max_inflight):
+                    self._expire_inflight()
+                    self._cond.wait(0.5)
+                if not self._running:
+                    return
+                data, packet_time, topic = self._queue.popleft()
+                self._cond.notify_all()
+
+            info = self.client.publish(topic, payload=data, qos=self.qos)
+
+            with self._cond:
+                self._counters["published"] += 1
+                sent = (packet_time, time.monotonic())
+                if info.mid in self._early_acks:
+                    self._early_acks.discard(info.mid)
+                    self._record_ack(sent)
+                elif info.rc == mqtt.MQTT_ERR_SUCCESS or self.qos > 0:
+                    # При обрыве связи paho держит QoS 1/2 у себя и дошлёт после переподключения
+                    self._inflight[info.mid] = sent
+
+    def _replay_loop(self):
+        """Поток досылки: после переподключения отправляет спул по порядку с ограничением скорости."""
+        bucket = TokenBucket(self.spool_replay_rate)
+        while self._running:
+            if not self.connected or not self.spool.depth or self._queue_full():
+                time.sleep(0.1)
+                continue
+            with self._spool_lock:
+                record = self.spool.pop()
+                if record is not None:
+                    self._publish(*record)
+            if record is not None:
+                delay = bucket.consume(1)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _expire_inflight(self):
+        """Сообщения без подтверждения дольше ack_timeout больше не занимают слот."""
+        deadline = time.monotonic() - self.ack_timeout
+        expired = [mid for mid, (_, sent_at) in self._inflight.items() if sent_at < deadline]
+        for mid in expired:
+            del self._inflight[mid]
+        self._counters["expired"] += len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Глубина очереди, сообщения в полёте и перцентили задержки подтверждения."""
+        common = {
+            "client_id": self.client_id,
+            "connected": self.connected,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "last_rc": self.last_rc,
         }
-        data = json.dumps(payload, ensure_ascii=False)
-        logger.info(f"MQTT: Publishing packet → {self.topic}: {data}")
-        self.client.publish(self.topic, payload=data, qos=self.qos)
-        
-        # Добавляем данные в очередь для WebSocket
-        try:
-            # Импортируем функцию вместо прямого доступа к переменным
-            sys.path.insert(0, str(project_root))
-            from api.data_queue import add_data_to_queue
-            
-            # Используем функцию для добавления данных в очередь
-            add_data_to_queue(payload)
-            logger.info(f"Данные добавлены в очередь через add_data_to_queue: {len(packet)} точек")
-        except Exception as e:
-            logger.error(f"Ошибка передачи в WebSocket: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+        if self.spool is not None:
+            common["spool"] = {
+                **self.spool.get_stats(),
+                "replay_rate": self.spool_replay_rate,
+                "replaying": self.connected and self.spool.depth > 0,
+            }
+        if self._sender is None:
+            return {"mode": "direct", "qos": self.qos, "codec": self.codec, "topic": self.publish_topic, **common}
+        with self._cond:
+            latencies = np.array(self._latencies, dtype=np.float64) * 1000
+            stats = {
+                "mode": "queued",
+                "qos": self.qos,
+                "codec": self.codec,
+                "topic": self.publish_topic,
+                **common,
+                "policy": self.queue_policy,
+                "queue_depth": len(self._queue),
+                "max_queued": self.max_queued,
+                "inflight": len(self._inflight),
+                "max_inflight": self.max_inflight,
+                **self._counters,
+            }
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            stats["ack_latency_ms"] = {
+                "p50": round(float(p50), 3),
+                "p90": round(float(p90), 3),
+                "p99": round(float(p99), 3),
+                "max": round(float(latencies.max()), 3),
+            }
+        return stats
 
     # --------------------------------------------------------------------- #
 
@@ -123,6 +385,15 @@ class MQTTPublisher:
         """
         Корректно останавливает loop и разрывает соединение.
         """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._sender is not None:
+            self._sender.join(timeout=2)
+        if self._replayer is not None:
+            self._replayer.join(timeout=2)
+        if self.spool is not None:
+            self.spool.close()
         self.client.loop_stop()
         self.client.disconnect()
         logger.info("MQTT: Client shutdown")
\ No newline at end of file
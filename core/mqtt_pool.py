@@ -0,0 +1,99 @@
+import os
+import zlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from .mqtt_client import MQTTPublisher, build_payload, DEFAULT_SENSOR_ID
+
+logger = logging.getLogger("MQTTPool")
+
+
+class MQTTPool:
+    """
+    Пул из size MQTT-соединений с одной конфигурацией (брокер, QoS, кодек,
+    очередь, паузы переподключения). Каждое соединение — отдельный
+    MQTTPublisher со своим сетевым циклом paho; датчик всегда публикуется через
+    одно и то же соединение (crc32(sensor_id) % size), поэтому порядок пакетов
+    датчика сохраняется. Топик — шаблон с {sensor_id}.
+    Интерфейс тот же, что у MQTTPublisher: подставляется в MQTTSink.
+    """
+
+    def __init__(self, config: Dict[str, Any], size: int):
+        if size <= 0:
+            raise ValueError("MQTT pool size must be positive")
+        self.topic = config["topic"]
+        self.codec = config.get("codec", "json")
+        self.publishers: List[MQTTPublisher] = []
+        try:
+            for index in range(size):
+                client_config = config
+                if config.get("spool_dir"):
+                    # У каждого соединения свой спул: порядок досылки — внутри соединения
+                    client_config = {**config, "spool_dir": os.path.join(config["spool_dir"], str(index))}
+                self.publishers.append(MQTTPublisher(client_config))
+        except Exception:
+            self.shutdown()
+            raise
+        logger.info(f"MQTTPool: {size} connections to {config['broker']}:{config['port']}")
+
+    def publisher_for(self, sensor_id: str) -> MQTTPublisher:
+        return self.publishers[zlib.crc32(sensor_id.encode("utf-8")) % len(self.publishers)]
+
+    def publish_packet(
+        self,
+        packet: List[Dict[str, Any]],
+        target_time: float = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
+        return self.publish_payload(build_payload(packet, target_time, sensor_id), block)
+
+    def publish_payload(self, payload: Dict[str, Any], block: bool = None) -> Optional[int]:
+        return self.publisher_for(payload["sensor_id"]).publish_payload(payload, block)
+
+    def publish_json(
+        self,
+        data: bytes,
+        packet_time: float = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
+        return self.publisher_for(sensor_id).publish_json(data, packet_time, sensor_id, block)
+
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        return self.publishers[0].encode(payload)
+
+    def publish_bytes(
+        self,
+        data: bytes,
+        packet_time: float = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
+        return self.publisher_for(sensor_id).publish_bytes(data, packet_time, sensor_id, block)
+
+    def topic_for(self, sensor_id: str) -> str:
+        return self.publisher_for(sensor_id).topic_for(sensor_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Состояние каждого соединения и сводка по пулу."""
+        clients = [publisher.get_stats() for publisher in self.publishers]
+        stats = {
+            "mode": "pool",
+            "size": len(clients),
+            "connected": sum(1 for client in clients if client["connected"]),
+            "topic": self.topic,
+            "codec": self.codec,
+            "clients": clients,
+        }
+        for counter in ("published", "acked", "dropped", "expired", "queue_depth", "inflight"):
+            if counter in clients[0]:
+                stats[counter] = sum(client[counter] for client in clients)
+        if "spool" in clients[0]:
+            stats["spool_depth"] = sum(client["spool"]["depth"] for client in clients)
+        return stats
+
+    def shutdown(self):
+        for publisher in self.publishers:
+            publisher.shutdown()
+        logger.info("MQTTPool: Shutdown")
@@ -2,5 +2,13 @@ from .base import Primitive
 from .constant import ConstantPrimitive
 from .formula import FormulaPrimitive
 from .noise import NoisePrimitive
+from .random_walk import RandomWalkPrimitive
+from .autoregressive import AutoregressivePrimitive
+from .ornstein_uhlenbeck import OrnsteinUhlenbeckPrimitive
+from .replay import ReplayPrimitive
 
-__all__ = ['Primitive', 'ConstantPrimitive', 'FormulaPrimitive', 'NoisePrimitive']
\ No newline at end of file
+__all__ = [
+    'Primitive', 'ConstantPrimitive', 'FormulaPrimitive', 'NoisePrimitive',
+    'RandomWalkPrimitive', 'AutoregressivePrimitive', 'OrnsteinUhlenbeckPrimitive',
+    'ReplayPrimitive'
+]
@@ -0,0 +1,53 @@
+from typing import List
+
+import numpy as np
+
+from .stochastic import StochasticPrimitive, ar1_recursion, arp_recursion
+
+class AutoregressivePrimitive(StochasticPrimitive):
+    """
+    AR(p) вокруг среднего: y_k = sum(phi_i * y_{k-i}) + sigma * z_k,
+    значение — mean + y_k. Шаг процесса — один отсчёт.
+    """
+
+    def __init__(self, coefficients: List[float], mean: float = 0.0, sigma: float = 1.0, seed: int = None):
+        if not coefficients:
+            raise ValueError("AR process needs at least one coefficient")
+        super().__init__(seed)
+        self.coefficients = [float(c) for c in coefficients]
+        self.mean = mean
+        self.sigma = sigma
+        # Последние p отклонений от среднего, самое свежее первым
+        self.history = [0.0] * len(self.coefficients)
+
+    def generate(self, t: float) -> float:
+        y = sum(phi * h for phi, h in zip(self.coefficients, self.history)) + self.sigma * self._normal()
+        self.history = [y] + self.history[:-1]
+        return self.mean + y
+
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        n = len(t)
+        e = self.sigma * self._normals(n)
+        p = len(self.coefficients)
+        if p == 1:
+            y = ar1_recursion(self.history[0], self.coefficients[0], e)
+        else:
+            y = arp_recursion(self.history, self.coefficients, e)
+        if n:
+            recent = y[::-1][:p].tolist()
+            self.history = (recent + self.history)[:p]
+        return self.mean + y
+
+    def _get_process_state(self) -> dict:
+        return {"history": list(self.history)}
+
+    def _set_process_state(self, state: dict):
+        self.history = [float(h) for h in state["history"]]
+
+    def get_config(self) -> dict:
+        return {
+            "coefficients": self.coefficients,
+            "mean": self.mean,
+            "sigma": self.sigma,
+            "seed": self.seed
+        }
@@ -1,10 +1,25 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 class Primitive(ABC):
     @abstractmethod
     def generate(self, t: float) -> float:
         pass
+
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        """Значения для массива моментов времени (по умолчанию — поэлементно через generate)"""
+        return np.fromiter(map(self.generate, t.tolist()), dtype=np.float64, count=len(t))
+
+    def evaluate(self, t: np.ndarray, absolute_t: np.ndarray, frequency_hz: float) -> np.ndarray:
+        """
+        Чистое вычисление без изменения состояния: t — время внутри эпизода,
+        absolute_t — время сценария, frequency_hz — частота потока (по ним
+        примитивы со случайностью находят номер отсчёта).
+        По умолчанию совпадает с generate_batch — для детерминированных примитивов.
+        """
+        return self.generate_batch(t)
     
     @abstractmethod
     def get_config(self) -> dict:
-        pass
\ No newline at end of file
+        pass
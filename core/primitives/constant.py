@@ -1,3 +1,5 @@
+import numpy as np
+
 from .base import Primitive
 
 class ConstantPrimitive(Primitive):
@@ -7,5 +9,8 @@ class ConstantPrimitive(Primitive):
     def generate(self, t: float) -> float:
         return self.value
 
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        return np.full(len(t), self.value, dtype=np.float64)
+
     def get_config(self) -> dict:
         return {"value": self.value}
\ No newline at end of file
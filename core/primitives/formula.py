@@ -1,23 +1,249 @@
+import ast
 import math
+from functools import reduce
+from types import SimpleNamespace
+
+import numpy as np
+
 from .base import Primitive
 
+# Встроенные функции, разрешённые в формулах помимо math.*
+SAFE_BUILTINS = {
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "round": round,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Attribute, ast.Constant, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# Целочисленные функции, время которых не ограничено (math.factorial(10 ** 7) считается минутами)
+_UNBOUNDED_MATH = frozenset({"factorial", "comb", "perm"})
+_MATH_NAMES = frozenset(name for name in dir(math) if not name.startswith("_")) - _UNBOUNDED_MATH
+
+# math.* → эквивалентные ufunc NumPy для векторного пути
+_NUMPY_MATH = {
+    "sin": np.sin, "cos": np.cos, "tan": np.tan,
+    "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan, "atan2": np.arctan2,
+    "sinh": np.sinh, "cosh": np.cosh, "tanh": np.tanh,
+    "asinh": np.arcsinh, "acosh": np.arccosh, "atanh": np.arctanh,
+    "exp": np.exp, "exp2": np.exp2, "expm1": np.expm1,
+    "log": np.log, "log2": np.log2, "log10": np.log10, "log1p": np.log1p,
+    "sqrt": np.sqrt, "cbrt": np.cbrt, "pow": np.float_power, "hypot": np.hypot,
+    "fabs": np.fabs, "floor": np.floor, "ceil": np.ceil, "trunc": np.trunc,
+    "fmod": np.fmod, "copysign": np.copysign,
+    "degrees": np.degrees, "radians": np.radians,
+    "pi": math.pi, "e": math.e, "tau": math.tau, "inf": math.inf, "nan": math.nan,
+}
+
+# Узлы, которые поэлементно не векторизуются (ветвления и сравнения)
+_SCALAR_ONLY_NODES = (ast.IfExp, ast.BoolOp, ast.Compare, ast.Not)
+
+# Точки, в которых векторный путь сверяется со скалярным при компиляции
+_CHECK_POINTS = np.array([0.0, 0.25, 1.0, 2.5, 7.3, 100.0])
+
+
+def _np_reduce(ufunc):
+    def func(*args):
+        if len(args) < 2:
+            raise TypeError("vectorized min/max need at least two arguments")
+        return reduce(ufunc, args)
+    return func
+
+
+def _np_round(x, *ndigits):
+    # round(x, n) NumPy считает иначе, чем Python (через масштабирование)
+    if ndigits:
+        raise TypeError("round with ndigits is not vectorized")
+    return np.round(x)
+
+
+_NUMPY_BUILTINS = {
+    "abs": np.abs,
+    "min": _np_reduce(np.minimum),
+    "max": _np_reduce(np.maximum),
+    "round": _np_round,
+}
+
+
+def _validate(tree: ast.Expression, names: frozenset):
+    """Проверяет, что выражение использует только t, переменные и math.*"""
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in formula: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"Unsupported constant in formula: {node.value!r}")
+        if isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id == "math"):
+                raise ValueError("Only math.<name> attributes are allowed in formula")
+            if node.attr not in _MATH_NAMES:
+                raise ValueError(f"Unknown math function: math.{node.attr}")
+        if isinstance(node, ast.Name) and node.id not in names:
+            raise ValueError(f"Unknown name in formula: {node.id}")
+        if isinstance(node, ast.Call):
+            if node.keywords:
+                raise ValueError("Keyword arguments are not allowed in formula")
+            if isinstance(node.func, ast.Name) and node.func.id not in SAFE_BUILTINS:
+                raise ValueError(f"Function is not allowed in formula: {node.func.id}")
+            if not isinstance(node.func, (ast.Name, ast.Attribute)):
+                raise ValueError("Only direct function calls are allowed in formula")
+
+
+class _FloatPower(ast.NodeTransformer):
+    """
+    a ** b → math.pow(a, b): степень всегда считается во float. Целые в степени
+    считаются точно и могут не закончиться (9**9**9, 2 ** math.floor(1e10)),
+    а во float такое выражение сразу даёт OverflowError.
+    """
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Pow):
+            return node
+        func = ast.Attribute(value=ast.Name(id="math", ctx=ast.Load()), attr="pow", ctx=ast.Load())
+        return ast.copy_location(ast.Call(func=func, args=[node.left, node.right], keywords=[]), node)
+
+
+def _parse(expression: str) -> ast.Expression:
+    try:
+        return ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid formula syntax: {expression!r} ({e.msg})") from None
+    except (MemoryError, RecursionError):
+        # Слишком глубокая вложенность (например, тысячи унарных минусов подряд)
+        raise ValueError("Formula is nested too deeply") from None
+
+
+def _lambda_code(tree: ast.Expression):
+    """
+    Оборачивает выражение в lambda t: ..., чтобы не вызывать eval на каждый отсчёт;
+    возведение в степень заменяется на math.pow (см. _FloatPower)
+    """
+    tree = _FloatPower().visit(tree)
+    lambda_tree = ast.Expression(body=ast.Lambda(
+        args=ast.arguments(
+            posonlyargs=[], args=[ast.arg(arg="t")], kwonlyargs=[],
+            kw_defaults=[], defaults=[]
+        ),
+        body=tree.body,
+    ))
+    ast.fix_missing_locations(lambda_tree)
+    return compile(lambda_tree, "<formula>", "eval")
+
+
+def compile_formula(expression: str, variables: dict):
+    """
+    Разбирает и проверяет выражение один раз и возвращает функцию f(t).
+    Допустимы только t, объявленные переменные, math.* и SAFE_BUILTINS.
+    """
+    for name in variables:
+        if name in ("t", "math") or name in SAFE_BUILTINS:
+            raise ValueError(f"Reserved name cannot be used as formula variable: {name}")
+
+    tree = _parse(expression)
+    _validate(tree, frozenset({"t", "math", *variables, *SAFE_BUILTINS}))
+
+    namespace = {"__builtins__": {}, "math": math, **SAFE_BUILTINS, **variables}
+    func = eval(_lambda_code(tree), namespace)
+
+    # Пробное вычисление: ловим ошибки типов (например, строковые переменные).
+    # Ошибки области определения (log(0) и т.п.) допустимы в отдельных точках.
+    try:
+        func(0.0)
+    except (ArithmeticError, ValueError):
+        pass
+    except Exception as e:
+        raise ValueError(f"Formula cannot be evaluated: {expression!r} ({e})") from None
+
+    return func
+
+
+def compile_formula_batch(expression: str, variables: dict, scalar_func):
+    """
+    Векторная версия уже проверенной формулы: то же выражение, но math.* и
+    встроенные функции подменены ufunc NumPy, t — массив. Возвращает None,
+    если выражение не векторизуется (ветвления, сравнения, функции без
+    аналога в NumPy) или расходится со скалярной версией.
+    """
+    tree = _parse(expression)
+    for node in ast.walk(tree):
+        if isinstance(node, _SCALAR_ONLY_NODES):
+            return None
+        if isinstance(node, ast.Attribute) and node.attr not in _NUMPY_MATH:
+            return None
+
+    namespace = {
+        "__builtins__": {}, "math": SimpleNamespace(**_NUMPY_MATH),
+        **_NUMPY_BUILTINS, **variables
+    }
+    func = eval(_lambda_code(tree), namespace)
+
+    # Сверяем с поштучным вычислением там, где скалярный путь определён
+    try:
+        with np.errstate(all="ignore"):
+            batch = np.broadcast_to(np.asarray(func(_CHECK_POINTS), dtype=np.float64), _CHECK_POINTS.shape)
+    except Exception:
+        return None
+    for t, value in zip(_CHECK_POINTS.tolist(), batch.tolist()):
+        try:
+            expected = float(scalar_func(t))
+        except (ArithmeticError, ValueError, TypeError):
+            continue
+        if not math.isclose(value, expected, rel_tol=1e-9, abs_tol=1e-12) and not (
+            math.isnan(value) and math.isnan(expected)
+        ):
+            return None
+    return func
+
+
 class FormulaPrimitive(Primitive):
-    def __init__(self, expression: str, variables: dict = None):
+    def __init__(self, expression: str, variables: dict = None, vectorize: bool = True):
         self.expression = expression
         self.variables = variables or {}
+        self._func = compile_formula(self.expression, self.variables)
+        self._batch_func = None
+        if vectorize:
+            self._batch_func = compile_formula_batch(self.expression, self.variables, self._func)
+        # Какой путь используется для пакетов: векторный NumPy или поштучный
+        self.vectorized = self._batch_func is not None
+        self._vectorize = vectorize
 
     def generate(self, t: float) -> float:
         try:
-            return eval(
-                self.expression,
-                {"math": math, "t": t},
-                self.variables
-            )
-        except Exception:
+            return self._func(t)
+        except (ArithmeticError, ValueError):
             return 0.0
 
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        if self._batch_func is None:
+            return super().generate_batch(t)
+        with np.errstate(all="ignore"):
+            values = self._batch_func(t)
+        if values is t:
+            values = t.copy()
+        elif np.ndim(values) == 0:
+            # Выражение без t
+            values = np.full(len(t), values, dtype=np.float64)
+        else:
+            values = np.asarray(values, dtype=np.float64)
+        # inf/nan — там, где скалярный путь бросил бы исключение; пересчитываем
+        # эти точки поштучно, чтобы результат (0.0 и т.п.) совпадал
+        bad = ~np.isfinite(values)
+        if bad.any():
+            values[bad] = [self.generate(x) for x in t[bad].tolist()]
+        return values
+
     def get_config(self) -> dict:
-        return {
+        config = {
             "expression": self.expression,
             "variables": self.variables
-        }
\ No newline at end of file
+        }
+        if not self._vectorize:
+            config["vectorize"] = False
+        return config
@@ -1,17 +1,82 @@
-import random
+import numpy as np
+
 from .base import Primitive
 
+# Сколько нормальных величин вытягивается из генератора за раз для скалярного пути
+NOISE_BUFFER_SIZE = 4096
+
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """Финализатор splitmix64: uint64 → равномерно перемешанные uint64."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def keyed_normal(seed: int, index: np.ndarray) -> np.ndarray:
+    """
+    Стандартные нормальные величины, однозначно заданные парой (seed, номер
+    отсчёта): счётчиковый хэш + преобразование Бокса — Мюллера. Не зависят от
+    порядка и количества запросов.
+    """
+    offset = np.uint64((seed * _GOLDEN) & _MASK64)
+    key = index.astype(np.int64).view(np.uint64) * np.uint64(2) + offset
+    h1 = _mix64(key)
+    h2 = _mix64(key + np.uint64(1))
+    # 53 старших бита → [0, 1); 1 - u1 исключает log(0)
+    u1 = (h1 >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+    u2 = (h2 >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+    return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
 class NoisePrimitive(Primitive):
-    def __init__(self, mean: float = 0.0, amplitude: float = 1.0):
+    def __init__(self, mean: float = 0.0, amplitude: float = 1.0, seed: int = None):
         self.mean = mean
         self.amplitude = amplitude
+        self.seed = seed
+        # У каждого примитива свой генератор: потоки не делят глобальное состояние,
+        # а одинаковый seed даёт одинаковую последовательность
+        self._rng = np.random.default_rng(seed)
+        self._buffer = []
+        self._pos = 0
+        # Ключ для evaluate(): без seed — случайный, но постоянный для экземпляра
+        self._key = seed if seed is not None else int(self._rng.integers(2 ** 63))
+
+    def _refill(self):
+        self._buffer = self._rng.standard_normal(NOISE_BUFFER_SIZE).tolist()
+        self._pos = 0
 
     def generate(self, t: float) -> float:
-        # Генерация нормально распределённого шума
-        return self.mean + self.amplitude * random.normalvariate(0, 1)
+        # Генерация нормально распределённого шума из заранее вытянутого буфера
+        if self._pos >= len(self._buffer):
+            self._refill()
+        z = self._buffer[self._pos]
+        self._pos += 1
+        return self.mean + self.amplitude * z
+
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        # Сначала дочитываем буфер, остаток тянем одним вызовом — последовательность
+        # та же, что и при поштучном вызове generate
+        n = len(t)
+        buffered = self._buffer[self._pos:self._pos + n]
+        self._pos += len(buffered)
+        z = np.empty(n, dtype=np.float64)
+        z[:len(buffered)] = buffered
+        if n > len(buffered):
+            z[len(buffered):] = self._rng.standard_normal(n - len(buffered))
+        return self.mean + self.amplitude * z
+
+    def evaluate(self, t: np.ndarray, absolute_t: np.ndarray, frequency_hz: float) -> np.ndarray:
+        # Значение зависит только от (seed, номер отсчёта потока), а не от истории вызовов:
+        # моменты внутри одного отсчёта получают одно значение
+        index = np.rint(np.asarray(absolute_t, dtype=np.float64) * frequency_hz)
+        return self.mean + self.amplitude * keyed_normal(self._key, index)
 
     def get_config(self) -> dict:
         return {
             "mean": self.mean,
-            "amplitude": self.amplitude
-        }
\ No newline at end of file
+            "amplitude": self.amplitude,
+            "seed": self.seed
+        }
@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+from .stochastic import StochasticPrimitive, ar1_recursion
+
+# Шаг времени округляется до наносекунд, чтобы накопленная погрешность
+# моментов времени не дробила пакет на участки с «разным» шагом
+_DT_DECIMALS = 9
+
+class OrnsteinUhlenbeckPrimitive(StochasticPrimitive):
+    """
+    Процесс Орнштейна — Уленбека: dx = theta * (mean - x) dt + sigma dW.
+    Точная дискретизация по фактическому шагу между отсчётами, поэтому
+    параметры не зависят от частоты потока. Первый отсчёт — start.
+    """
+
+    def __init__(
+        self,
+        mean: float = 0.0,
+        theta: float = 1.0,
+        sigma: float = 1.0,
+        start: float = None,
+        seed: int = None
+    ):
+        if theta <= 0:
+            raise ValueError("OU theta must be positive")
+        super().__init__(seed)
+        self.mean = mean
+        self.theta = theta
+        self.sigma = sigma
+        self.start = start
+        self.x = mean if start is None else start
+        self.last_t = None
+        # Последний положительный шаг: при переходе на новый круг зацикленного
+        # эпизода время внутри эпизода уменьшается, шаг берём прежний
+        self.dt = 0.0
+
+    def _coefficients(self, dt):
+        a = np.exp(-self.theta * dt)
+        scale = self.sigma * np.sqrt((1.0 - a * a) / (2.0 * self.theta))
+        return a, scale
+
+    def generate(self, t: float) -> float:
+        if self.last_t is not None:
+            dt = round(t - self.last_t, _DT_DECIMALS)
+            if dt > 0:
+                self.dt = dt
+            a = math.exp(-self.theta * self.dt)
+            scale = self.sigma * math.sqrt((1.0 - a * a) / (2.0 * self.theta))
+            self.x = self.mean + a * (self.x - self.mean) + scale * self._normal()
+        self.last_t = t
+        return self.x
+
+    def _steps(self, t: np.ndarray) -> np.ndarray:
+        """Шаг перед каждым отсчётом пакета (0 для самого первого отсчёта)"""
+        first = self.last_t is None
+        dt = np.round(np.diff(t, prepend=t[0] if first else self.last_t), _DT_DECIMALS)
+        # Неположительные шаги заменяем последним положительным
+        valid = np.where(dt > 0, np.arange(len(dt)), -1)
+        valid = np.maximum.accumulate(valid)
+        dt = np.where(valid >= 0, dt[np.maximum(valid, 0)], self.dt)
+        if first:
+            dt[0] = 0.0
+        return dt
+
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        n = len(t)
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+        dt = self._steps(t)
+        # Первый отсчёт потока — без шага и без случайной величины (как в generate)
+        skip_first = self.last_t is None
+        z = np.zeros(n, dtype=np.float64)
+        z[int(skip_first):] = self._normals(n - int(skip_first))
+
+        a, scale = self._coefficients(dt)
+        e = scale * z
+        y = np.empty(n, dtype=np.float64)
+        y0 = self.x - self.mean
+        # Участки с постоянным шагом считаются одной рекурсией
+        bounds = np.flatnonzero(np.diff(dt)) + 1
+        lo = 0
+        for hi in list(bounds) + [n]:
+            y[lo:hi] = ar1_recursion(y0, float(a[lo]), e[lo:hi])
+            y0 = y[hi - 1]
+            lo = hi
+
+        self.x = self.mean + float(y[-1])
+        self.last_t = float(t[-1])
+        positive = dt[dt > 0]
+        if len(positive):
+            self.dt = float(positive[-1])
+        return self.mean + y
+
+    def _get_process_state(self) -> dict:
+        return {"x": self.x, "last_t": self.last_t, "dt": self.dt}
+
+    def _set_process_state(self, state: dict):
+        self.x = state["x"]
+        self.last_t = state["last_t"]
+        self.dt = state["dt"]
+
+    def get_config(self) -> dict:
+        return {
+            "mean": self.mean,
+            "theta": self.theta,
+            "sigma": self.sigma,
+            "start": self.start,
+            "seed": self.seed
+        }
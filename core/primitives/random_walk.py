@@ -0,0 +1,38 @@
+import numpy as np
+
+from .stochastic import StochasticPrimitive
+
+class RandomWalkPrimitive(StochasticPrimitive):
+    """Случайное блуждание: x_k = x_{k-1} + drift + step * z_k (на каждый отсчёт)"""
+
+    def __init__(self, start: float = 0.0, step: float = 1.0, drift: float = 0.0, seed: int = None):
+        super().__init__(seed)
+        self.start = start
+        self.step = step
+        self.drift = drift
+        self.x = start
+
+    def generate(self, t: float) -> float:
+        self.x += self.drift + self.step * self._normal()
+        return self.x
+
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        increments = self.drift + self.step * self._normals(len(t))
+        values = self.x + np.cumsum(increments)
+        if len(values):
+            self.x = float(values[-1])
+        return values
+
+    def _get_process_state(self) -> dict:
+        return {"x": self.x}
+
+    def _set_process_state(self, state: dict):
+        self.x = state["x"]
+
+    def get_config(self) -> dict:
+        return {
+            "start": self.start,
+            "step": self.step,
+            "drift": self.drift,
+            "seed": self.seed
+        }
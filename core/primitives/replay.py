@@ -0,0 +1,146 @@
+import os
+import weakref
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+from .base import Primitive
+
+# Каталог с записанными трассами; пути в конфиге — относительно него
+REPLAY_TRACE_DIR = Path(os.getenv("MIMICS_TRACE_DIR", "traces"))
+
+REPLAY_INTERPOLATIONS = ("linear", "nearest", "previous")
+
+# Отклонение позиции от целого индекса, при котором считаем её целой
+_INDEX_TOLERANCE = 1e-6
+
+# (файл, dtype, смещение) → отображение файла; общее для всех датчиков процесса
+_mapped = weakref.WeakValueDictionary()
+_lock = Lock()
+
+
+def resolve_trace_path(path: str) -> Path:
+    """Путь к трассе внутри REPLAY_TRACE_DIR (выход за каталог запрещён)."""
+    root = REPLAY_TRACE_DIR.resolve()
+    resolved = (root / path).resolve()
+    if resolved != root and root not in resolved.parents:
+        raise ValueError(f"Trace path must be inside {REPLAY_TRACE_DIR}: {path}")
+    if not resolved.is_file():
+        raise ValueError(f"Trace file not found: {path}")
+    return resolved
+
+
+def open_trace(path: Path, dtype: str = "float64", offset: int = 0) -> np.ndarray:
+    """
+    Отображает файл трассы в память только для чтения: .npy — через np.load,
+    остальное — как сырой массив dtype с заголовком offset байт.
+    """
+    key = (str(path), dtype, offset)
+    with _lock:
+        array = _mapped.get(key)
+        if array is None:
+            if path.suffix == ".npy":
+                array = np.load(path, mmap_mode="r")
+            else:
+                array = np.memmap(path, dtype=np.dtype(dtype), mode="r", offset=offset)
+            _mapped[key] = array
+    return array
+
+
+class ReplayPrimitive(Primitive):
+    """
+    Воспроизведение записанной трассы: значение берётся по индексу
+    t * sample_rate (с интерполяцией) из отображённого в память файла.
+    Файл не читается целиком; датчики с одной трассой делят одно отображение.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float,
+        start_index: int = 0,
+        end_index: int = None,
+        loop: bool = True,
+        interpolation: str = "linear",
+        column: int = None,
+        dtype: str = "float64",
+        offset: int = 0
+    ):
+        if sample_rate <= 0:
+            raise ValueError("Replay sample_rate must be positive")
+        if interpolation not in REPLAY_INTERPOLATIONS:
+            raise ValueError(f"Unknown replay interpolation: {interpolation}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.start_index = start_index
+        self.end_index = end_index
+        self.loop = loop
+        self.interpolation = interpolation
+        self.column = column
+        self.dtype = dtype
+        self.offset = offset
+
+        try:
+            trace = open_trace(resolve_trace_path(path), dtype, offset)
+        except (OSError, TypeError) as e:
+            raise ValueError(f"Cannot open trace {path}: {e}") from None
+        if trace.ndim == 2:
+            trace = trace[:, column if column is not None else -1]
+        elif trace.ndim != 1 or column is not None:
+            raise ValueError(f"Unsupported trace shape {trace.shape} for column {column}")
+        # Срез — представление того же отображения, без копирования
+        self._values = trace[start_index:end_index]
+        if len(self._values) == 0:
+            raise ValueError(f"Trace range is empty: {path}[{start_index}:{end_index}]")
+
+    @property
+    def duration(self) -> float:
+        """Длительность выбранного участка трассы, с"""
+        return len(self._values) / self.sample_rate
+
+    def generate(self, t: float) -> float:
+        return float(self.generate_batch(np.array([t], dtype=np.float64))[0])
+
+    def generate_batch(self, t: np.ndarray) -> np.ndarray:
+        values = self._values
+        size = len(values)
+        position = np.asarray(t, dtype=np.float64) * self.sample_rate
+        if self.loop:
+            position = np.mod(position, size)
+        else:
+            position = np.clip(position, 0, size - 1)
+
+        index = np.rint(position)
+        on_grid = np.abs(position - index) <= _INDEX_TOLERANCE
+        if self.interpolation != "linear" or on_grid.all():
+            if self.interpolation == "previous":
+                index = np.where(on_grid, index, np.floor(position))
+            index = index.astype(np.intp) % size
+            n = len(index)
+            # Отсчёты подряд без перехода через конец — просто срез файла
+            if n and index[-1] - index[0] == n - 1 and (n == 1 or np.all(np.diff(index) == 1)):
+                return np.array(values[index[0]:index[0] + n], dtype=np.float64)
+            return np.asarray(values[index], dtype=np.float64)
+
+        lower = np.floor(position)
+        fraction = position - lower
+        lower = lower.astype(np.intp) % size
+        upper = lower + 1
+        upper[upper >= size] = 0 if self.loop else size - 1
+        low_values = np.asarray(values[lower], dtype=np.float64)
+        high_values = np.asarray(values[upper], dtype=np.float64)
+        return low_values + fraction * (high_values - low_values)
+
+    def get_config(self) -> dict:
+        return {
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "start_index": self.start_index,
+            "end_index": self.end_index,
+            "loop": self.loop,
+            "interpolation": self.interpolation,
+            "column": self.column,
+            "dtype": self.dtype,
+            "offset": self.offset
+        }
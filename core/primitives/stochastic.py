@@ -0,0 +1,203 @@
+import copy
+import math
+from abc import abstractmethod
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+from .base import Primitive
+
+try:
+    from scipy.signal import lfilter, lfiltic
+except ImportError:  # SciPy необязателен: без него работает блочная рекурсия на NumPy
+    lfilter = lfiltic = None
+
+# Сколько нормальных величин вытягивается за раз для скалярного пути
+STOCHASTIC_BUFFER_SIZE = 1024
+
+# Длина блока в ar1_recursion: |a|^±L не выходит за e^50
+_AR1_BLOCK_EXPONENT = 50.0
+_AR1_MAX_BLOCK = 1024
+# Длина блока в arp_recursion (стоимость — n * L умножений в одном матричном произведении)
+_ARP_MAX_BLOCK = 64
+
+
+def ar1_recursion(y0: float, a: float, e: np.ndarray) -> np.ndarray:
+    """
+    y_k = a * y_{k-1} + e_k (k = 1..n) без цикла по отсчётам.
+    Со SciPy — lfilter, иначе по блокам: y_k = a^k * (y0 + cumsum(e_j / a^j)).
+    """
+    n = len(e)
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+    if a == 0.0:
+        return np.array(e, dtype=np.float64)
+    if lfilter is not None:
+        y, _ = lfilter([1.0], [1.0, -a], e, zi=[a * y0])
+        return y
+
+    log_a = abs(math.log(abs(a)))
+    block = _AR1_MAX_BLOCK if log_a == 0.0 else max(1, min(_AR1_MAX_BLOCK, int(_AR1_BLOCK_EXPONENT / log_a)))
+    powers = a ** np.arange(1, min(block, n) + 1, dtype=np.float64)
+    out = np.empty(n, dtype=np.float64)
+    for lo in range(0, n, block):
+        chunk = e[lo:lo + block]
+        p = powers[:len(chunk)]
+        out[lo:lo + len(chunk)] = p * (y0 + np.cumsum(chunk / p))
+        y0 = out[lo + len(chunk) - 1]
+    return out
+
+
+@lru_cache(maxsize=64)
+def _arp_matrices(coefficients: Tuple[float, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Матрицы блока AR(p) с матрицей-компаньоном C:
+    G[k] — первая строка C^(k+1) (вклад начального состояния в y_k),
+    T[i, j] = h_{i-j} — нижнетреугольная тёплицева матрица импульсной
+    характеристики h_k = (C^k)[0, 0] (вклад шума).
+    Длина блока — _ARP_MAX_BLOCK, а для взрывного процесса, как в ar1_recursion,
+    такая, чтобы степени C не выходили за e^50.
+    """
+    p = len(coefficients)
+    radius = float(np.abs(np.roots([1.0] + [-phi for phi in coefficients])).max())
+    block = _ARP_MAX_BLOCK
+    if radius > 1.0:
+        block = min(block, int(_AR1_BLOCK_EXPONENT / math.log(radius)))
+    block = max(block, p)
+
+    companion = np.zeros((p, p), dtype=np.float64)
+    companion[0] = coefficients
+    companion[np.arange(1, p), np.arange(p - 1)] = 1.0
+    G = np.empty((block, p), dtype=np.float64)
+    power = companion
+    for k in range(block):
+        G[k] = power[0]
+        power = companion @ power
+    h = np.concatenate(([1.0], G[:-1, 0]))
+    lag = np.arange(block)[:, None] - np.arange(block)[None, :]
+    T = np.where(lag >= 0, h[np.maximum(lag, 0)], 0.0)
+    G.flags.writeable = False
+    T.flags.writeable = False
+    return G, T
+
+
+def arp_recursion(history: List[float], coefficients: List[float], e: np.ndarray) -> np.ndarray:
+    """
+    y_k = sum(phi_i * y_{k-i}) + e_k (k = 1..n) без цикла по отсчётам;
+    history — последние p значений, самое свежее первым.
+    Со SciPy — lfilter, иначе блоками: вклад шума во все блоки — одно
+    умножение на тёплицеву матрицу T, вклад состояния на входе блока —
+    строки степеней матрицы-компаньона G; последовательно переносится только
+    состояние из p значений между блоками.
+    """
+    n = len(e)
+    p = len(coefficients)
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+    if lfilter is not None:
+        a = [1.0] + [-phi for phi in coefficients]
+        y, _ = lfilter([1.0], a, e, zi=lfiltic([1.0], a, history))
+        return y
+
+    G, T = _arp_matrices(tuple(coefficients))
+    # Короткий вход — один неполный блок (ведущие подматрицы T и G)
+    block = min(len(G), n)
+    G, T = G[:block], T[:block, :block]
+    blocks = -(-n // block)
+    E = np.zeros(blocks * block, dtype=np.float64)
+    E[:n] = e
+    particular = E.reshape(blocks, block) @ T.T
+    states = np.empty((blocks, p), dtype=np.float64)
+    states[0] = history
+    # Последние p значений блока, самое свежее первым (полный блок не короче p)
+    tail_G = G[::-1][:p]
+    for b in range(1, blocks):
+        states[b] = particular[b - 1, ::-1][:p] + tail_G @ states[b - 1]
+    return (particular + states @ G.T).ravel()[:n]
+
+class StochasticPrimitive(Primitive):
+    """
+    Основа для процессов с памятью: свой генератор случайных чисел (seed),
+    компактное состояние и сохранение/восстановление через get_state/set_state.
+    Поштучные и пакетные вызовы тянут одну и ту же последовательность.
+    """
+
+    def __init__(self, seed: int = None):
+        self.seed = seed
+        # Без seed — случайный, но постоянный для экземпляра ключ: от него идут и поток,
+        # и evaluate(), поэтому повторные evaluate() дают одну и ту же реализацию
+        self._key = seed if seed is not None else int(np.random.default_rng().integers(2 ** 63))
+        self._rng = np.random.default_rng(self._key)
+        self._buffer = []
+        self._pos = 0
+        # Состояние генератора до последнего заполнения буфера (для get_state)
+        self._buffer_origin = None
+
+    def _refill(self):
+        self._buffer_origin = copy.deepcopy(self._rng.bit_generator.state)
+        self._buffer = self._rng.standard_normal(STOCHASTIC_BUFFER_SIZE).tolist()
+        self._pos = 0
+
+    def _normal(self) -> float:
+        if self._pos >= len(self._buffer):
+            self._refill()
+        z = self._buffer[self._pos]
+        self._pos += 1
+        return z
+
+    def _normals(self, n: int) -> np.ndarray:
+        """n нормальных величин: остаток буфера, затем одним вызовом генератора"""
+        buffered = self._buffer[self._pos:self._pos + n]
+        self._pos += len(buffered)
+        z = np.empty(n, dtype=np.float64)
+        z[:len(buffered)] = buffered
+        if n > len(buffered):
+            z[len(buffered):] = self._rng.standard_normal(n - len(buffered))
+        return z
+
+    # ------------------------------------------------------------------ #
+
+    @abstractmethod
+    def _get_process_state(self) -> dict:
+        """Состояние самого процесса (без генератора случайных чисел) для get_state"""
+
+    @abstractmethod
+    def _set_process_state(self, state: dict):
+        """Восстанавливает состояние процесса из словаря get_state"""
+
+    def get_state(self) -> dict:
+        """JSON-совместимое состояние процесса и генератора случайных чисел"""
+        if self._pos < len(self._buffer):
+            rng_state, buffer_pos = self._buffer_origin, self._pos
+        else:
+            rng_state, buffer_pos = self._rng.bit_generator.state, 0
+        return {
+            "rng": copy.deepcopy(rng_state),
+            "buffer_pos": buffer_pos,
+            **self._get_process_state()
+        }
+
+    def set_state(self, state: dict):
+        """Восстанавливает состояние, сохранённое get_state()"""
+        self._rng.bit_generator.state = copy.deepcopy(state["rng"])
+        self._buffer = []
+        self._pos = 0
+        if state.get("buffer_pos"):
+            self._refill()
+            self._pos = state["buffer_pos"]
+        self._set_process_state(state)
+
+    def evaluate(self, t: np.ndarray, absolute_t: np.ndarray, frequency_hz: float) -> np.ndarray:
+        """
+        У процесса с памятью нет значения «в момент t» без истории, поэтому
+        реализация считается заново с начального состояния на копии, не трогая поток.
+        Запрошенные моменты упорядочиваются по absolute_t (порядок в запросе не важен),
+        совпадающие моменты получают одно значение, каждый следующий момент — следующий
+        шаг процесса по времени absolute_t. У процессов с шагом в один отсчёт (блуждание,
+        AR) время на шаг не влияет: кривая совпадает с потоком, только если моменты идут
+        с шагом потока. OU шагает по фактическим промежуткам между моментами.
+        """
+        fresh = self.__class__(**{**self.get_config(), "seed": self._key})
+        moments, inverse = np.unique(absolute_t, return_inverse=True)
+        return fresh.generate_batch(moments)[inverse.ravel()]
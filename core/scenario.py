@@ -1,28 +1,103 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from bisect import bisect_right
 import json
 import math
-from .primitives import ConstantPrimitive, FormulaPrimitive, NoisePrimitive
+
+import numpy as np
+
+from .primitives import (
+    ConstantPrimitive, FormulaPrimitive, NoisePrimitive,
+    RandomWalkPrimitive, AutoregressivePrimitive, OrnsteinUhlenbeckPrimitive,
+    ReplayPrimitive
+)
+from .wavetable import get_wavetable, WAVETABLE_MAX_SAMPLES
 
 class Episode:
-    def __init__(self, primitive, duration: float, is_looped: bool = False):
+    def __init__(self, primitive, duration: float, is_looped: bool = False, wavetable: bool = False):
         self.primitive = primitive
         self.duration = duration
         self.is_looped = is_looped
+        # Разрешено ли считать период заранее (см. Scenario.prepare_wavetables)
+        self.wavetable = wavetable
+        self.table = None
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        data = {
             "duration": self.duration,
             "is_looped": self.is_looped,
             "primitive_type": self.primitive.__class__.__name__.lower(),
             "config": self.primitive.get_config()
         }
+        if self.wavetable:
+            data["wavetable"] = True
+        return data
 
 class Scenario:
     def __init__(self, name: str, episodes: List[Episode]):
         self.name = name
-        self.episodes = episodes
         self.current_time = 0.0
+        self.episodes = episodes
+
+    @property
+    def episodes(self) -> Tuple[Episode, ...]:
+        return self._episodes
+
+    @episodes.setter
+    def episodes(self, episodes: List[Episode]):
+        # Кортеж, чтобы изменение списка «на месте» не рассинхронизировало индекс
+        self._episodes = tuple(episodes)
         self._validate_episodes()
+        self._build_index()
+
+    def add_episode(self, episode: Episode):
+        """Добавляет эпизод в конец сценария и перестраивает индекс"""
+        self.episodes = self._episodes + (episode,)
+
+    def remove_episode(self, index: int) -> Episode:
+        """Удаляет эпизод по индексу и перестраивает индекс"""
+        episodes = list(self._episodes)
+        removed = episodes.pop(index)
+        self.episodes = episodes
+        return removed
+
+    def _build_index(self):
+        """
+        Предрасчёт начал/концов эпизодов для поиска активного эпизода через bisect.
+        Активен первый эпизод, у которого current_time < конец, либо первый
+        зацикленный — поэтому бинарный поиск идёт только по эпизодам до него.
+        """
+        starts = []
+        ends = []
+        time_accumulator = 0.0
+        looped_index = len(self._episodes)
+        for i, episode in enumerate(self._episodes):
+            starts.append(time_accumulator)
+            if episode.is_looped:
+                looped_index = i
+                break
+            ends.append(time_accumulator + episode.duration)
+            time_accumulator += episode.duration
+        self._starts = starts
+        self._ends = ends
+        self._looped_index = looped_index
+        # Кэш последнего активного эпизода: (начало, конец, эпизод)
+        self._cached = None
+
+    def _find_episode(self, t: float) -> Optional[Tuple[float, float, Episode]]:
+        """Возвращает (начало, конец, эпизод), активный в момент t, или None"""
+        cached = self._cached
+        if cached is not None and cached[0] <= t < cached[1]:
+            return cached
+
+        i = bisect_right(self._ends, t)
+        if i < len(self._ends):
+            found = (self._starts[i], self._ends[i], self._episodes[i])
+        elif self._looped_index < len(self._episodes):
+            found = (self._starts[self._looped_index], math.inf, self._episodes[self._looped_index])
+        else:
+            return None
+        self._cached = found
+        return found
 
     def _validate_episodes(self):
         if not self.episodes:
@@ -57,12 +132,48 @@ class Scenario:
             elif primitive_type == "formula":
                 primitive = FormulaPrimitive(
                     config["expression"],
-                    config.get("variables", {})
+                    config.get("variables", {}),
+                    config.get("vectorize", True)
                 )
             elif primitive_type == "noise":
                 primitive = NoisePrimitive(
                     config.get("mean", 0.0),
-                    config.get("amplitude", 1.0)
+                    config.get("amplitude", 1.0),
+                    config.get("seed")
+                )
+            elif primitive_type == "random_walk":
+                primitive = RandomWalkPrimitive(
+                    config.get("start", 0.0),
+                    config.get("step", 1.0),
+                    config.get("drift", 0.0),
+                    config.get("seed")
+                )
+            elif primitive_type == "ar":
+                primitive = AutoregressivePrimitive(
+                    config["coefficients"],
+                    config.get("mean", 0.0),
+                    config.get("sigma", 1.0),
+                    config.get("seed")
+                )
+            elif primitive_type == "ou":
+                primitive = OrnsteinUhlenbeckPrimitive(
+                    config.get("mean", 0.0),
+                    config.get("theta", 1.0),
+                    config.get("sigma", 1.0),
+                    config.get("start"),
+                    config.get("seed")
+                )
+            elif primitive_type == "replay":
+                primitive = ReplayPrimitive(
+                    config["path"],
+                    config["sample_rate"],
+                    config.get("start_index", 0),
+                    config.get("end_index"),
+                    config.get("loop", True),
+                    config.get("interpolation", "linear"),
+                    config.get("column"),
+                    config.get("dtype", "float64"),
+                    config.get("offset", 0)
                 )
             else:
                 raise ValueError(f"Unknown primitive type: {primitive_type}")
@@ -70,32 +181,99 @@ class Scenario:
             episodes.append(Episode(
                 primitive,
                 ep_config["duration"],
-                ep_config.get("is_looped", False)
+                ep_config.get("is_looped", False),
+                ep_config.get("wavetable", False)
             ))
         
         return cls(name, episodes)
 
+    def prepare_wavetables(self, time_step: float, max_samples: int = WAVETABLE_MAX_SAMPLES) -> int:
+        """
+        Для зацикленных эпизодов с флагом wavetable считает один период на
+        сетке time_step; дальше get_values с тем же шагом читает таблицу.
+        Возвращает число эпизодов, получивших таблицу.
+        """
+        prepared = 0
+        for episode in self._episodes:
+            episode.table = None
+            if episode.wavetable and episode.is_looped:
+                episode.table = get_wavetable(episode.primitive, episode.duration, time_step, max_samples)
+                prepared += episode.table is not None
+        return prepared
+
     def get_value(self) -> float:
         """Получение текущего значения сценария"""
-        if not self.episodes:
+        found = self._find_episode(self.current_time)
+        if found is None:
             return 0.0
-        
-        active_episode = None
-        time_accumulator = 0.0
-        
-        for episode in self.episodes:
-            if (self.current_time < time_accumulator + episode.duration or 
-                episode.is_looped):
-                active_episode = episode
-                break
-            time_accumulator += episode.duration
-        
-        if not active_episode:
-            return 0.0
-        
+
+        time_accumulator, _, active_episode = found
         relative_time = (self.current_time - time_accumulator) % active_episode.duration
         return active_episode.primitive.generate(relative_time)
 
+    def get_values(self, n: int, dt: float) -> np.ndarray:
+        """
+        Значения n отсчётов с шагом dt начиная с current_time (аналог n вызовов
+        get_value() + advance_time(dt)); время сценария сдвигается на n * dt.
+        Окно режется по границам эпизодов, каждый кусок считается одним
+        вызовом generate_batch.
+        """
+        # Накопление шагов последовательно, как в advance_time — моменты времени
+        # совпадают со скалярным путём бит в бит
+        steps = np.full(n + 1, dt, dtype=np.float64)
+        steps[0] = self.current_time
+        times = np.add.accumulate(steps)
+        self.current_time = float(times[-1])
+        times = times[:-1]
+
+        values = np.zeros(n, dtype=np.float64)
+        lo = 0
+        while lo < n:
+            found = self._find_episode(float(times[lo]))
+            if found is None:
+                break
+            time_accumulator, end, episode = found
+            hi = n if end == math.inf else int(np.searchsorted(times, end, side="left"))
+            relative_time = (times[lo:hi] - time_accumulator) % episode.duration
+            chunk = None
+            if episode.table is not None and episode.table.time_step == dt:
+                chunk = episode.table.lookup(relative_time)
+            if chunk is None:
+                chunk = episode.primitive.generate_batch(relative_time)
+            values[lo:hi] = chunk
+            lo = hi
+        return values
+
+    def values_at(self, t, frequency_hz: float) -> np.ndarray:
+        """
+        Значения в произвольные моменты времени сценария без изменения
+        current_time и состояния примитивов. Шум берётся по (seed, номер
+        отсчёта round(t * frequency_hz) на сетке потока с частотой frequency_hz),
+        поэтому повторный запрос даёт те же значения, а моменты внутри одного
+        отсчёта — одно значение.
+        """
+        t = np.asarray(t, dtype=np.float64)
+        values = np.zeros(t.shape, dtype=np.float64)
+        flat_t = t.ravel()
+        flat_values = values.reshape(-1)
+
+        # Номер эпизода для каждого момента — как bisect_right в _find_episode;
+        # номер len(_ends) — зацикленный эпизод, если он есть, иначе сценарий кончился
+        index = np.searchsorted(np.asarray(self._ends, dtype=np.float64), flat_t, side="right")
+        for i in np.unique(index):
+            if i >= len(self._episodes):
+                continue
+            mask = index == i
+            episode = self._episodes[i]
+            absolute_t = flat_t[mask]
+            relative_time = (absolute_t - self._starts[i]) % episode.duration
+            flat_values[mask] = episode.primitive.evaluate(relative_time, absolute_t, frequency_hz)
+        return values
+
+    def value_at(self, t: float, frequency_hz: float) -> float:
+        """Значение в момент t без изменения состояния сценария (см. values_at)"""
+        return float(self.values_at(np.array([t]), frequency_hz)[0])
+
     def advance_time(self, delta: float):
         """Продвижение времени сценария"""
         self.current_time += delta
@@ -0,0 +1,188 @@
+import time
+from typing import Dict, Any, Tuple
+
+# Что делать, если генерация/публикация не уложилась в период пакета:
+#   burst    — отправить пропущенные пакеты подряд без пауз (как раньше);
+#   skip     — выбросить пропущенные пакеты, время сценария перескакивает вперёд;
+#   coalesce — собрать пропущенные периоды в один увеличенный пакет.
+CATCH_UP_POLICIES = ("burst", "skip", "coalesce")
+
+# Метки времени точек: время сценария (секунды от старта) или unix-время
+TIMESTAMP_MODES = ("scenario", "epoch")
+
+
+class StreamStats:
+    """Статистика планирования одного потока пакетов."""
+
+    def __init__(self):
+        self.packets = 0
+        self.overruns = 0
+        self.skipped_packets = 0
+        self.coalesced_packets = 0
+        self.jitter_last = 0.0
+        self.jitter_max = 0.0
+        self._jitter_sum = 0.0
+
+    def record_jitter(self, jitter: float):
+        self.packets += 1
+        self.jitter_last = jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        self._jitter_sum += jitter
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "packets": self.packets,
+            "overruns": self.overruns,
+            "skipped_packets": self.skipped_packets,
+            "coalesced_packets": self.coalesced_packets,
+            "jitter_last_ms": round(self.jitter_last * 1000, 3),
+            "jitter_mean_ms": round(self._jitter_sum / self.packets * 1000, 3) if self.packets else 0.0,
+            "jitter_max_ms": round(self.jitter_max * 1000, 3),
+        }
+
+
+class PacketClock:
+    """
+    Расписание пакетов по time.monotonic(): сроки считаются от старта, а не от
+    момента последней отправки, поэтому не накапливают дрейф. Перевод в
+    unix-время — через смещение, снятое один раз при reset().
+    """
+
+    def __init__(self, packet_interval: float, catch_up: str = "burst"):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"Unknown catch-up policy: {catch_up}")
+        self.packet_interval = packet_interval
+        self.catch_up = catch_up
+        self.stats = StreamStats()
+        self.reset()
+
+    def reset(self):
+        self.next_due = time.monotonic()
+        self.epoch_offset = time.time() - time.monotonic()
+
+    def to_epoch(self, monotonic_time: float) -> float:
+        return self.epoch_offset + monotonic_time
+
+    def time_until_due(self) -> float:
+        return self.next_due - time.monotonic()
+
+    def tick(self, now: float = None) -> Tuple[int, int]:
+        """
+        Вызывается, когда наступил срок пакета. Возвращает (сколько периодов
+        покрывает пакет, сколько периодов пропустить перед ним) по политике
+        catch_up и учитывает джиттер и перегрузки.
+        """
+        if now is None:
+            now = time.monotonic()
+        lateness = max(0.0, now - self.next_due)
+        self.stats.record_jitter(lateness)
+
+        missed = int(lateness // self.packet_interval)
+        if missed <= 0:
+            return 1, 0
+
+        self.stats.overruns += 1
+        if self.catch_up == "skip":
+            self.stats.skipped_packets += missed
+            return 1, missed
+        if self.catch_up == "coalesce":
+            self.stats.coalesced_packets += missed
+            return 1 + missed, 0
+        return 1, 0
+
+    def advance(self, periods: int = 1):
+        self.next_due += periods * self.packet_interval
+
+
+class TokenBucket:
+    """
+    Ограничитель скорости «ведро токенов». Расход списывается после факта
+    (размер пакета известен только после публикации), ведро может уйти в минус —
+    тогда consume() вернёт, сколько нужно подождать.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def consume(self, amount: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """Ограничение потока в пакетах/с и (или) байтах/с."""
+
+    def __init__(self, packets_per_sec: float = None, bytes_per_sec: float = None):
+        self.packets_per_sec = packets_per_sec
+        self.bytes_per_sec = bytes_per_sec
+        self._packets = TokenBucket(packets_per_sec) if packets_per_sec else None
+        self._bytes = TokenBucket(bytes_per_sec) if bytes_per_sec else None
+
+    def consume(self, packets: int, nbytes: int) -> float:
+        """Списывает отправленное и возвращает паузу перед следующим пакетом."""
+        delay = 0.0
+        if self._packets is not None:
+            delay = max(delay, self._packets.consume(packets))
+        if self._bytes is not None:
+            delay = max(delay, self._bytes.consume(nbytes))
+        return delay
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"max_packets_per_sec": self.packets_per_sec, "max_bytes_per_sec": self.bytes_per_sec}
+
+
+class ThroughputMeter:
+    """Достигнутая пропускная способность: итоги, среднее и скорость за последнее окно."""
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self.packets = 0
+        self.points = 0
+        self.bytes = 0
+        # Пакеты, которые получатели не приняли (в скорость не входят)
+        self.dropped = 0
+        self._started = time.monotonic()
+        self._window_start = self._started
+        self._window_counts = (0, 0, 0)
+        self._rates = (0.0, 0.0, 0.0)
+
+    def record(self, points: int, nbytes: int = 0):
+        self.packets += 1
+        self.points += points
+        self.bytes += nbytes
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            p0, n0, b0 = self._window_counts
+            self._rates = (
+                (self.packets - p0) / elapsed,
+                (self.points - n0) / elapsed,
+                (self.bytes - b0) / elapsed,
+            )
+            self._window_start = now
+            self._window_counts = (self.packets, self.points, self.bytes)
+
+    def record_drop(self):
+        self.dropped += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        packets_rate, points_rate, bytes_rate = self._rates
+        return {
+            "total_packets": self.packets,
+            "total_points": self.points,
+            "total_bytes": self.bytes,
+            "dropped_packets": self.dropped,
+            "packets_per_sec": round(packets_rate, 2),
+            "points_per_sec": round(points_rate, 2),
+            "bytes_per_sec": round(bytes_rate, 2),
+            "avg_points_per_sec": round(self.points / elapsed, 2),
+        }
@@ -0,0 +1,338 @@
+import json
+import time
+import queue
+import logging
+from abc import ABC, abstractmethod
+from threading import Event, Thread, Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from .mqtt_client import MQTTPublisher, build_payload, DEFAULT_SENSOR_ID
+from .mqtt_pool import MQTTPool
+
+logger = logging.getLogger("Sinks")
+
+# Размер очереди одного приёмника по умолчанию (пакетов)
+SINK_QUEUE_SIZE = 1000
+
+# Что делать, когда очередь приёмника заполнена:
+#   drop  — выбросить пакет (счётчик dropped);
+#   block — ждать места в очереди до block_timeout секунд (генератор идёт в темпе приёмника),
+#           по истечении — выбросить.
+SINK_OVERFLOW_POLICIES = ("drop", "block")
+SINK_BLOCK_TIMEOUT = 1.0
+
+
+class SinkStats:
+    """Счётчики одного приёмника: пакеты, байты, потери, ошибки и задержка."""
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.errors = 0
+        # Сколько производитель ждал места в очереди (политика block)
+        self.blocked = 0.0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self._latency_sum = 0.0
+        self._lock = Lock()
+
+    def record(self, nbytes: int, latency: float):
+        with self._lock:
+            self.packets += 1
+            self.bytes += nbytes
+            self.latency_last = latency
+            self.latency_max = max(self.latency_max, latency)
+            self._latency_sum += latency
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "packets": self.packets,
+                "bytes": self.bytes,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "blocked_ms": round(self.blocked * 1000, 3),
+                "latency_last_ms": round(self.latency_last * 1000, 3),
+                "latency_mean_ms": round(self._latency_sum / self.packets * 1000, 3) if self.packets else 0.0,
+                "latency_max_ms": round(self.latency_max * 1000, 3),
+            }
+
+
+class Sink(ABC):
+    """
+    Приёмник пакетов. write() получает «обёртку» пакета и её JSON (если
+    приёмнику нужны байты — wants_bytes) и возвращает записанный объём
+    или None, если сам приёмник пакет выбросил (считается в dropped).
+    Пакет, пришедший готовым JSON (publish_json), разбирается в «обёртку»
+    только для приёмников с needs_payload; остальным вместо неё передаётся
+    заголовок {"sensor_id", "packet_timestamp"}.
+    """
+
+    name = "sink"
+    wants_bytes = False
+    needs_payload = True
+
+    @abstractmethod
+    def write(self, payload: Dict[str, Any], data: Optional[bytes]) -> Optional[int]:
+        pass
+
+    def close(self):
+        pass
+
+
+class MQTTSink(Sink):
+    """MQTT; общий JSON конвейера берётся, только если кодек публикатора — json."""
+
+    name = "mqtt"
+
+    def __init__(self, publisher: Union[MQTTPublisher, MQTTPool]):
+        self.publisher = publisher
+        self.wants_bytes = publisher.codec == "json"
+        self.needs_payload = not self.wants_bytes
+
+    def write(self, payload, data):
+        if data is None:
+            data = self.publisher.encode(payload)
+        return self.publisher.publish_bytes(data, payload.get("packet_timestamp"), payload["sensor_id"])
+
+
+class WebSocketBufferSink(Sink):
+    """
+    Буфер для WebSocket/HTTP внутри процесса. Сам буфер живёт в слое API и
+    передаётся функцией on_payload, поэтому core не импортирует api.
+    """
+
+    name = "websocket"
+
+    def __init__(self, on_payload: Callable[[Dict[str, Any]], None]):
+        self.on_payload = on_payload
+
+    def write(self, payload, data):
+        self.on_payload(payload)
+        return 0
+
+
+class FileSink(Sink):
+    """Пакеты построчно в JSON Lines."""
+
+    name = "file"
+    wants_bytes = True
+    needs_payload = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "ab")
+
+    def write(self, payload, data):
+        self.file.write(data)
+        self.file.write(b"\n")
+        return len(data) + 1
+
+    def close(self):
+        self.file.close()
+
+
+class NullSink(Sink):
+    """Ничего не делает — для замеров пропускной способности генерации."""
+
+    name = "null"
+    needs_payload = False
+
+    def write(self, payload, data):
+        return 0
+
+
+class _SinkWorker:
+    """Очередь и поток одного приёмника: медленный приёмник не тормозит остальные."""
+
+    def __init__(
+        self,
+        sink: Sink,
+        queue_size: int,
+        overflow: str = "drop",
+        block_timeout: float = SINK_BLOCK_TIMEOUT
+    ):
+        self.sink = sink
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.stats = SinkStats()
+        self.queue = queue.Queue(maxsize=queue_size)
+        # Остановка без ожидания места в очереди (см. stop)
+        self._stopping = Event()
+        self.thread = Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+        self.thread.start()
+
+    def put(self, item, block: bool = None) -> bool:
+        """
+        Ставит пакет в очередь; False — пакет выброшен. block переопределяет
+        политику приёмника (True — ждать места, False — не ждать).
+        """
+        if block is None:
+            block = self.overflow == "block"
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        if block:
+            started = time.monotonic()
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                pass
+            finally:
+                with self.stats._lock:
+                    self.stats.blocked += time.monotonic() - started
+        with self.stats._lock:
+            self.stats.dropped += 1
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            if item is None:
+                break
+            payload, data, enqueued, encoded = item
+            try:
+                if encoded and self.sink.needs_payload:
+                    payload = json.loads(data)
+                nbytes = self.sink.write(payload, data)
+                if nbytes is None:
+                    with self.stats._lock:
+                        self.stats.dropped += 1
+                else:
+                    self.stats.record(nbytes, time.monotonic() - enqueued)
+            except Exception:
+                with self.stats._lock:
+                    self.stats.errors += 1
+                logger.exception(f"Sinks: {self.sink.name} write failed")
+        self.sink.close()
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Ждёт до timeout, пока очередь разберётся, и завершает поток. Зависший
+        приёмник не держит остановку: поток бросается (он daemon) с записью в лог.
+        """
+        self._stopping.set()
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            # Очередь полна: поток выйдет сам, когда разберёт её (см. _run)
+            pass
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.warning(
+                f"Sinks: {self.sink.name} did not stop in {timeout}s, "
+                f"abandoning {self.queue.qsize()} queued packets"
+            )
+
+
+class SinkPipeline:
+    """
+    Раздаёт каждый пакет всем приёмникам через их собственные очереди.
+    Интерфейс паблишера (publish_packet), поэтому подставляется в DataGenerator,
+    FleetGenerator и ShardedFleet вместо MQTTPublisher.
+    JSON считается один раз на пакет и только если он нужен хоть одному приёмнику.
+    overflow — политика заполненной очереди (SINK_OVERFLOW_POLICIES); вызов с
+    block=True ждёт места независимо от неё (так генератор без расписания
+    идёт в темпе самого медленного приёмника).
+    """
+
+    def __init__(
+        self,
+        sinks: Iterable[Sink],
+        queue_size: int = SINK_QUEUE_SIZE,
+        overflow: str = "drop",
+        block_timeout: float = SINK_BLOCK_TIMEOUT
+    ):
+        if overflow not in SINK_OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown sink overflow policy: {overflow}")
+        self._workers: List[_SinkWorker] = []
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        for sink in sinks:
+            self.add_sink(sink)
+
+    def add_sink(self, sink: Sink):
+        if any(w.sink.name == sink.name for w in self._workers):
+            raise ValueError(f"Sink already registered: {sink.name}")
+        self._workers.append(_SinkWorker(sink, self.queue_size, self.overflow, self.block_timeout))
+
+    @property
+    def sinks(self) -> List[Sink]:
+        return [w.sink for w in self._workers]
+
+    def has_sink(self, name: str) -> bool:
+        return any(w.sink.name == name for w in self._workers)
+
+    def record_direct(self, name: str, nbytes: int = 0):
+        """Учитывает пакет, доставленный приёмнику name в обход его очереди (см. AsyncPacketPublisher)."""
+        for worker in self._workers:
+            if worker.sink.name == name:
+                worker.stats.record(nbytes, 0.0)
+
+    def publish_payload(
+        self,
+        payload: Dict[str, Any],
+        skip: Iterable[str] = (),
+        block: bool = None
+    ) -> Optional[int]:
+        """
+        Ставит готовую «обёртку» в очереди приёмников (кроме skip). Возвращает размер
+        JSON или None, если хотя бы один приёмник пакет выбросил.
+        """
+        workers = [w for w in self._workers if w.sink.name not in skip]
+        data = None
+        if any(w.sink.wants_bytes for w in workers):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return self._put((payload, data, time.monotonic(), False), workers, block, data)
+
+    def publish_json(
+        self,
+        data: bytes,
+        packet_time: float = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
+        """
+        Ставит в очереди уже готовый JSON «обёртки» (например, собранный в процессе-воркере
+        флота): вызывающий поток его не разбирает и не кодирует заново.
+        """
+        header = {"sensor_id": sensor_id, "packet_timestamp": packet_time}
+        return self._put((header, data, time.monotonic(), True), self._workers, block, data)
+
+    def _put(self, item, workers: List[_SinkWorker], block: Optional[bool], data: Optional[bytes]) -> Optional[int]:
+        accepted = True
+        for worker in workers:
+            accepted = worker.put(item, block) and accepted
+        if not accepted:
+            return None
+        return len(data) if data is not None else 0
+
+    def publish_packet(
+        self,
+        packet,
+        target_time: float = None,
+        sensor_id: str = DEFAULT_SENSOR_ID,
+        block: bool = None
+    ) -> Optional[int]:
+        return self.publish_payload(build_payload(packet, target_time, sensor_id), block=block)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            w.sink.name: {**w.stats.to_dict(), "overflow": w.overflow, "queued": w.queue.qsize()}
+            for w in self._workers
+        }
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+        logger.info("Sinks: Closed")
@@ -0,0 +1,197 @@
+import os
+import math
+import time
+import zlib
+import struct
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("Spool")
+
+# Ограничения спула по умолчанию: 64 сегмента по 8 МБ
+SPOOL_SEGMENT_BYTES = 8 << 20
+SPOOL_MAX_SEGMENTS = 64
+
+# Запись: длина данных, crc32 данных, длина топика, packet_timestamp (NaN — нет)
+_RECORD_HEADER = struct.Struct("<IIHd")
+_SEGMENT_SUFFIX = ".seg"
+
+
+class DiskSpool:
+    """
+    Очередь сообщений на диске из сегментов, которые только дописываются.
+    Запись — (топик, байты, packet_timestamp); читается строго по порядку,
+    прочитанный сегмент удаляется. Размер сегмента и их число ограничены:
+    при переполнении выбрасывается самый старый сегмент. fsync — пачками:
+    после fsync_batch записей или fsync_interval секунд.
+    После перезапуска непрочитанные сегменты воспроизводятся заново (начатый
+    сегмент — с начала, то есть доставка «хотя бы один раз»).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = SPOOL_SEGMENT_BYTES,
+        max_segments: int = SPOOL_MAX_SEGMENTS,
+        fsync_batch: int = 100,
+        fsync_interval: float = 1.0
+    ):
+        if segment_bytes <= _RECORD_HEADER.size or max_segments < 2:
+            raise ValueError("Spool needs segment_bytes > record header and max_segments >= 2")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._lock = Lock()
+
+        # Номер сегмента → число записей в нём
+        self._segments: Dict[int, int] = {}
+        for path in sorted(self.directory.glob(f"*{_SEGMENT_SUFFIX}")):
+            count = self._scan(path)
+            if count:
+                self._segments[int(path.stem)] = count
+            else:
+                path.unlink()
+        self.depth = sum(self._segments.values())
+        self.written = 0
+        self.replayed = 0
+        self.dropped = 0
+
+        # Дописываем всегда в новый сегмент: хвост старого мог быть оборван
+        self._write_index = max(self._segments, default=-1) + 1
+        self._segments[self._write_index] = 0
+        self._writer = open(self._path(self._write_index), "ab")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        self._read_index = min(self._segments)
+        self._read_records = 0
+        self._read_offset = 0
+        self._reader = None
+        if self.depth:
+            logger.info(f"Spool: {self.depth} records pending in {self.directory}")
+
+    def _path(self, index: int) -> Path:
+        return self.directory / f"{index:08d}{_SEGMENT_SUFFIX}"
+
+    @staticmethod
+    def _scan(path: Path) -> int:
+        """Считает целые записи сегмента; оборванный хвост обрезается."""
+        data = path.read_bytes()
+        offset = count = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            size, crc, topic_len, _ = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size + topic_len
+            if start + size > len(data) or zlib.crc32(data[start:start + size]) != crc:
+                break
+            offset = start + size
+            count += 1
+        if offset < len(data):
+            logger.warning(f"Spool: Truncating torn tail of {path.name} at {offset}")
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        return count
+
+    # ------------------------------------------------------------------ #
+
+    def append(self, topic: str, data: bytes, packet_time: float = None) -> int:
+        """Дописывает сообщение в конец спула; возвращает размер записи."""
+        topic_bytes = topic.encode("utf-8")
+        record = _RECORD_HEADER.pack(
+            len(data), zlib.crc32(data), len(topic_bytes),
+            math.nan if packet_time is None else packet_time
+        ) + topic_bytes + data
+        with self._lock:
+            if self._segments[self._write_index] and self._writer.tell() + len(record) > self.segment_bytes:
+                self._rotate()
+            self._writer.write(record)
+            self._segments[self._write_index] += 1
+            self.depth += 1
+            self.written += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+        return len(record)
+
+    def pop(self) -> Optional[Tuple[str, bytes, Optional[float]]]:
+        """Следующее по порядку сообщение (топик, байты, packet_timestamp) или None."""
+        with self._lock:
+            if not self.depth:
+                return None
+            while self._read_records >= self._segments[self._read_index]:
+                self._finish_read_segment()
+            if self._read_index == self._write_index:
+                self._writer.flush()
+            if self._reader is None:
+                self._reader = open(self._path(self._read_index), "rb")
+                self._reader.seek(self._read_offset)
+            size, _, topic_len, packet_time = _RECORD_HEADER.unpack(self._reader.read(_RECORD_HEADER.size))
+            topic = self._reader.read(topic_len).decode("utf-8")
+            data = self._reader.read(size)
+            self._read_offset = self._reader.tell()
+            self._read_records += 1
+            self.depth -= 1
+            self.replayed += 1
+            if self._read_records >= self._segments[self._read_index] and self._read_index != self._write_index:
+                self._finish_read_segment()
+            return topic, data, None if math.isnan(packet_time) else packet_time
+
+    def _finish_read_segment(self):
+        """Прочитанный сегмент больше не нужен: удаляем и переходим к следующему."""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        del self._segments[self._read_index]
+        self._path(self._read_index).unlink(missing_ok=True)
+        self._read_index = min(self._segments)
+        self._read_records = 0
+        self._read_offset = 0
+
+    def _rotate(self):
+        self._sync()
+        self._writer.close()
+        self._write_index += 1
+        self._segments[self._write_index] = 0
+        self._writer = open(self._path(self._write_index), "ab")
+        # Удержание: выбрасываем самые старые сегменты вместе с непрочитанными записями
+        while len(self._segments) > self.max_segments:
+            oldest = self._read_index
+            lost = self._segments[oldest] - self._read_records
+            self.depth -= lost
+            self.dropped += lost
+            logger.warning(f"Spool: Segment limit reached, dropped {lost} records")
+            self._finish_read_segment()
+
+    def _sync(self):
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = sum(
+                self._path(index).stat().st_size for index in self._segments
+                if self._path(index).exists()
+            ) - self._read_offset
+            return {
+                "directory": str(self.directory),
+                "depth": self.depth,
+                "bytes": max(size, 0),
+                "segments": len(self._segments),
+                "written": self.written,
+                "replayed": self.replayed,
+                "dropped": self.dropped,
+            }
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._writer.close()
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
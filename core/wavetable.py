@@ -0,0 +1,87 @@
+import json
+import logging
+import weakref
+from threading import Lock
+from typing import Dict, Optional
+
+import numpy as np
+
+from .primitives import FormulaPrimitive
+
+logger = logging.getLogger("Wavetable")
+
+# Ограничение на одну таблицу (отсчётов float64): 1M ≈ 8 МБ
+WAVETABLE_MAX_SAMPLES = 1 << 20
+
+# Допустимое отклонение момента от узла сетки (в долях шага), иначе считаем напрямую
+_GRID_TOLERANCE = 1e-6
+
+# (форма, длительность, шаг) → таблица. Слабые ссылки: таблица живёт, пока
+# её держит хотя бы один эпизод, и общая для всех датчиков с той же формой
+_tables = weakref.WeakValueDictionary()
+_lock = Lock()
+
+
+class Wavetable:
+    """
+    Один период зацикленного эпизода, посчитанный заранее на сетке с шагом dt.
+    Значения не совпадают с прямым расчётом бит в бит: таблица считается в точных
+    узлах k * dt, а прямой расчёт — по накопленному времени сценария по модулю
+    периода, погрешность которого растёт со временем. Расхождение порядка 1e-9
+    после нескольких минут при 1 кГц — далеко ниже округления значений пакета
+    до 4 знаков.
+    """
+
+    def __init__(self, values: np.ndarray, time_step: float):
+        self.values = values
+        self.time_step = time_step
+
+    def lookup(self, relative_time: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Значения из таблицы для моментов внутри периода; None, если моменты
+        не лежат на сетке таблицы (другая частота или сдвиг фазы).
+        """
+        position = relative_time / self.time_step
+        index = np.rint(position)
+        if len(index) and np.max(np.abs(position - index)) > _GRID_TOLERANCE:
+            return None
+        return self.values[index.astype(np.intp) % len(self.values)]
+
+
+def get_wavetable(
+    primitive,
+    duration: float,
+    time_step: float,
+    max_samples: int = WAVETABLE_MAX_SAMPLES
+) -> Optional[Wavetable]:
+    """
+    Таблица одного периода для зацикленного эпизода с формулой или None, если
+    таблица не подходит (не формула, период не кратен шагу, превышен лимит).
+    """
+    if not isinstance(primitive, FormulaPrimitive):
+        return None
+    size = duration / time_step
+    samples = int(round(size))
+    if samples <= 0 or abs(size - samples) > _GRID_TOLERANCE * max(1, samples):
+        return None
+    if samples > max_samples:
+        logger.warning(
+            f"Wavetable: {samples} samples for {primitive.expression!r} exceed limit {max_samples}"
+        )
+        return None
+
+    key = (json.dumps(primitive.get_config(), sort_keys=True), duration, time_step)
+    with _lock:
+        values = _tables.get(key)
+        if values is None:
+            values = primitive.generate_batch(np.arange(samples, dtype=np.float64) * time_step)
+            values.setflags(write=False)
+            _tables[key] = values
+    return Wavetable(values, time_step)
+
+
+def wavetable_stats() -> Dict[str, int]:
+    """Сколько общих таблиц сейчас в памяти и их суммарный размер."""
+    with _lock:
+        tables = list(_tables.values())
+    return {"tables": len(tables), "bytes": sum(t.nbytes for t in tables)}
@@ -284,7 +284,7 @@ except Exception as e:
             self.backend_process = subprocess.Popen([
                 str(python_path), '-m', 'uvicorn', 'api.main:app', 
                 '--reload', '--host', '0.0.0.0', '--port', '8000',
-                '--log-level', 'info'
+                '--ws', 'websockets', '--log-level', 'info'
             ], cwd=self.root_dir,
                creationflags=subprocess.CREATE_NEW_CONSOLE)
             
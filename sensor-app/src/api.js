@@ -32,5 +32,6 @@ export const deleteSensorPrimitive = (primitiveId) => api.delete(`/sensors/primi
 export const startGeneration = (request) => rootApi.post('/start', request);
 export const stopGeneration = () => rootApi.post('/stop');
 export const getStatus = () => rootApi.get('/status');
+export const previewScenario = (request) => rootApi.post('/scenario/preview', request);
 
 export default api;
\ No newline at end of file
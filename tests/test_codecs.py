@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from core.codecs import decode_payload, encode_payload, msgpack
+from core.data_generator import build_packet
+from core.mqtt_client import build_payload
+
+# Относительная ошибка разности float32 — 2^-24 (см. описание core.codecs)
+FLOAT32_EPS = 2.0 ** -24
+
+
+def _payload(start: float, frequency_hz: int, n: int):
+    values = 20 + 5 * np.random.default_rng(0).standard_normal(n)
+    return build_payload(build_packet(start, values, 1.0 / frequency_hz), start, "sensor-1")
+
+
+def _columns(payload):
+    packet = payload["packet"]
+    return (
+        np.array([point["timestamp"] for point in packet]),
+        np.array([point["value"] for point in packet]),
+    )
+
+
+@pytest.mark.parametrize("codec", [c for c in ("json", "columnar", "msgpack") if c != "msgpack" or msgpack])
+def test_text_codecs_lossless(codec):
+    payload = _payload(1_700_000_000.0, 1000, 100)
+    assert decode_payload(encode_payload(payload, codec), codec) == payload
+
+
+@pytest.mark.parametrize("codec", ["binary", "binary32"])
+@pytest.mark.parametrize("start, frequency_hz, n", [(0.0, 1000, 100), (12345.678, 100, 10000), (1_700_000_000.0, 10, 5)])
+def test_binary_precision(codec, start, frequency_hz, n):
+    payload = _payload(start, frequency_hz, n)
+    decoded = decode_payload(encode_payload(payload, codec), codec)
+    timestamps, values = _columns(payload)
+    decoded_timestamps, decoded_values = _columns(decoded)
+
+    assert decoded["sensor_id"] == payload["sensor_id"]
+    assert decoded["packet_timestamp"] == payload["packet_timestamp"]
+    assert decoded_timestamps[0] == timestamps[0]
+    span = timestamps[-1] - timestamps[0]
+    assert np.abs(decoded_timestamps - timestamps).max() <= 2 * FLOAT32_EPS * span
+    if codec == "binary":
+        assert np.array_equal(decoded_values, values)
+    else:
+        np.testing.assert_allclose(decoded_values, values, rtol=FLOAT32_EPS)
+
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from core.downsample import AGGREGATE_FACTORS, DOWNSAMPLE_METHODS
+from core.ring_buffer import SensorRingBuffers
+from api.ws_handler import GraphFeed
+
+POINTS = 200_000
+PACKET = 100
+
+
+def _feed_two_sensors():
+    """Два датчика с непересекающимися диапазонами значений, пакеты вперемешку."""
+    rng = np.random.default_rng(7)
+    t = np.arange(POINTS) * 0.01
+    signals = {
+        "low": 10 + np.sin(t) + 0.1 * rng.standard_normal(POINTS),
+        "high": 1000 + 50 * np.cos(t / 3) + rng.standard_normal(POINTS),
+    }
+    # По одному выбросу у каждого: должен пережить прореживание своего ряда
+    signals["low"][123_457] = -5.0
+    signals["high"][54_321] = 2000.0
+    store = SensorRingBuffers("low", POINTS, POINTS, AGGREGATE_FACTORS)
+    for start in range(0, POINTS, PACKET):
+        for sensor_id, values in signals.items():
+            store.append(sensor_id, t[start:start + PACKET], values[start:start + PACKET])
+    return store, t, signals
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+@pytest.mark.parametrize("limit", [5_000, POINTS])  # сырые точки и уровни предагрегации
+def test_each_sensor_downsampled_separately(method, limit):
+    store, t, signals = _feed_two_sensors()
+    for sensor_id, values in signals.items():
+        window = values[-limit:]
+        last_seq, timestamps, reduced = store.get(sensor_id).downsample(500, method, limit=limit)
+
+        assert last_seq == POINTS - 1
+        assert 0 < len(reduced) <= 500
+        assert np.all(np.diff(timestamps) >= 0)
+        assert window.min() <= reduced.min() and reduced.max() <= window.max()
+        if method != "mean":
+            assert reduced.min() == window.min()
+            assert reduced.max() == window.max()
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+def test_graph_feed_ignores_other_sensors(method):
+    feed = GraphFeed("low", method, 50)
+    emitted = []
+    for k in range(40):
+        for sensor_id, value in (("low", 1.0 + k % 3), ("high", 1000.0)):
+            packet = [{"timestamp": k * 10 + i, "value": value} for i in range(10)]
+            payload = feed.push({"sensor_id": sensor_id, "packet": packet, "packet_timestamp": k})
+            if payload is not None:
+                emitted.append(payload)
+
+    assert emitted
+    points = [point for payload in emitted for point in payload["packet"]]
+    assert all(payload["sensor_id"] == "low" for payload in emitted)
+    assert max(point["value"] for point in points) <= 3.0
+    timestamps = [point["timestamp"] for point in points]
+    assert timestamps == sorted(timestamps)
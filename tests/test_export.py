@@ -0,0 +1,36 @@
+import csv
+
+import pytest
+
+from core.export import export_scenarios
+
+# id с разделителем, кавычкой, переводом строки и знаком формата printf
+SENSOR_IDS = ["plain", "room 1, north", 'say "hi"', "line\nbreak", "100%"]
+
+
+def _scenario(value: float) -> dict:
+    return {
+        "name": "csv",
+        "episodes": [{"primitive_type": "constant", "config": {"value": value}, "duration": 1.0, "is_looped": True}],
+    }
+
+
+@pytest.mark.parametrize("layout", ["wide", "long"])
+def test_csv_quotes_sensor_ids(tmp_path, layout):
+    path = tmp_path / "out.csv"
+    scenarios = {sensor_id: _scenario(float(i)) for i, sensor_id in enumerate(SENSOR_IDS)}
+    export_scenarios(scenarios, path, 0.5, 10, layout=layout)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    if layout == "wide":
+        assert rows[0] == ["timestamp", *SENSOR_IDS]
+        assert all(len(row) == len(SENSOR_IDS) + 1 for row in rows)
+        assert [float(v) for v in rows[1][1:]] == [float(i) for i in range(len(SENSOR_IDS))]
+    else:
+        assert rows[0] == ["timestamp", "sensor_id", "value"]
+        body = rows[1:]
+        assert len(body) == 5 * len(SENSOR_IDS)
+        assert all(len(row) == 3 for row in body)
+        assert [row[1] for row in body[:len(SENSOR_IDS)]] == SENSOR_IDS
+        assert all(float(row[2]) == SENSOR_IDS.index(row[1]) for row in body)
@@ -0,0 +1,103 @@
+import threading
+
+from core.fleet import FleetGenerator
+
+SCENARIO = {
+    "name": "fleet test",
+    "episodes": [{"primitive_type": "constant", "config": {"value": 1.0}, "duration": 10.0, "is_looped": True}],
+}
+
+
+class _Collector:
+    """Паблишер, запоминающий пакеты; первые fail публикаций падают."""
+
+    def __init__(self, fail: int = 0):
+        self.fail = fail
+        self.packets = []
+        self.target_times = []
+
+    def publish_packet(self, packet, target_time=None, sensor_id=None):
+        self.target_times.append(target_time)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("publish failed")
+        self.packets.append((sensor_id, packet))
+
+
+def _drive(fleet: FleetGenerator, seconds: float, late: float = 0.0):
+    """
+    Шаги цикла флота без потока и sleep: время переставляется на ближайший срок
+    (плюс late — опоздание планировщика) и пакеты собираются как в _generation_loop.
+    """
+    fleet._reset_schedule()
+    end = fleet._heap[0][0] + seconds
+    while fleet._heap[0][0] <= end:
+        now = fleet._heap[0][0] + late
+        fleet.monotonic = lambda: now
+        fleet._publish_due(*fleet._collect_due())
+
+
+def test_packets_tagged_by_sensor():
+    publisher = _Collector()
+    fleet = FleetGenerator(publisher)
+    fleet.add_sensor("a", SCENARIO, 100, 20)
+    fleet.add_sensor("b", {**SCENARIO, "episodes": [{**SCENARIO["episodes"][0], "config": {"value": 2.0}}]}, 10, 10)
+    _drive(fleet, 0.475)
+
+    by_sensor = {}
+    for sensor_id, packet in publisher.packets:
+        by_sensor.setdefault(sensor_id, []).append(packet)
+    assert set(by_sensor) == {"a", "b"}
+    assert len(by_sensor["a"]) == 10 and len(by_sensor["b"]) == 5
+    assert all(len(p) == 5 and p[0]["value"] == 1.0 for p in by_sensor["a"])
+    assert all(len(p) == 1 and p[0]["value"] == 2.0 for p in by_sensor["b"])
+
+
+def test_concurrent_add_sensor_keeps_first():
+    fleet = FleetGenerator(_Collector())
+    results = []
+    barrier = threading.Barrier(8)
+
+    def add(k):
+        barrier.wait()
+        try:
+            results.append(fleet.add_sensor("dup", SCENARIO, 10 * (k + 1), 10))
+        except KeyError:
+            results.append(None)
+
+    threads = [threading.Thread(target=add, args=(k,)) for k in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    added = [stream for stream in results if stream is not None]
+    assert len(added) == 1
+    assert fleet.get_sensor("dup") is added[0]
+
+
+def test_failed_publish_does_not_skip_period():
+    publisher = _Collector(fail=1)
+    fleet = FleetGenerator(publisher, catch_up="skip")
+    stream = fleet.add_sensor("a", SCENARIO, 10, 10)
+    _drive(fleet, 0.35)
+
+    # Первый пакет потерян при публикации; следующий — в следующий срок, а не через один
+    assert len(publisher.target_times) == 4 and len(publisher.packets) == 3
+    assert all(abs(b - a - 0.1) < 1e-6 for a, b in zip(publisher.target_times, publisher.target_times[1:]))
+    assert stream.clock.stats.to_dict()["skipped_packets"] == 0
+
+
+def test_late_scheduler_catch_up():
+    """Опоздание на полтора периода: coalesce — один пакет на два периода, skip — пропуск периода."""
+    packets = {}
+    for catch_up in ("burst", "coalesce", "skip"):
+        publisher = _Collector()
+        fleet = FleetGenerator(publisher, catch_up=catch_up)
+        fleet.add_sensor("a", SCENARIO, 10, 10)
+        _drive(fleet, 0.0, late=0.15)
+        packets[catch_up] = [[point["timestamp"] for point in packet] for _, packet in publisher.packets]
+    # burst отдаёт по пакету за шаг и догоняет следующими шагами
+    assert packets["burst"] == [[0.0]]
+    assert packets["coalesce"] == [[0.0, 0.1]]
+    assert packets["skip"] == [[0.1]]
@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+import pytest
+
+from core.primitives import FormulaPrimitive
+
+# Компиляция и вычисление любого допустимого выражения не должны занимать заметного времени
+MAX_SECONDS = 1.0
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os')",
+    "t.__class__",
+    "().__class__.__bases__[0].__subclasses__()",
+    "math.__dict__",
+    "math.__loader__",
+    "[x for x in ()]",
+    "lambda: 0",
+    "open('/etc/passwd')",
+    "math.factorial(10 ** 7)",
+    "math.comb(10 ** 7, 5000)",
+    "math.perm(10 ** 7)",
+    "max.__self__",
+])
+def test_rejects_unsafe(expression):
+    with pytest.raises(ValueError):
+        FormulaPrimitive(expression)
+
+
+@pytest.mark.parametrize("expression", [
+    "9 ** 9 ** 9",
+    "2 ** 10 ** 10",
+    "2 ** abs(10 ** 9)",
+    "2 ** math.floor(1e10)",
+    "(t + 1) ** max(10 ** 6, 1)",
+    "t ** 1001",
+])
+def test_huge_powers_are_bounded(expression):
+    start = time.perf_counter()
+    primitive = FormulaPrimitive(expression)
+    scalar = [primitive.generate(t) for t in (0.0, 0.5, 2.0)]
+    batch = primitive.generate_batch(np.array([0.0, 0.5, 2.0]))
+    assert time.perf_counter() - start < MAX_SECONDS
+    assert np.allclose(batch, scalar, equal_nan=True)
+
+
+@pytest.mark.parametrize("expression, t, expected", [
+    ("t ** 2", 3.0, 9.0),
+    ("t ** 1001", 1.0, 1.0),
+    ("(-2) ** 3", 0.0, -8.0),
+    ("2 ** -1", 0.0, 0.5),
+    ("a * math.sin(t) + b", 0.0, 1.5),
+    ("min(t, 5) + abs(-t)", 7.0, 12.0),
+    ("1 if t > 1 else 0", 2.0, 1.0),
+])
+def test_accepts_valid(expression, t, expected):
+    primitive = FormulaPrimitive(expression, {"a": 2.0, "b": 1.5})
+    assert primitive.generate(t) == pytest.approx(expected)
+
+
+def test_overflow_gives_zero():
+    primitive = FormulaPrimitive("9 ** 9 ** 9")
+    assert primitive.generate(0.0) == 0.0
+    assert primitive.generate_batch(np.zeros(3)).tolist() == [0.0, 0.0, 0.0]
@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+import pytest
+
+from core.downsample import AGGREGATE_FACTORS
+from core.ring_buffer import INITIAL_POINTS, PointRingBuffer, SensorRingBuffers
+
+CAPACITY = 3 * INITIAL_POINTS + 100
+
+
+def _fill(buffer, total: int, packet: int):
+    """Пишет точки 0..total-1 (метка времени = seq, значение = -seq) пакетами."""
+    for start in range(0, total, packet):
+        seq = np.arange(start, min(start + packet, total), dtype=np.float64)
+        buffer.append(seq, -seq)
+
+
+@pytest.mark.parametrize("total", [10, INITIAL_POINTS, CAPACITY, 5 * CAPACITY + 17])
+@pytest.mark.parametrize("packet", [1, 333, 2 * CAPACITY])
+def test_grows_then_wraps(total, packet):
+    buffer = PointRingBuffer(CAPACITY, AGGREGATE_FACTORS)
+    _fill(buffer, total, packet)
+
+    seq, timestamps, values = buffer.snapshot()
+    expected = np.arange(max(0, total - CAPACITY), total)
+    assert seq.tolist() == expected.tolist()
+    assert timestamps.tolist() == expected.tolist()
+    assert values.tolist() == (-expected).tolist()
+    assert buffer.nbytes <= 16 * CAPACITY
+    if total <= INITIAL_POINTS:
+        assert buffer.nbytes == 16 * INITIAL_POINTS
+    # Уровни предагрегации пережили рост: в прореженном окне есть последняя точка
+    last_seq, _, reduced = buffer.downsample(4, "minmax")
+    assert last_seq == total - 1
+    assert reduced.min() == -(total - 1)
+
+
+def test_since_seq_and_limit():
+    buffer = PointRingBuffer(CAPACITY)
+    _fill(buffer, 2 * CAPACITY, 100)
+    first = buffer.first_seq
+    assert first == CAPACITY
+
+    # Без since_seq — последние limit точек
+    assert buffer.snapshot(limit=5)[0].tolist() == list(range(2 * CAPACITY - 5, 2 * CAPACITY))
+    # С since_seq — первые limit точек новее since_seq
+    assert buffer.snapshot(since_seq=first + 10, limit=3)[0].tolist() == [first + 11, first + 12, first + 13]
+    # Вытесненный курсор — с самой старой хранимой точки
+    assert buffer.snapshot(since_seq=0, limit=2)[0].tolist() == [first, first + 1]
+    # Курсор на последней точке — пусто
+    assert len(buffer.snapshot(since_seq=buffer.last_seq)[0]) == 0
+    # Постраничное чтение отдаёт все точки ровно по разу
+    pages, cursor = [], first - 1
+    while cursor < buffer.last_seq:
+        seq, _, _ = buffer.snapshot(since_seq=cursor, limit=1000)
+        pages.extend(seq.tolist())
+        cursor = int(seq[-1])
+    assert pages == list(range(first, 2 * CAPACITY))
+
+
+def test_concurrent_snapshots_are_consistent():
+    buffer = PointRingBuffer(CAPACITY)
+    total = 20 * CAPACITY
+    errors = []
+
+    def reader():
+        while buffer.last_seq < total - 1:
+            seq, timestamps, values = buffer.snapshot(limit=2000)
+            # Снимок — непрерывный отрезок, точки не смешаны с перезаписанными
+            if len(seq) and not (
+                np.array_equal(np.diff(seq), np.ones(len(seq) - 1))
+                and np.array_equal(timestamps, seq) and np.array_equal(values, -seq)
+            ):
+                errors.append(seq)
+                return
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    _fill(buffer, total, 97)
+    for thread in readers:
+        thread.join(10)
+    assert not errors
+
+
+def test_fleet_budget():
+    store = SensorRingBuffers("main", 1000, 400, sensor_budget=1000)
+    for sensor_id in ("a", "b", "c", "d"):
+        store.append(sensor_id, np.arange(10.0), np.arange(10.0))
+    store.append("main", np.arange(10.0), np.arange(10.0))
+
+    stats = store.get_stats()
+    assert [stats[sensor]["capacity"] for sensor in ("a", "b", "c")] == [400, 400, 200]
+    # Бюджет исчерпан: точки датчика d не хранятся, основной поток не ограничен
+    assert "d" not in stats and store.dropped_points == 10
+    assert stats["main"]["capacity"] == 1000
+
+    store.discard("a")
+    store.append("d", np.arange(10.0), np.arange(10.0))
+    assert store.get_stats()["d"]["capacity"] == 400
+    assert store.reserved == 1000
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from core.primitives import ConstantPrimitive, FormulaPrimitive
+from core.scenario import Episode, Scenario
+
+
+def _linear_find(scenario: Scenario, t: float):
+    """Активный эпизод прежним линейным проходом: (начало, эпизод) или None."""
+    time_accumulator = 0.0
+    for episode in scenario.episodes:
+        if t < time_accumulator + episode.duration or episode.is_looped:
+            return time_accumulator, episode
+        time_accumulator += episode.duration
+    return None
+
+
+def _scenario(durations, looped: bool) -> Scenario:
+    # Нулевые и дробные длительности: границы, которые bisect легко сдвинуть на один эпизод
+    episodes = [Episode(ConstantPrimitive(float(i)), d) for i, d in enumerate(durations)]
+    if looped:
+        episodes.append(Episode(ConstantPrimitive(-1.0), 0.7, is_looped=True))
+        episodes.append(Episode(ConstantPrimitive(-2.0), 5.0))
+    return Scenario("boundaries", episodes)
+
+
+def _boundary_times(durations):
+    """Каждая граница эпизодов, соседние с ней float и точки за концом сценария."""
+    edges = np.concatenate(([0.0], np.cumsum(durations)))
+    times = [-1.0]
+    for edge in edges.tolist():
+        times += [np.nextafter(edge, -np.inf), edge, np.nextafter(edge, np.inf)]
+    times += [edges[-1] + 0.35, edges[-1] + 7.0]
+    return times
+
+
+DURATIONS = [0.1, 0.0, 0.2, 1.0, 0.0, 0.0, 0.3, 2.5, 0.1]
+
+
+@pytest.mark.parametrize("looped", [True, False])
+def test_bisect_matches_linear_scan(looped):
+    scenario = _scenario(DURATIONS, looped)
+    times = _boundary_times(DURATIONS)
+    # Вперёд, назад и вразброс: кэш последнего эпизода не должен мешать
+    rng = np.random.default_rng(3)
+    for t in times + times[::-1] + rng.permutation(times).tolist():
+        expected = _linear_find(scenario, t)
+        found = scenario._find_episode(t)
+        if expected is None:
+            assert found is None, t
+        else:
+            assert found is not None and found[0] == expected[0] and found[2] is expected[1], t
+
+        scenario.current_time = t
+        expected_value = 0.0 if expected is None else expected[1].primitive.generate(0.0)
+        assert scenario.get_value() == expected_value, t
+
+
+def _deterministic_scenario(looped: bool) -> Scenario:
+    episodes = [
+        Episode(ConstantPrimitive(3.0), 0.35),
+        Episode(FormulaPrimitive("2 * t + 1"), 0.0),
+        Episode(FormulaPrimitive("math.sin(7 * t) + t ** 2"), 0.83),
+        Episode(FormulaPrimitive("t if t < 0.2 else -t", {}), 0.41),
+    ]
+    if looped:
+        # Зацикленный эпизод короче пакета: несколько кругов в одном окне
+        episodes.append(Episode(FormulaPrimitive("10 + 3 * t"), 0.27, is_looped=True))
+    return Scenario("scalar vs batch", episodes)
+
+
+@pytest.mark.parametrize("looped", [True, False])
+@pytest.mark.parametrize("dt, packet", [(0.01, 50), (0.03, 7), (0.1, 1), (0.005, 333)])
+def test_get_values_matches_scalar_path(looped, dt, packet):
+    scalar, batch = _deterministic_scenario(looped), _deterministic_scenario(looped)
+    packets = -(-999 // packet)
+    expected = []
+    for _ in range(packets * packet):
+        expected.append(scalar.get_value())
+        scalar.advance_time(dt)
+    values = np.concatenate([batch.get_values(packet, dt) for _ in range(packets)])
+
+    assert np.allclose(values, expected, rtol=1e-12, atol=1e-12)
+    # Время сценария накапливается так же, как в advance_time
+    assert batch.current_time == scalar.current_time
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.data_queue import AsyncPacketPublisher
+from api.shared_state import latest_data
+from core.sinks import NullSink, Sink, SinkPipeline, WebSocketBufferSink
+
+
+class _Named(NullSink):
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _DropEverySecond(Sink):
+    """Приёмник, который сам выбрасывает каждый второй пакет (как MQTT с drop_newest)."""
+
+    name = "dropping"
+    needs_payload = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def write(self, payload, data):
+        self.calls += 1
+        return None if self.calls % 2 == 0 else 10
+
+
+def test_sink_drop_is_counted():
+    sink = _DropEverySecond()
+    pipeline = SinkPipeline([sink])
+    for i in range(10):
+        pipeline.publish_json(b"{}", float(i), "sensor-1")
+    pipeline.close()
+    stats = pipeline.get_stats()["dropping"]
+
+    assert stats["packets"] == 5
+    assert stats["dropped"] == 5
+    assert stats["bytes"] == 50
+
+
+@pytest.mark.parametrize("sinks", [["mqtt"], ["websocket"], ["mqtt", "websocket"]])
+def test_async_publisher_respects_sinks(sinks):
+    """Асинхронный паблишер отдаёт пакет тем же приёмникам, что и поточный."""
+    sensor_id = f"async-{'-'.join(sinks)}"
+    stored = []
+    # Под именем mqtt — приёмник-заглушка без брокера
+    configured = {"mqtt": _Named("mqtt"), "websocket": WebSocketBufferSink(stored.append)}
+    pipeline = SinkPipeline([configured[name] for name in sinks])
+    publisher = AsyncPacketPublisher(pipeline)
+    packet = [{"timestamp": 0.0, "value": 1.0}, {"timestamp": 0.1, "value": 2.0}]
+    for _ in range(3):
+        asyncio.run(publisher.publish_packet(packet, 0.0, sensor_id))
+    pipeline.close()
+
+    stats = pipeline.get_stats()
+    assert {name: stats[name]["packets"] for name in stats} == {name: 3 for name in sinks}
+    buffer = latest_data.get(sensor_id)
+    if "websocket" in sinks:
+        assert len(buffer) == 6
+    else:
+        assert buffer is None
+    # Очередь websocket-приёмника не используется: пакеты уже разосланы напрямую
+    assert stored == []
+
+
+class _Stalled(Sink):
+    """Приёмник, зависший на записи."""
+
+    name = "stalled"
+    needs_payload = False
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def write(self, payload, data):
+        self.release.wait()
+        return 0
+
+
+def test_close_does_not_hang_on_stalled_sink():
+    sink = _Stalled()
+    pipeline = SinkPipeline([sink], queue_size=2)
+    for i in range(5):
+        pipeline.publish_json(b"{}", float(i), "sensor-1")
+
+    started = time.monotonic()
+    pipeline.close()
+    assert time.monotonic() - started < 5.0
+    sink.release.set()
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.data_queue import AsyncPacketPublisher
+from core.async_generator import AsyncDataGenerator
+from core.data_generator import DataGenerator
+from core.sinks import NullSink, SinkPipeline
+
+SCENARIO = {
+    "name": "running",
+    "episodes": [{
+        "duration": 10, "is_looped": True,
+        "primitive_type": "formula", "config": {"expression": "t"},
+    }],
+}
+
+
+@pytest.fixture
+def client():
+    # Без события startup: генераторы пишут в NullSink, MQTT не нужен
+    pipeline = SinkPipeline([NullSink()])
+    main.data_generator = DataGenerator(pipeline)
+    main.async_generator = AsyncDataGenerator(AsyncPacketPublisher(pipeline))
+    main.active_generator = main.data_generator
+    yield TestClient(main.app)
+    main.data_generator.stop()
+    pipeline.close()
+
+
+def _start(client, scenario, **params):
+    return client.post("/start", json={"scenario": scenario, **params})
+
+
+@pytest.mark.parametrize("scenario, params", [
+    # Эпизод без выражения
+    ({"name": "bad", "episodes": [{
+        "duration": 5, "is_looped": True,
+        "primitive_type": "formula", "config": {},
+    }]}, {}),
+    # Неизвестный тип примитива
+    ({"name": "bad", "episodes": [{
+        "duration": 5, "is_looped": True,
+        "primitive_type": "nope", "config": {},
+    }]}, {}),
+    # Недопустимая формула
+    ({"name": "bad", "episodes": [{
+        "duration": 5, "is_looped": True,
+        "primitive_type": "formula", "config": {"expression": "t.__class__"},
+    }]}, {}),
+    # Частота не делится на число пакетов
+    (SCENARIO, {"frequency": 10, "packets": 3}),
+])
+def test_rejected_start_keeps_stream(client, scenario, params):
+    assert _start(client, SCENARIO).status_code == 200
+    assert main.data_generator.is_running()
+
+    response = _start(client, scenario, **params)
+    assert response.status_code == 400
+    assert main.data_generator.is_running()
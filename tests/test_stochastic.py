@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from core.primitives import AutoregressivePrimitive, OrnsteinUhlenbeckPrimitive, RandomWalkPrimitive
+
+FREQUENCY = 10.0
+
+
+def _primitives(seed=None):
+    return [
+        RandomWalkPrimitive(0.0, 1.0, 0.1, seed=seed),
+        AutoregressivePrimitive([0.5, -0.2], 1.0, 0.5, seed=seed),
+        OrnsteinUhlenbeckPrimitive(1.0, 0.5, 0.3, seed=seed),
+    ]
+
+
+@pytest.mark.parametrize("index", range(3))
+def test_unseeded_evaluate_is_stable(index):
+    primitive = _primitives()[index]
+    t = np.arange(50) / FREQUENCY
+    first = primitive.evaluate(t, t, FREQUENCY)
+    # Поток между вызовами не влияет на реализацию evaluate
+    primitive.generate_batch(t)
+    assert np.array_equal(primitive.evaluate(t, t, FREQUENCY), first)
+    # Разные экземпляры без seed — разные реализации
+    other = _primitives()[index]
+    assert not np.array_equal(other.evaluate(t, t, FREQUENCY), first)
+
+
+@pytest.mark.parametrize("index", range(3))
+def test_same_seed_scalar_and_batch(index):
+    t = np.arange(3000) / FREQUENCY
+    first = _primitives(seed=5)[index]
+    scalar = np.array([first.generate(x) for x in t])
+    second = _primitives(seed=5)[index]
+    # Пакеты разной длины вперемешку с поштучными вызовами через границу буфера
+    parts, lo = [], 0
+    for i, size in enumerate([1, 700, 5, 1100, 3, 1191]):
+        chunk = t[lo:lo + size]
+        parts.append(second.generate_batch(chunk) if i % 2 else np.array([second.generate(x) for x in chunk]))
+        lo += size
+    assert np.allclose(np.concatenate(parts), scalar, rtol=1e-9, atol=1e-9)
+    assert np.array_equal(_primitives(seed=5)[index].generate_batch(t), _primitives(seed=5)[index].generate_batch(t))
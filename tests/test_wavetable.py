@@ -0,0 +1,37 @@
+import copy
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.scenario import Scenario
+from core.data_generator import build_packet
+
+CONFIG = json.loads((Path(__file__).parent.parent / "config" / "scenario.json").read_text(encoding="utf-8"))
+PACKETS = 3000  # 5 минут потока по 10 пакетов/с
+
+
+def _stream(wavetable: bool, frequency_hz: int) -> np.ndarray:
+    config = copy.deepcopy(CONFIG)
+    for episode in config["episodes"]:
+        if episode["is_looped"]:
+            episode["wavetable"] = wavetable
+    scenario = Scenario.from_json(config)
+    assert scenario.prepare_wavetables(1.0 / frequency_hz) == int(wavetable)
+    values_per_packet = frequency_hz // 10
+    return np.concatenate([
+        scenario.get_values(values_per_packet, 1.0 / frequency_hz) for _ in range(PACKETS)
+    ])
+
+
+@pytest.mark.parametrize("frequency_hz", [10, 100, 1000])
+def test_wavetable_matches_formula(frequency_hz):
+    table = _stream(True, frequency_hz)
+    direct = _stream(False, frequency_hz)
+
+    # Сырые значения — с точностью до погрешности накопленного времени
+    np.testing.assert_allclose(table, direct, rtol=0, atol=1e-8)
+    # В пакете (значения округлены до 4 знаков) — одинаково
+    step = 1.0 / frequency_hz
+    assert build_packet(0.0, table, step) == build_packet(0.0, direct, step)